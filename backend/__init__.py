@@ -4,11 +4,12 @@ VoiceAI Platform - Main application package
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.models.db import Base, engine
+from backend.models.db import Base, engine, upgrade_schema
 from backend.mcp.routes import status
 
-# Criar tabelas
+# Criar tabelas e adicionar colunas novas a tabelas existentes
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 app = FastAPI(
     title="VoiceAI Platform",
@@ -0,0 +1,3 @@
+"""
+Benchmarks offline dos serviços da plataforma VoiceAI
+"""
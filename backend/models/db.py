@@ -2,7 +2,7 @@
 Database models for the VoiceAI platform
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Date
+from sqlalchemy import create_engine, inspect, Column, Integer, String, Text, DateTime, ForeignKey, Date
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from datetime import datetime
@@ -206,6 +206,16 @@ class Call(Base):
     call_notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Live call state written by the VoIP manager (write-behind)
+    voip_call_id = Column(String(64), unique=True, index=True)
+    voip_scope = Column(String(100), index=True)  # manager/trunk that owns the call
+    from_number = Column(String(50))
+    to_number = Column(String(50))
+    provider_id = Column(String(100))  # CallSid, RequestUUID or CallUUID
+    answer_time = Column(DateTime)
+    last_event = Column(DateTime)
+    call_data = Column(Text)  # JSON snapshot of the call record
+
     # Relationships
     lead = relationship('Lead', backref='calls', lazy=True)
     agent = relationship('User', backref='calls', lazy=True)
@@ -396,3 +406,35 @@ class Reminder(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+def upgrade_schema(bind=engine):
+    """
+    Add columns declared on the models but missing from existing tables.
+
+    create_all only creates missing tables, so columns added to a model later
+    (e.g. the live VoIP state on `calls`) would never reach an existing
+    database. New columns are added as nullable, without constraints, and
+    their indexes are created afterwards (unique ones included).
+    """
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    preparer = bind.dialect.identifier_preparer
+
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            added = [column for column in table.columns if column.name not in existing]
+            for column in added:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=bind.dialect)}"
+                )
+
+            added_names = {column.name for column in added}
+            for index in table.indexes:
+                if added_names.intersection(column.name for column in index.columns):
+                    index.create(bind=connection, checkfirst=True)
@@ -0,0 +1,109 @@
+# backend/services/voicemail_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+# Tamanho dos blocos lidos ao calcular o digest de arquivos
+_CHUNK_SIZE = 1024 * 1024
+
+
+def content_digest(audio_stream) -> Optional[str]:
+    """
+    Calcula um digest rápido (BLAKE2b de 128 bits) do conteúdo do áudio.
+    Aceita caminho de arquivo, bytes ou buffer já decodificado.
+
+    Returns:
+        Optional[str]: Digest hexadecimal, ou None se a entrada não for suportada
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    if isinstance(audio_stream, (bytes, bytearray, memoryview)):
+        digest.update(audio_stream)
+    elif isinstance(audio_stream, str):
+        with open(audio_stream, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    elif isinstance(audio_stream, dict) and 'data' in audio_stream:
+        digest.update(str(audio_stream.get('sample_rate')).encode())
+        digest.update(np.ascontiguousarray(audio_stream['data']).data)
+    else:
+        return None
+
+    return digest.hexdigest()
+
+
+class VoicemailResultCache:
+    """
+    Cache LRU com expiração (TTL) para resultados de análise, endereçado
+    pelo conteúdo do áudio. Seguro para uso por várias threads.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: Optional[float] = 3600):
+        """
+        Inicializa o cache.
+
+        Args:
+            max_entries: Número máximo de resultados mantidos
+            ttl: Tempo de vida de cada resultado em segundos (None = sem expiração)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Retorna uma cópia do resultado armazenado, ou None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, result = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result.copy()
+
+    def put(self, key: str, result: Dict):
+        """Armazena um resultado, removendo o menos usado se necessário"""
+        with self.lock:
+            self.entries[key] = (time.time(), result.copy())
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove todos os resultados"""
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Retorna contadores do cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
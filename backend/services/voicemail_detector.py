@@ -1,22 +1,50 @@
 # backend/services/voicemail_detector.py
 import os
 import time
-import tempfile
 import logging
+import multiprocessing
+import queue
 import threading
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import Dict, List, Optional, Union
 import requests
 
+from .whisper_pool import WhisperModelPool, WHISPER_SAMPLE_RATE
+from .voicemail_cache import VoicemailResultCache, content_digest
+from .voicemail_dsp import (
+    BeepDetector, G711_TABLES, decode_g711, frame_envelope, load_audio_file,
+    normalize_audio, parse_g711_wav, resample, run_lengths, trim_to_speech
+)
+from .voicemail_jobs import AnalysisJobScheduler
+from .voicemail_phrases import PhraseMatcher
+from .voicemail_features import FeatureExtractor, FeatureStore, worker_module
+from .voicemail_fingerprint import FingerprintIndex
+from .voicemail_models import VoicemailModelRegistry
+from .voicemail_metrics import StageMetrics
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _decode_frame(frame: bytes, encoding: str) -> np.ndarray:
+    """Decodifica um quadro de áudio bruto para amostras float32"""
+    if encoding in G711_TABLES:
+        return decode_g711(frame, encoding)
+    if encoding == 'pcm16':
+        return np.frombuffer(frame, dtype='<i2').astype(np.float32) / 32768.0
+    raise ValueError(f"Codificação de quadro não suportada: {encoding}")
+
+
 class VoicemailDetector:
     """
     Detector de caixa postal que utiliza reconhecimento de fala e
     análise de padrões para identificar mensagens de caixa postal.
     """
     
+    # Etapas com histograma de latência em get_stats()/export_metrics()
+    STAGES = ('decode', 'fingerprint', 'beep', 'silence', 'vad', 'stt', 'features', 'inference', 'total')
+    
     def __init__(self, config: Optional[Dict] = None):
         """
         Inicializa o detector de caixa postal.
@@ -25,7 +53,6 @@ class VoicemailDetector:
             config: Configurações opcionais
         """
         self.config = config or {}
-        self.temp_dir = self.config.get('temp_dir', tempfile.gettempdir())
         
         # Frases comuns de caixa postal em diferentes idiomas
         self.voicemail_phrases = {
@@ -61,6 +88,9 @@ class VoicemailDetector:
             ]
         }
         
+        # Autômato compilado com as frases de todos os idiomas
+        self.phrase_matcher = PhraseMatcher(self.voicemail_phrases)
+        
         # Padrões de áudio típicos de caixa postal
         self.audio_patterns = {
             'beep': {
@@ -75,30 +105,120 @@ class VoicemailDetector:
             }
         }
         
-        # Modelo de machine learning (carregado sob demanda)
-        self.ai_model = None
+        # Formato canônico de análise: mono float32 nesta taxa (8 kHz = telefonia).
+        # None mantém a taxa nativa do arquivo
+        self.analysis_sample_rate = self.config.get('analysis_sample_rate', 8000)
+        
+        # Índice de impressões digitais de saudações conhecidas (operadoras),
+        # consultado nos primeiros segundos antes do reconhecimento de fala
+        self.fingerprint_seconds = self.config.get('fingerprint_seconds', 2.0)
+        self.fingerprint_index_path = self.config.get('fingerprint_index_path')
+        self.fingerprints = FingerprintIndex(
+            sample_rate=self.analysis_sample_rate or 8000,
+            min_matches=self.config.get('fingerprint_min_matches', 15),
+            min_distinct=self.config.get('fingerprint_min_distinct', 12)
+        )
+        if self.fingerprint_index_path:
+            self.fingerprints.load(self.fingerprint_index_path)
+        
+        # Detecção de atividade de voz antes do STT: apenas os primeiros
+        # stt_max_speech segundos de fala são transcritos
+        self.vad_enabled = self.config.get('vad_enabled', True)
+        self.stt_max_speech = self.config.get('stt_max_speech', 6.0)
+        
+        # Resolução do envelope usado na detecção de silêncio
+        self.silence_frame_ms = self.config.get('silence_frame_ms', 10)
+        
+        # Parâmetros da detecção em streaming (quadro a quadro, ao vivo)
+        self.stream_params = {
+            'deadline': self.config.get('stream_deadline', 2.5),
+            'threshold': self.config.get('stream_threshold', 0.85),
+            'silence_floor': self.config.get('stream_silence_floor', 0.01),
+            'greeting_limit': self.config.get('stream_greeting_limit', 1.5),
+            'after_greeting_silence': self.config.get('stream_after_greeting_silence', 0.8),
+            'min_word_length': 0.1,
+            'max_words': 3,
+            'beep_band_ratio': 0.7
+        }
+        
+        # Modelo de machine learning (registro local compartilhado pelo processo)
         self.use_ai = self.config.get('use_ai', True)
         self.ai_model_path = self.config.get('ai_model_path', '')
         self.ai_threshold = self.config.get('ai_threshold', 0.75)
         
+        # Extração de características e armazenamento persistente (opcional)
+        self.feature_extractor = FeatureExtractor()
+        self.feature_workers = self.config.get('feature_workers', os.cpu_count() or 1)
+        self.feature_store = None
+        if self.config.get('feature_store_path'):
+            # Um armazenamento por taxa de análise: vetores de taxas diferentes não se misturam
+            self.feature_store = FeatureStore(
+                os.path.join(self.config['feature_store_path'], f"{self.analysis_sample_rate or 'native'}hz"),
+                self.feature_extractor.dimension
+            )
+        
+        # Modelos versionados carregados e aquecidos na inicialização, não na primeira análise
+        self.ai_model_dir = self.config.get('ai_model_dir')
+        self.model_registry = VoicemailModelRegistry.get_instance(
+            model_dir=self.ai_model_dir,
+            feature_dimension=self.feature_extractor.dimension
+        )
+        self.model_load_attempted = False
+        if self.use_ai:
+            self._load_ai_model()
+            if self.config.get('ai_model_reload_interval'):
+                self.model_registry.start_watcher(self.config['ai_model_reload_interval'])
+        
+        # Pool de modelos Whisper compartilhado pelo processo
+        self.whisper_model_size = self.config.get('whisper_model', 'base')
+        self.whisper_pool = WhisperModelPool.get_instance(default_size=self.whisper_model_size)
+        if self.config.get('preload_whisper', False):
+            self.whisper_pool.preload([self.whisper_model_size])
+        
         # Estatísticas e cache
         self.stats = {
             'total_analyzed': 0,
             'voicemail_detected': 0,
             'text_based_detection': 0,
             'audio_based_detection': 0,
-            'ai_based_detection': 0
+            'ai_based_detection': 0,
+            'stream_detection': 0,
+            'fingerprint_based_detection': 0
         }
-        self.cache = {}
+        self.stats_lock = threading.Lock()
+        
+        # Histogramas de latência por etapa do pipeline
+        self.metrics = StageMetrics(self.STAGES)
+        self.cache = VoicemailResultCache(
+            max_entries=self.config.get('cache_max_entries', 10000),
+            ttl=self.config.get('cache_ttl', 3600)
+        )
+        
+        # Executor limitado para rodar os detectores em paralelo
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.config.get('max_detector_workers', 6),
+            thread_name_prefix='voicemail-detector'
+        )
         
-        # Thread para análise em segundo plano
-        self.analysis_thread = None
-        self.analysis_queue = []
-        self.queue_lock = threading.Lock()
+        # Limiares de alta confiança de cada detector (permitem saída antecipada)
+        self.decisive_thresholds = {
+            'text': 0.8,
+            'audio': 0.85,
+            'ai': self.ai_threshold,
+            'fingerprint': self.config.get('fingerprint_threshold', 0.85)
+        }
+        
+        # Agendador de análises em segundo plano (workers, prioridades, backpressure)
+        self.scheduler = AnalysisJobScheduler(
+            self._run_queued_analysis,
+            workers=self.config.get('queue_workers', 4),
+            max_queue=self.config.get('queue_max_size', 1000)
+        )
     
     def analyze_audio_stream(self, audio_stream: Union[str, bytes], 
                             language: str = "pt-BR",
-                            callback: Optional[callable] = None) -> Dict:
+                            callback: Optional[callable] = None,
+                            priority: str = "normal") -> Dict:
         """
         Analisa um stream de áudio para detectar padrões de caixa postal.
         Pode ser executado de forma síncrona ou assíncrona com callback.
@@ -107,13 +227,14 @@ class VoicemailDetector:
             audio_stream: Arquivo de áudio ou dados de áudio em bytes
             language: Código do idioma para reconhecimento de fala
             callback: Função opcional para receber resultado de forma assíncrona
+            priority: Prioridade na fila assíncrona ('live', 'normal' ou 'batch')
             
         Returns:
             Dict: Resultado da análise
         """
         # Se fornecido um callback, executar análise em background
         if callback:
-            return self._queue_analysis(audio_stream, language, callback)
+            return self._queue_analysis(audio_stream, language, callback, priority)
             
         # Análise síncrona
         result = {
@@ -127,81 +248,39 @@ class VoicemailDetector:
         start_time = time.time()
         
         try:
-            # Verificar cache
-            if isinstance(audio_stream, str) and os.path.exists(audio_stream):
-                file_hash = self._get_file_hash(audio_stream)
-                if file_hash in self.cache:
-                    result = self.cache[file_hash].copy()
-                    result['from_cache'] = True
-                    return result
-            
-            # Converter stream de áudio para formato adequado se necessário
-            audio_file = self._prepare_audio_file(audio_stream)
-            
-            # Executar três métodos de detecção em paralelo para maior precisão
-            text_result = self._analyze_text(audio_file, language)
-            audio_result = self._analyze_audio_patterns(audio_file)
-            ai_result = self._analyze_with_ai(audio_file, language) if self.use_ai else {'is_voicemail': False, 'confidence': 0.0}
-            
-            # Combinar resultados (estratégia de votação ponderada)
-            is_voicemail = False
-            confidence = 0.0
-            method = None
+            # Verificar cache (digest do conteúdo calculado uma única vez)
+            cache_key = self._get_cache_key(audio_stream, language)
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    cached['from_cache'] = True
+                    cached['analysis_time'] = time.time() - start_time
+                    return cached
+            
+            # Decodificar o áudio uma única vez; todas as etapas leem o mesmo buffer
+            with self.metrics.time('decode'):
+                audio_data = self._decode_audio(audio_stream)
+            if audio_data is None:
+                raise ValueError("Não foi possível decodificar o áudio")
             
-            # Se qualquer método tiver alta confiança, considerar como caixa postal
-            if text_result['is_voicemail'] and text_result['confidence'] > 0.8:
-                is_voicemail = True
-                confidence = text_result['confidence']
-                method = 'text'
-                self.stats['text_based_detection'] += 1
-            elif audio_result['is_voicemail'] and audio_result['confidence'] > 0.85:
-                is_voicemail = True
-                confidence = audio_result['confidence']
-                method = 'audio'
-                self.stats['audio_based_detection'] += 1
-            elif ai_result['is_voicemail'] and ai_result['confidence'] > self.ai_threshold:
-                is_voicemail = True
-                confidence = ai_result['confidence']
-                method = 'ai'
-                self.stats['ai_based_detection'] += 1
+            # Saudação conhecida: veredito imediato, sem transcrição
+            fingerprint = self._match_fingerprint(audio_data)
+            if fingerprint['found']:
+                result = self._fingerprint_result(fingerprint)
             else:
-                # Combinar pontuações se nenhum método for altamente confiante
-                weighted_sum = (
-                    text_result['confidence'] * 0.3 + 
-                    audio_result['confidence'] * 0.3 + 
-                    ai_result['confidence'] * 0.4
-                )
+                # Executar três métodos de detecção em paralelo, encerrando assim
+                # que um deles atingir alta confiança
+                detector_results, decisive = self._run_detectors(audio_data, language)
+                text_result = detector_results['text']
+                audio_result = detector_results['audio']
+                ai_result = detector_results['ai']
                 
-                if weighted_sum > 0.65:
-                    is_voicemail = True
-                    confidence = weighted_sum
-                    method = 'combined'
-                
-            # Atualizar resultado
-            result = {
-                'is_voicemail': is_voicemail,
-                'confidence': confidence,
-                'method': method,
-                'text': text_result.get('text'),
-                'details': {
-                    'text_analysis': text_result,
-                    'audio_analysis': audio_result,
-                    'ai_analysis': ai_result
-                }
-            }
+                # Combinar resultados (estratégia de votação ponderada)
+                result = self._combine_results(text_result, audio_result, ai_result, decisive)
             
-            # Atualizar estatísticas
-            self.stats['total_analyzed'] += 1
-            if is_voicemail:
-                self.stats['voicemail_detected'] += 1
-            
-            # Armazenar em cache se for arquivo
-            if isinstance(audio_stream, str) and os.path.exists(audio_stream):
-                file_hash = self._get_file_hash(audio_stream)
-                self.cache[file_hash] = result.copy()
-                
-            # Limpar arquivos temporários
-            self._cleanup_temp_files(audio_file)
+            # Armazenar em cache
+            if cache_key:
+                self.cache.put(cache_key, result)
             
         except Exception as e:
             logger.error(f"Erro na análise de caixa postal: {str(e)}")
@@ -209,38 +288,298 @@ class VoicemailDetector:
         
         # Adicionar tempo de análise
         result['analysis_time'] = time.time() - start_time
+        self.metrics.observe('total', result['analysis_time'])
         
         return result
     
-    def _queue_analysis(self, audio_stream, language, callback):
-        """Enfileira uma análise para processamento em background"""
+    def _combine_results(self, text_result, audio_result, ai_result, decisive=None):
+        """Combina os resultados dos detectores e atualiza as estatísticas"""
+        is_voicemail = False
+        confidence = 0.0
+        method = None
+        
+        detector_results = {'text': text_result, 'audio': audio_result, 'ai': ai_result}
+        if decisive is None:
+            decisive = next(
+                (name for name in ('text', 'audio', 'ai')
+                 if detector_results[name].get('is_voicemail') and
+                 detector_results[name].get('confidence', 0.0) > self.decisive_thresholds[name]),
+                None
+            )
+        
+        # Se qualquer método tiver alta confiança, considerar como caixa postal
+        if decisive:
+            is_voicemail = True
+            confidence = detector_results[decisive]['confidence']
+            method = decisive
+        else:
+            # Combinar pontuações se nenhum método for altamente confiante
+            weighted_sum = (
+                text_result['confidence'] * 0.3 + 
+                audio_result['confidence'] * 0.3 + 
+                ai_result['confidence'] * 0.4
+            )
+            
+            if weighted_sum > 0.65:
+                is_voicemail = True
+                confidence = weighted_sum
+                method = 'combined'
+        
+        # Atualizar estatísticas
+        self._count_detection(is_voicemail, f'{decisive}_based_detection' if decisive else None)
+        
+        return {
+            'is_voicemail': is_voicemail,
+            'confidence': confidence,
+            'method': method,
+            'text': text_result.get('text'),
+            'details': {
+                'text_analysis': text_result,
+                'audio_analysis': audio_result,
+                'ai_analysis': ai_result
+            }
+        }
+    
+    def analyze_batch(self, inputs: List[Union[str, bytes]], language: str = "pt-BR",
+                      use_text: bool = False) -> List[Dict]:
+        """
+        Classifica várias gravações de uma vez. As entradas são decodificadas
+        em paralelo, os vetores de características são empilhados em uma única
+        matriz e o modelo é chamado uma só vez para o lote inteiro.
+        
+        Args:
+            inputs: Arquivos de áudio ou dados de áudio em bytes
+            language: Código do idioma para reconhecimento de fala
+            use_text: Se True, transcreve o lote com Whisper em passadas conjuntas
+            
+        Returns:
+            List[Dict]: Resultado de cada entrada, na mesma ordem
+        """
+        start_time = time.time()
+        results = [None] * len(inputs)
+        
+        # Decodificar em paralelo (consultando o cache de cada entrada)
+        prepared = list(self.executor.map(lambda item: self._prepare_batch_item(item, language), inputs))
+        
+        pending = []
+        for i, item in enumerate(prepared):
+            if item.get('cached') is not None:
+                results[i] = item['cached']
+                results[i]['from_cache'] = True
+            elif item.get('error'):
+                results[i] = {
+                    'is_voicemail': False,
+                    'confidence': 0.0,
+                    'method': None,
+                    'text': None,
+                    'error': item['error']
+                }
+            else:
+                pending.append(i)
+        
+        # Saudações conhecidas dispensam as demais etapas
+        for i in list(pending):
+            fingerprint = self._match_fingerprint(prepared[i]['audio'])
+            if fingerprint['found']:
+                results[i] = self._fingerprint_result(fingerprint)
+                if prepared[i].get('cache_key'):
+                    self.cache.put(prepared[i]['cache_key'], results[i])
+                pending.remove(i)
+        
+        if pending:
+            audios = [prepared[i]['audio'] for i in pending]
+            
+            # Padrões de áudio e características por item, em paralelo
+            audio_results = list(self.executor.map(self._analyze_audio_patterns, audios))
+            ai_results = self._predict_batch(audios)
+            text_results = self._transcribe_batch(audios, language) if use_text else [
+                {'is_voicemail': False, 'confidence': 0.0, 'skipped': True} for _ in audios
+            ]
+            
+            for i, text_result, audio_result, ai_result in zip(pending, text_results, audio_results, ai_results):
+                results[i] = self._combine_results(text_result, audio_result, ai_result)
+                if prepared[i].get('cache_key'):
+                    self.cache.put(prepared[i]['cache_key'], results[i])
+        
+        elapsed = time.time() - start_time
+        for result in results:
+            result['analysis_time'] = elapsed
+            result['batch_size'] = len(inputs)
+        
+        return results
+    
+    def _prepare_batch_item(self, audio_stream, language):
+        """Consulta o cache e decodifica uma entrada do lote"""
         try:
-            with self.queue_lock:
-                # Criar ID para este trabalho
-                job_id = f"job_{int(time.time())}_{hash(str(audio_stream)) % 10000}"
-                
-                # Adicionar à fila
-                self.analysis_queue.append({
-                    'id': job_id,
-                    'audio_stream': audio_stream,
-                    'language': language,
-                    'callback': callback,
-                    'queued_at': time.time()
-                })
-                
-                # Iniciar thread de análise se não estiver em execução
-                if not self.analysis_thread or not self.analysis_thread.is_alive():
-                    self.analysis_thread = threading.Thread(
-                        target=self._process_analysis_queue,
-                        daemon=True
-                    )
-                    self.analysis_thread.start()
-                
-                return {
-                    'status': 'queued',
-                    'job_id': job_id,
-                    'queue_position': len(self.analysis_queue)
+            cache_key = self._get_cache_key(audio_stream, language)
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return {'cached': cached}
+            
+            with self.metrics.time('decode'):
+                audio_data = self._decode_audio(audio_stream)
+            if audio_data is None:
+                return {'error': 'Não foi possível decodificar o áudio'}
+            
+            return {'audio': audio_data, 'cache_key': cache_key}
+            
+        except Exception as e:
+            return {'error': str(e)}
+    
+    def _predict_batch(self, audios):
+        """Extrai características em paralelo e roda uma única predição vetorizada"""
+        empty = [{'is_voicemail': False, 'confidence': 0.0} for _ in audios]
+        
+        try:
+            model = self._load_ai_model() if self.use_ai else None
+            if not model:
+                return empty
+            
+            features = list(self.executor.map(self._timed_features, audios))
+            rows = [i for i, vector in enumerate(features) if vector is not None]
+            if not rows:
+                return empty
+            
+            matrix = np.vstack([features[i] for i in rows])
+            with self.metrics.time('inference'):
+                confidences = self._predict_confidences(model, matrix)
+            
+            for i, confidence in zip(rows, confidences.tolist()):
+                empty[i] = {
+                    'is_voicemail': confidence > self.ai_threshold,
+                    'confidence': confidence
                 }
+            return empty
+            
+        except Exception as e:
+            logger.error(f"Erro na predição em lote: {str(e)}")
+            return [{'is_voicemail': False, 'confidence': 0.0, 'error': str(e)} for _ in audios]
+    
+    def _transcribe_batch(self, audios, language):
+        """Transcreve o lote com o Whisper, em passadas conjuntas do modelo"""
+        batch_size = self.config.get('stt_batch_size', 16)
+        texts = [None] * len(audios)
+        
+        try:
+            # Somente itens com fala vão para o modelo
+            trimmed = [self._trim_for_stt(a) for a in audios]
+            speech = [i for i, a in enumerate(trimmed) if a is not None]
+            samples = [
+                self._resample(trimmed[i]['data'], trimmed[i]['sample_rate'], WHISPER_SAMPLE_RATE)
+                for i in speech
+            ]
+            for offset in range(0, len(samples), batch_size):
+                with self.metrics.time('stt_batch'):
+                    batch_texts = self.whisper_pool.transcribe_batch(
+                        samples[offset:offset + batch_size],
+                        language=language.split('-')[0],
+                        size=self.whisper_model_size
+                    )
+                for i, text in zip(speech[offset:offset + batch_size], batch_texts):
+                    texts[i] = text
+        except Exception as e:
+            logger.error(f"Erro na transcrição em lote: {str(e)}")
+        
+        return [self._match_voicemail_phrases(text, language) for text in texts]
+    
+    def _run_detectors(self, audio_data, language):
+        """
+        Executa os detectores de texto, padrões de áudio e IA em paralelo no
+        executor limitado. Assim que um detector ultrapassa seu limiar de alta
+        confiança, os demais são cancelados (ou ignorados, se já em execução).
+        
+        Returns:
+            Tuple[Dict, Optional[str]]: resultados por detector e o detector decisivo
+        """
+        order = ['text', 'audio', 'ai']
+        results = {name: {'is_voicemail': False, 'confidence': 0.0, 'skipped': True} for name in order}
+        
+        futures = {
+            self.executor.submit(self._analyze_text, audio_data, language): 'text',
+            self.executor.submit(self._analyze_audio_patterns, audio_data): 'audio'
+        }
+        if self.use_ai:
+            futures[self.executor.submit(self._analyze_with_ai, audio_data, language)] = 'ai'
+        else:
+            results['ai'] = {'is_voicemail': False, 'confidence': 0.0}
+        
+        decisive = None
+        pending = set(futures)
+        
+        while pending and not decisive:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Erro no detector {name}: {str(e)}")
+                    result = {'is_voicemail': False, 'confidence': 0.0, 'error': str(e)}
+                results[name] = result
+                
+                # Se vários terminarem juntos, manter a prioridade original
+                if result.get('is_voicemail') and \
+                   result.get('confidence', 0.0) > self.decisive_thresholds[name]:
+                    if decisive is None or order.index(name) < order.index(decisive):
+                        decisive = name
+        
+        # Cancelar detectores que ainda não começaram
+        for future in pending:
+            future.cancel()
+        
+        return results, decisive
+    
+    def create_stream_session(self, language: str = "pt-BR",
+                              encoding: str = "pcm16",
+                              sample_rate: int = 8000,
+                              deadline: Optional[float] = None) -> 'VoicemailStreamSession':
+        """
+        Cria uma sessão de detecção em streaming para uma chamada ao vivo.
+        A sessão recebe quadros de áudio (tipicamente de 20 ms) à medida que
+        chegam e decide assim que a confiança ultrapassa o limiar ou o prazo
+        máximo é atingido.
+        
+        Args:
+            language: Código do idioma para análise de frases
+            encoding: Codificação dos quadros ('pcm16', 'ulaw' ou 'alaw')
+            sample_rate: Taxa de amostragem dos quadros
+            deadline: Prazo máximo (segundos de áudio) para a decisão
+            
+        Returns:
+            VoicemailStreamSession: Sessão pronta para receber quadros
+        """
+        return VoicemailStreamSession(
+            self,
+            language=language,
+            encoding=encoding,
+            sample_rate=sample_rate,
+            deadline=deadline if deadline is not None else self.stream_params['deadline']
+        )
+    
+    def _queue_analysis(self, audio_stream, language, callback, priority="normal"):
+        """Enfileira uma análise para processamento em background"""
+        try:
+            job_id = self.scheduler.submit(
+                {'audio_stream': audio_stream, 'language': language},
+                priority=priority,
+                callback=self._job_callback(callback)
+            )
+            
+            return {
+                'status': 'queued',
+                'job_id': job_id,
+                'priority': priority,
+                'queue_position': self.scheduler.queue_depth()
+            }
+            
+        except queue.Full:
+            logger.warning("Fila de análise cheia, trabalho rejeitado")
+            return {
+                'status': 'rejected',
+                'error': 'queue_full'
+            }
                 
         except Exception as e:
             logger.error(f"Erro ao enfileirar análise: {str(e)}")
@@ -260,72 +599,167 @@ class VoicemailDetector:
                 'error': str(e)
             }
     
-    def _process_analysis_queue(self):
-        """Processa itens na fila de análise"""
-        while True:
-            try:
-                # Obter próximo item da fila
-                job = None
-                with self.queue_lock:
-                    if self.analysis_queue:
-                        job = self.analysis_queue.pop(0)
-                    
-                if not job:
-                    # Fila vazia, sair do loop
-                    break
-                
-                # Processar item
-                try:
-                    result = self.analyze_audio_stream(
-                        job['audio_stream'],
-                        job['language']
-                    )
-                    
-                    # Adicionar informações do trabalho
-                    result['job_id'] = job['id']
-                    result['queue_time'] = time.time() - job['queued_at']
-                    result['status'] = 'completed'
-                    
-                    # Chamar callback
-                    if job['callback']:
-                        job['callback'](result)
-                        
-                except Exception as e:
-                    logger.error(f"Erro ao processar job {job['id']}: {str(e)}")
-                    if job['callback']:
-                        job['callback']({
-                            'is_voicemail': False,
-                            'error': str(e),
-                            'status': 'error',
-                            'job_id': job['id']
-                        })
-                
-            except Exception as e:
-                logger.error(f"Erro na thread de análise: {str(e)}")
-                time.sleep(1)
+    def _run_queued_analysis(self, payload):
+        """Executa uma análise retirada da fila"""
+        return self.analyze_audio_stream(payload['audio_stream'], payload['language'])
+    
+    def _job_callback(self, callback):
+        """Adapta o resultado do agendador ao formato esperado pelo callback"""
+        def deliver(job):
+            if job['status'] == 'completed':
+                result = dict(job['result'])
+                result['queue_time'] = job['started_at'] - job['queued_at']
+                result['status'] = 'completed'
+            else:
+                result = {
+                    'is_voicemail': False,
+                    'error': job['error'],
+                    'status': 'error'
+                }
+            result['job_id'] = job['job_id']
+            callback(result)
+        
+        return deliver
     
-    def _prepare_audio_file(self, audio_stream):
-        """Prepara o arquivo de áudio para análise"""
+    def get_job_status(self, job_id: str) -> Dict:
+        """
+        Consulta o status de uma análise enfileirada.
+        
+        Args:
+            job_id: ID retornado ao enfileirar a análise
+            
+        Returns:
+            Dict: Status, tempos e resultado (quando concluída)
+        """
+        job = self.scheduler.get_job(job_id)
+        if job is None:
+            return {'status': 'unknown', 'job_id': job_id}
+        return job
+    
+    def _decode_audio(self, audio_stream):
+        """
+        Decodifica a entrada uma única vez para um buffer em memória
+        (float32 mono, na taxa canônica de análise) compartilhado por todas
+        as etapas. Bytes são decodificados diretamente em memória, sem arquivo
+        temporário; payloads G.711 brutos podem ser passados como
+        {'payload': bytes, 'encoding': 'ulaw'|'alaw', 'sample_rate': 8000}.
+        """
         try:
-            # Se já for um caminho de arquivo, retornar diretamente
-            if isinstance(audio_stream, str) and os.path.exists(audio_stream):
-                return audio_stream
-                
-            # Se for bytes, salvar em arquivo temporário
-            if isinstance(audio_stream, bytes):
-                temp_file = os.path.join(self.temp_dir, f"temp_audio_{int(time.time())}.wav")
-                with open(temp_file, 'wb') as f:
-                    f.write(audio_stream)
-                return temp_file
+            # Buffer já decodificado: mesma normalização das demais entradas
+            # (sem cópia se já estiver em float32 mono na taxa de análise)
+            if isinstance(audio_stream, dict) and 'data' in audio_stream:
+                return self._normalize_audio(audio_stream['data'], audio_stream['sample_rate'])
+            
+            if isinstance(audio_stream, dict) and 'payload' in audio_stream:
+                audio_data = {
+                    'data': _decode_frame(audio_stream['payload'], audio_stream.get('encoding', 'ulaw')),
+                    'sample_rate': audio_stream.get('sample_rate', 8000)
+                }
+            elif isinstance(audio_stream, str) and os.path.exists(audio_stream):
+                audio_data = self._load_audio(audio_stream)
+            elif isinstance(audio_stream, (bytes, bytearray, memoryview)):
+                audio_data = self._decode_bytes(bytes(audio_stream))
+            else:
+                raise ValueError("Formato de áudio não suportado")
             
-            # Verificar outros formatos
-            raise ValueError("Formato de áudio não suportado")
+            if audio_data is None:
+                return None
+                
+            return self._normalize_audio(audio_data['data'], audio_data['sample_rate'])
             
         except Exception as e:
-            logger.error(f"Erro ao preparar arquivo de áudio: {str(e)}")
+            logger.error(f"Erro ao decodificar áudio: {str(e)}")
             raise
     
-    def _analyze_text(self, audio_file, language="pt-BR"):
+    def _decode_bytes(self, audio_bytes):
+        """Decodifica áudio em bytes diretamente em memória"""
+        import io
+        
+        # WAV com payload G.711: decodificação direta por tabela
+        g711 = parse_g711_wav(audio_bytes)
+        if g711 is not None:
+            return g711
+        
+        # Tentativa com soundfile (WAV, FLAC, OGG)
+        try:
+            import soundfile as sf
+            audio_data, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype='float32')
+            return {'data': audio_data, 'sample_rate': sample_rate}
+        except Exception as e:
+            logger.debug(f"Falha ao decodificar com soundfile: {str(e)}")
+        
+        # Tentativa com scipy
+        try:
+            from scipy.io import wavfile
+            sample_rate, audio_data = wavfile.read(io.BytesIO(audio_bytes))
+            return {'data': audio_data, 'sample_rate': sample_rate}
+        except Exception as e:
+            logger.debug(f"Falha ao decodificar com scipy: {str(e)}")
+        
+        # Tentativa com o módulo wave da biblioteca padrão (PCM 16 bits)
+        try:
+            import wave
+            with wave.open(io.BytesIO(audio_bytes), 'rb') as wav:
+                if wav.getsampwidth() != 2:
+                    raise ValueError("Apenas PCM de 16 bits é suportado")
+                frames = wav.readframes(wav.getnframes())
+                audio_data = np.frombuffer(frames, dtype='<i2')
+                if wav.getnchannels() > 1:
+                    audio_data = audio_data.reshape((-1, wav.getnchannels()))
+                return {'data': audio_data, 'sample_rate': wav.getframerate()}
+        except Exception as e:
+            logger.debug(f"Falha ao decodificar com wave: {str(e)}")
+        
+        # Tentativa com pydub (MP3 e outros formatos comprimidos)
+        try:
+            from pydub import AudioSegment
+            
+            audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
+            samples = np.array(audio.get_array_of_samples())
+            if audio.channels > 1:
+                samples = samples.reshape((-1, audio.channels))
+            return {'data': samples, 'sample_rate': audio.frame_rate}
+        except Exception as e:
+            logger.warning(f"Falha ao decodificar com pydub: {str(e)}")
+        
+        logger.error("Todas as tentativas de decodificar áudio em memória falharam")
+        return None
+    
+    def _normalize_audio(self, samples, sample_rate):
+        """
+        Converte amostras para o formato canônico de análise: float32 mono
+        contíguo, somente leitura, reamostrado uma única vez para a taxa de análise.
+        """
+        return normalize_audio(samples, sample_rate, self.analysis_sample_rate)
+    
+    def _trim_for_stt(self, audio_data):
+        """
+        Recorta o buffer para os trechos com fala (VAD por energia/ZCR),
+        limitado a stt_max_speech segundos.
+        
+        Returns:
+            Optional[Dict]: Buffer recortado, ou None se não houver fala
+        """
+        if not self.vad_enabled:
+            return audio_data
+        
+        try:
+            with self.metrics.time('vad'):
+                speech = trim_to_speech(audio_data['data'], audio_data['sample_rate'], self.stt_max_speech)
+        except Exception as e:
+            logger.warning(f"Falha na detecção de atividade de voz: {str(e)}")
+            return audio_data
+        
+        if len(speech) == 0:
+            return None
+        
+        return {
+            'data': speech,
+            'sample_rate': audio_data['sample_rate'],
+            'duration': len(speech) / float(audio_data['sample_rate'])
+        }
+    
+    def _analyze_text(self, audio_data, language="pt-BR"):
         """Analisa o texto transcrito do áudio para detectar frases de caixa postal"""
         try:
             result = {
@@ -335,36 +769,18 @@ class VoicemailDetector:
                 'matched_phrases': []
             }
             
-            # Verificar se temos frases para este idioma
-            if language not in self.voicemail_phrases:
-                language = 'en-US'  # fallback para inglês
-            
-            phrases = self.voicemail_phrases[language]
+            # Transcrever apenas os trechos com fala (sem chamada/silêncio)
+            audio_data = self._trim_for_stt(audio_data)
+            if audio_data is None:
+                return result
             
             # Usar reconhecimento de fala para obter texto
-            text = self._speech_to_text(audio_file, language)
+            with self.metrics.time('stt'):
+                text = self._speech_to_text(audio_data, language)
             if not text:
                 return result
                 
-            # Armazenar texto para debug
-            result['text'] = text
-            text = text.lower()
-            
-            # Verificar frases de caixa postal
-            matches = []
-            for phrase in phrases:
-                if phrase.lower() in text:
-                    matches.append(phrase)
-            
-            if matches:
-                # Calcular confiança baseada no número de correspondências
-                confidence = min(0.5 + (len(matches) * 0.15), 0.95)
-                
-                result['is_voicemail'] = True
-                result['confidence'] = confidence
-                result['matched_phrases'] = matches
-            
-            return result
+            return self._match_voicemail_phrases(text, language)
             
         except Exception as e:
             logger.error(f"Erro na análise de texto: {str(e)}")
@@ -374,7 +790,111 @@ class VoicemailDetector:
                 'error': str(e)
             }
     
-    def _analyze_audio_patterns(self, audio_file):
+    def _match_fingerprint(self, audio_data, max_seconds=None):
+        """Compara o início do áudio com as saudações indexadas"""
+        empty = {'found': False, 'confidence': 0.0, 'score': 0.0, 'greeting_id': None}
+        if not len(self.fingerprints):
+            return empty
+        
+        try:
+            with self.metrics.time('fingerprint'):
+                match = self.fingerprints.match(audio_data, max_seconds or self.fingerprint_seconds)
+            # Guardado no buffer para a análise de repetição reaproveitar a comparação
+            audio_data['fingerprint_match'] = match
+            if match['found'] and match['confidence'] < self.decisive_thresholds['fingerprint']:
+                match = dict(match, found=False)
+            return match
+        except Exception as e:
+            logger.error(f"Erro ao comparar impressão digital: {str(e)}")
+            return dict(empty, error=str(e))
+    
+    def _fingerprint_result(self, fingerprint):
+        """Resultado de caixa postal reconhecida por impressão digital"""
+        self._count_detection(True, 'fingerprint_based_detection')
+        return {
+            'is_voicemail': True,
+            'confidence': fingerprint['confidence'],
+            'method': 'fingerprint',
+            'text': None,
+            'details': {
+                'fingerprint': fingerprint
+            }
+        }
+    
+    def add_greeting_fingerprint(self, greeting_id: str, audio_stream: Union[str, bytes],
+                                 label: Optional[str] = None) -> Dict:
+        """
+        Indexa uma saudação de caixa postal conhecida (ex.: mensagem padrão
+        de operadora) para reconhecimento instantâneo.
+        
+        Args:
+            greeting_id: Identificador da saudação
+            audio_stream: Arquivo de áudio ou dados de áudio em bytes
+            label: Descrição (ex.: nome da operadora)
+            
+        Returns:
+            Dict: {'success', 'hashes'} ou {'success': False, 'error'}
+        """
+        try:
+            audio_data = self._decode_audio(audio_stream)
+            if audio_data is None:
+                raise ValueError("Não foi possível decodificar o áudio")
+            
+            hashes = self.fingerprints.add(greeting_id, audio_data, label=label)
+            if self.fingerprint_index_path:
+                self.fingerprints.save(self.fingerprint_index_path)
+            
+            return {'success': True, 'hashes': hashes}
+            
+        except Exception as e:
+            logger.error(f"Erro ao indexar saudação: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def add_voicemail_phrases(self, language: str, phrases: List[str]):
+        """
+        Adiciona frases de caixa postal (ex.: saudações de operadoras) e
+        recompila o autômato de busca.
+        
+        Args:
+            language: Código do idioma das frases
+            phrases: Frases a adicionar
+        """
+        existing = self.voicemail_phrases.setdefault(language, [])
+        existing.extend(p for p in phrases if p not in existing)
+        self.phrase_matcher = PhraseMatcher(self.voicemail_phrases)
+    
+    def _match_voicemail_phrases(self, text, language="pt-BR"):
+        """Procura frases de caixa postal (de todos os idiomas) em um texto já transcrito"""
+        if not text:
+            return self._build_text_result(text, [])
+        
+        return self._build_text_result(text, self.phrase_matcher.match(text))
+    
+    def _build_text_result(self, text, matches):
+        """Monta o resultado da análise de texto a partir das frases encontradas"""
+        result = {
+            'is_voicemail': False,
+            'confidence': 0.0,
+            'text': text,
+            'matched_phrases': []
+        }
+        
+        if matches:
+            # Frases distintas (a mesma frase em dois idiomas conta uma vez)
+            phrases = list(dict.fromkeys(phrase for phrase, _ in matches))
+            
+            # Calcular confiança baseada no número de correspondências
+            confidence = min(0.5 + (len(phrases) * 0.15), 0.95)
+            
+            result['is_voicemail'] = True
+            result['confidence'] = confidence
+            result['matched_phrases'] = phrases
+            result['phrase_languages'] = [[phrase, lang] for phrase, lang in matches]
+            result['matched_languages'] = sorted({lang for _, lang in matches})
+        
+        return result
+    
+    def _analyze_audio_patterns(self, audio_data):
         """Analisa padrões de áudio para detectar características típicas de caixa postal"""
         try:
             result = {
@@ -383,16 +903,17 @@ class VoicemailDetector:
                 'patterns_found': []
             }
             
-            # Carregar áudio para análise espectral
-            audio_data = self._load_audio(audio_file)
+            # Áudio já decodificado pelo pipeline
             if audio_data is None:
                 return result
                 
             # Analisar para bipe característico
-            beep_result = self._detect_beep(audio_data)
+            with self.metrics.time('beep'):
+                beep_result = self._detect_beep(audio_data)
             
             # Analisar padrão de silêncio antes do bipe
-            silence_result = self._detect_silence_pattern(audio_data)
+            with self.metrics.time('silence'):
+                silence_result = self._detect_silence_pattern(audio_data)
             
             # Analisar ritmo da fala (caixa postal geralmente tem cadência específica)
             speech_rhythm = self._analyze_speech_rhythm(audio_data)
@@ -452,7 +973,7 @@ class VoicemailDetector:
                 'error': str(e)
             }
     
-    def _analyze_with_ai(self, audio_file, language="pt-BR"):
+    def _analyze_with_ai(self, audio_data, language="pt-BR"):
         """Analisa o áudio usando modelo de IA para detecção de caixa postal"""
         try:
             result = {
@@ -466,20 +987,13 @@ class VoicemailDetector:
                 return result
                 
             # Preparar características do áudio
-            features = self._extract_audio_features(audio_file)
-            if not features:
+            features = self._timed_features(audio_data)
+            if features is None:
                 return result
                 
             # Fazer predição
-            prediction = model.predict(features)
-            
-            # Interpretar resultado
-            if hasattr(prediction, 'shape') and prediction.shape[1] > 1:
-                # Modelo com múltiplas classes
-                confidence = float(prediction[0][1])  # índice 1 para classe "voicemail"
-            else:
-                # Modelo binário
-                confidence = float(prediction[0])
+            with self.metrics.time('inference'):
+                confidence = float(self._predict_confidences(model, features)[0])
                 
             result['is_voicemail'] = confidence > self.ai_threshold
             result['confidence'] = confidence
@@ -494,7 +1008,22 @@ class VoicemailDetector:
                 'error': str(e)
             }
     
-    def _speech_to_text(self, audio_file, language="pt-BR"):
+    def _predict_confidences(self, model, features):
+        """Retorna a probabilidade de caixa postal para cada linha da matriz"""
+        # Classificadores probabilísticos (ex.: scikit-learn)
+        if hasattr(model, 'predict_proba'):
+            probabilities = np.asarray(model.predict_proba(features))
+            return probabilities[:, 1].astype(float)
+        
+        prediction = np.asarray(model.predict(features))
+        if prediction.ndim > 1 and prediction.shape[1] > 1:
+            # Modelo com múltiplas classes: índice 1 para classe "voicemail"
+            return prediction[:, 1].astype(float)
+        
+        # Modelo binário
+        return prediction.reshape(len(features), -1)[:, 0].astype(float)
+    
+    def _speech_to_text(self, audio_data, language="pt-BR"):
         """Converte áudio para texto usando reconhecimento de fala"""
         try:
             # Tentativa com Google Speech Recognition (online)
@@ -502,32 +1031,22 @@ class VoicemailDetector:
                 import speech_recognition as sr
                 recognizer = sr.Recognizer()
                 
-                with sr.AudioFile(audio_file) as source:
-                    audio_data = recognizer.record(source)
-                    text = recognizer.recognize_google(audio_data, language=language)
-                    return text
+                # Reaproveitar o buffer decodificado como PCM 16 bits
+                pcm = (np.clip(audio_data['data'], -1.0, 1.0) * 32767).astype('<i2').tobytes()
+                source = sr.AudioData(pcm, audio_data['sample_rate'], 2)
+                text = recognizer.recognize_google(source, language=language)
+                return text
             except Exception as e:
                 logger.warning(f"Falha no Google Speech Recognition: {str(e)}")
             
-            # Tentativa com Whisper (offline)
+            # Tentativa com Whisper (offline), usando o modelo residente do pool
             try:
-                # Importar sob demanda para não obrigar instalação se não usar
-                import subprocess
-                
-                # Verificar se está instalado, se não, instalar
-                try:
-                    import whisper
-                except ImportError:
-                    logger.info("Instalando OpenAI Whisper para reconhecimento offline...")
-                    subprocess.check_call(['pip', 'install', 'openai-whisper'])
-                    import whisper
-                
-                # Carregar modelo pequeno para velocidade
-                model = whisper.load_model("base")
-                
-                # Transcrever
-                result = model.transcribe(audio_file, language=language.split('-')[0])
-                return result["text"]
+                samples = self._resample(audio_data['data'], audio_data['sample_rate'], WHISPER_SAMPLE_RATE)
+                return self.whisper_pool.transcribe(
+                    samples,
+                    language=language.split('-')[0],
+                    size=self.whisper_model_size
+                )
                 
             except Exception as e:
                 logger.warning(f"Falha no Whisper: {str(e)}")
@@ -542,67 +1061,23 @@ class VoicemailDetector:
     
     def _load_audio(self, audio_file):
         """Carrega dados de áudio para análise"""
-        try:
-            # Tentar diferentes bibliotecas, dependendo do que está disponível
-            
-            # Tentativa com librosa (boa para análise)
-            try:
-                import librosa
-                audio_data, sample_rate = librosa.load(audio_file, sr=None)
-                return {
-                    'data': audio_data,
-                    'sample_rate': sample_rate,
-                    'duration': librosa.get_duration(y=audio_data, sr=sample_rate)
-                }
-            except Exception as e:
-                logger.warning(f"Falha ao carregar com librosa: {str(e)}")
-            
-            # Tentativa com scipy
-            try:
-                from scipy.io import wavfile
-                sample_rate, audio_data = wavfile.read(audio_file)
-                
-                # Converter para float se for int
-                if audio_data.dtype.kind == 'i':
-                    audio_data = audio_data.astype(np.float32) / np.iinfo(audio_data.dtype).max
-                
-                return {
-                    'data': audio_data,
-                    'sample_rate': sample_rate,
-                    'duration': len(audio_data) / sample_rate
-                }
-            except Exception as e:
-                logger.warning(f"Falha ao carregar com scipy: {str(e)}")
-            
-            # Tentativa com pydub
-            try:
-                from pydub import AudioSegment
-                
-                audio = AudioSegment.from_file(audio_file)
-                samples = np.array(audio.get_array_of_samples())
-                
-                # Converter para float
-                samples = samples.astype(np.float32) / np.iinfo(samples.dtype).max
-                
-                # Se estéreo, converter para mono
-                if audio.channels == 2:
-                    samples = samples.reshape((-1, 2)).mean(axis=1)
-                
-                return {
-                    'data': samples,
-                    'sample_rate': audio.frame_rate,
-                    'duration': audio.duration_seconds
-                }
-            except Exception as e:
-                logger.warning(f"Falha ao carregar com pydub: {str(e)}")
-            
-            # Se todas as tentativas falharem
-            logger.error("Todas as tentativas de carregar áudio falharam")
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erro ao carregar áudio: {str(e)}")
-            return None
+        return load_audio_file(audio_file)
+    
+    def _resample(self, samples, sample_rate, target_rate):
+        """Reamostra um buffer float32 para a taxa desejada"""
+        return resample(samples, sample_rate, target_rate)
+    
+    def _create_beep_detector(self, sample_rate, tone_ratio=0.7):
+        """Cria um detector de bipe Goertzel com os padrões configurados"""
+        beep = self.audio_patterns['beep']
+        return BeepDetector(
+            sample_rate,
+            min_freq=beep['min_freq'],
+            max_freq=beep['max_freq'],
+            min_duration=beep['min_duration'],
+            max_duration=beep['max_duration'],
+            tone_ratio=tone_ratio
+        )
     
     def _detect_beep(self, audio_data):
         """Detecta bipe característico de caixa postal"""
@@ -616,78 +1091,9 @@ class VoicemailDetector:
             if not audio_data or 'data' not in audio_data:
                 return result
             
-            # Analisar espectro de frequência
-            try:
-                import scipy.signal as signal
-                import numpy as np
-                
-                # Parâmetros
-                beep_min_freq = self.audio_patterns['beep']['min_freq']
-                beep_max_freq = self.audio_patterns['beep']['max_freq']
-                min_duration = self.audio_patterns['beep']['min_duration']
-                max_duration = self.audio_patterns['beep']['max_duration']
-                
-                # Calcular espectrograma
-                f, t, Sxx = signal.spectrogram(
-                    audio_data['data'], 
-                    audio_data['sample_rate'],
-                    nperseg=1024
-                )
-                
-                # Encontrar índices de frequência dentro da faixa do bipe
-                freq_indices = np.where((f >= beep_min_freq) & (f <= beep_max_freq))[0]
-                
-                if len(freq_indices) == 0:
-                    return result
-                    
-                # Extrair potência nesta faixa de frequência
-                beep_power = np.sum(Sxx[freq_indices, :], axis=0)
-                
-                # Normalizar
-                beep_power = beep_power / np.max(beep_power)
-                
-                # Encontrar regiões com alta energia nesta faixa
-                threshold = 0.7
-                above_threshold = beep_power > threshold
-                
-                # Encontrar regiões contínuas (possíveis bipes)
-                from scipy.ndimage import label
-                labeled_regions, num_regions = label(above_threshold)
-                
-                beep_found = False
-                beep_time = None
-                beep_conf = 0.0
-                
-                # Verificar cada região
-                for region_idx in range(1, num_regions + 1):
-                    region_indices = np.where(labeled_regions == region_idx)[0]
-                    region_duration = (region_indices[-1] - region_indices[0]) * (t[1] - t[0])
-                    
-                    # Verificar se a duração está dentro dos limites esperados
-                    if min_duration <= region_duration <= max_duration:
-                        region_start_time = t[region_indices[0]]
-                        region_max_power = np.max(beep_power[region_indices])
-                        
-                        # Calcular confiança baseada na potência e duração
-                        duration_factor = 1.0 - abs((region_duration - 1.0) / max_duration)
-                        power_factor = region_max_power
-                        
-                        confidence = 0.7 * power_factor + 0.3 * duration_factor
-                        
-                        if confidence > beep_conf:
-                            beep_found = True
-                            beep_time = region_start_time
-                            beep_conf = confidence
-                
-                result['found'] = beep_found
-                result['confidence'] = beep_conf
-                result['timestamp'] = beep_time
-                
-                return result
-                
-            except Exception as e:
-                logger.warning(f"Falha na análise espectral: {str(e)}")
-                return result
+            # Banco de filtros Goertzel apenas na faixa do bipe, quadro a quadro
+            detector = self._create_beep_detector(audio_data['sample_rate'])
+            return detector.detect(audio_data['data'])
                 
         except Exception as e:
             logger.error(f"Erro ao detectar bipe: {str(e)}")
@@ -713,45 +1119,37 @@ class VoicemailDetector:
             min_silence_duration = self.audio_patterns['silence_before_beep']['min_duration']
             max_volume = self.audio_patterns['silence_before_beep']['max_volume']
             
-            # Calcular envelope do sinal
+            # Calcular envelope do sinal por quadros (sem FFT do sinal inteiro)
             try:
-                import numpy as np
-                from scipy.signal import hilbert
-                
-                # Calcular envelope
-                analytic_signal = hilbert(audio_data['data'])
-                amplitude_envelope = np.abs(analytic_signal)
-                
-                # Normalizar
-                amplitude_envelope = amplitude_envelope / np.max(amplitude_envelope)
-                
-                # Identificar regiões de silêncio
-                silence_mask = amplitude_envelope < max_volume
-                
-                # Encontrar regiões contínuas
-                from scipy.ndimage import label
-                labeled_regions, num_regions = label(silence_mask)
+                sample_rate = audio_data['sample_rate']
+                frame_length = max(int(sample_rate * self.silence_frame_ms / 1000), 1)
+                frame_duration = frame_length / sample_rate
                 
-                # Tempo por amostra
-                time_per_sample = 1.0 / audio_data['sample_rate']
-                
-                # Verificar cada região
-                silence_regions = []
+                amplitude_envelope = frame_envelope(audio_data['data'], frame_length, mode='peak')
+                peak = float(np.max(amplitude_envelope)) if len(amplitude_envelope) else 0.0
+                if peak <= 0:
+                    return result
                 
-                for region_idx in range(1, num_regions + 1):
-                    region_indices = np.where(labeled_regions == region_idx)[0]
-                    region_duration = len(region_indices) * time_per_sample
-                    
-                    # Verificar se a duração é suficiente
-                    if region_duration >= min_silence_duration:
-                        region_start = region_indices[0] * time_per_sample
-                        region_end = region_indices[-1] * time_per_sample
-                        
-                        silence_regions.append({
-                            'start': region_start,
-                            'end': region_end,
-                            'duration': region_duration
-                        })
+                # Identificar quadros de silêncio (envelope normalizado)
+                silence_mask = amplitude_envelope < max_volume * peak
+                
+                # Encontrar sequências contínuas de silêncio (run-length vetorizado)
+                starts, lengths = run_lengths(silence_mask)
+                durations = lengths * frame_duration
+                long_enough = durations >= min_silence_duration
+                
+                silence_regions = [
+                    {
+                        'start': start * frame_duration,
+                        'end': (start + length) * frame_duration - 1.0 / sample_rate,
+                        'duration': duration
+                    }
+                    for start, length, duration in zip(
+                        starts[long_enough].tolist(),
+                        lengths[long_enough].tolist(),
+                        durations[long_enough].tolist()
+                    )
+                ]
                 
                 # Avaliar se encontramos silêncios significativos
                 if silence_regions:
@@ -828,104 +1226,143 @@ class VoicemailDetector:
             }
     
     def _analyze_repetition_patterns(self, audio_data):
-        """Analisa padrões de repetição no áudio"""
-        # Simplificado
-        return 0.5  # valor neutro
+        """Analisa padrões de repetição no áudio (semelhança com saudações conhecidas)"""
+        # Mensagens padronizadas se repetem entre chamadas: usar o índice de impressões
+        if not len(self.fingerprints):
+            return 0.5  # valor neutro
+        
+        # Comparação já feita pela etapa de impressão digital do pipeline
+        match = audio_data.get('fingerprint_match') or self.fingerprints.match(audio_data)
+        return match['confidence'] if match['found'] else min(match['score'], 0.5)
     
     def _load_ai_model(self):
-        """Carrega modelo de IA para detecção de caixa postal"""
+        """
+        Retorna o modelo de IA ativo no registro. Na inicialização, carrega
+        o modelo configurado (arquivo ou versão mais nova do diretório);
+        depois é apenas uma leitura de referência. Novas versões chegam pelo
+        observador do diretório ou por train_model.
+        """
         if not self.use_ai:
             return None
-            
-        # Se já carregado, retornar
-        if self.ai_model:
-            return self.ai_model
-            
+        
+        model = self.model_registry.get_model()
+        if model is not None or self.model_load_attempted:
+            return model
+        
+        self.model_load_attempted = True
         try:
-            # Tentar carregar modelo local se caminho fornecido
+            # Arquivo explícito tem prioridade sobre o diretório versionado
             if self.ai_model_path and os.path.exists(self.ai_model_path):
-                import joblib
-                self.ai_model = joblib.load(self.ai_model_path)
-                return self.ai_model
-                
-            # Ou usar inferência com modelo remoto via API (Hugging Face)
-            # Este é um placeholder para uma implementação real
-            self.ai_model = self._create_huggingface_model()
-            return self.ai_model
+                self.model_registry.load(self.ai_model_path)
+            elif self.ai_model_dir:
+                self.model_registry.refresh()
+            
+            return self.model_registry.get_model()
             
         except Exception as e:
             logger.error(f"Erro ao carregar modelo de IA: {str(e)}")
             return None
     
-    def _create_huggingface_model(self):
-        """Cria proxy para modelo Hugging Face"""
-        # Placeholder para implementação real
-        class HuggingFaceModelProxy:
-            def __init__(self):
-                self.api_token = os.environ.get('HUGGINGFACE_API_TOKEN', '')
-                self.model_id = "your-username/voicemail-detector"  # modelo exemplo
-                
-            def predict(self, features):
-                # Simulação - em produção, faria chamada real à API
-                import numpy as np
-                # Retornar valor aleatório entre 0.3 e 0.7
-                return np.array([[np.random.uniform(0.3, 0.7)]])
-        
-        return HuggingFaceModelProxy()
-    
-    def _extract_audio_features(self, audio_file):
+    def _extract_audio_features(self, audio_data):
         """Extrai características do áudio para alimentar modelo de ML"""
         try:
-            # Esta é uma implementação simplificada
-            # Em produção, extrairia MFCCs, chroma, contraste espectral, etc.
-            
-            # Carregar áudio
-            audio_data = self._load_audio(audio_file)
+            # Áudio já decodificado pelo pipeline
             if not audio_data:
                 return None
-                
-            # Exemplo muito simplificado
-            import numpy as np
             
-            # Em produção, extrairia características mais sofisticadas
-            return np.array([[
-                audio_data['duration'],              # duração
-                np.mean(np.abs(audio_data['data'])),  # volume médio
-                np.std(audio_data['data']),          # desvio padrão
-                np.max(np.abs(audio_data['data']))   # pico
-            ]])
+            # MFCCs, centróide/fluxo espectral, ZCR e energia por quadros
+            features = self.feature_extractor.extract(audio_data)
+            if features is None:
+                return None
+            
+            return features[np.newaxis, :]
             
         except Exception as e:
             logger.error(f"Erro ao extrair características: {str(e)}")
             return None
     
-    def _get_file_hash(self, file_path):
-        """Calcula hash do arquivo para cache"""
-        try:
-            import hashlib
+    def _timed_features(self, audio_data):
+        """Extrai características registrando a latência da etapa"""
+        with self.metrics.time('features'):
+            return self._extract_audio_features(audio_data)
+    
+    def _extract_training_features(self, audio_files):
+        """
+        Extrai características de vários arquivos em paralelo (um processo por
+        núcleo), reaproveitando vetores já presentes no armazenamento em disco.
+        
+        Returns:
+            List[Optional[np.ndarray]]: Vetor de cada arquivo (None se falhou)
+        """
+        features = [None] * len(audio_files)
+        digests = [None] * len(audio_files)
+        missing = []
+        
+        for i, audio_file in enumerate(audio_files):
+            if self.feature_store is not None:
+                try:
+                    digests[i] = content_digest(audio_file)
+                    features[i] = self.feature_store.get(digests[i])
+                except Exception as e:
+                    logger.warning(f"Ignorando exemplo {audio_file}: {str(e)}")
+                    continue
+            if features[i] is None:
+                missing.append(i)
+        
+        if missing:
+            reused = sum(1 for vector in features if vector is not None)
+            logger.info(f"Extraindo características de {len(missing)} arquivos "
+                        f"({reused} reaproveitados)")
+            
+            # Processos novos (spawn): nada das threads do detector é herdado; cada
+            # processo prepara só a decodificação e o extrator (initializer) e
+            # importa o módulo sem o pacote backend (sem app nem banco)
+            try:
+                worker = worker_module()
+                context = multiprocessing.get_context(self.config.get('feature_mp_context', 'spawn'))
+                with ProcessPoolExecutor(max_workers=self.feature_workers, mp_context=context,
+                                         initializer=worker.init_feature_worker,
+                                         initargs=(self.analysis_sample_rate,)) as pool:
+                    extracted = list(pool.map(
+                        worker.extract_file_features,
+                        [audio_files[i] for i in missing],
+                        chunksize=max(1, len(missing) // (self.feature_workers * 4))
+                    ))
+            except Exception as e:
+                logger.warning(f"Extração em processos indisponível, usando a thread atual: {str(e)}")
+                extracted = [self._extract_file_features(audio_files[i]) for i in missing]
             
-            # Calcular hash MD5 do arquivo
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-                    
-            return hash_md5.hexdigest()
+            for i, vector in zip(missing, extracted):
+                features[i] = vector
+                if vector is not None and self.feature_store is not None and digests[i]:
+                    self.feature_store.put(digests[i], vector)
             
+            if self.feature_store is not None:
+                self.feature_store.flush()
+        
+        return features
+    
+    def _extract_file_features(self, audio_file):
+        """Vetor de características de um arquivo, na thread atual"""
+        try:
+            features = self._extract_audio_features(self._decode_audio(audio_file))
+            return None if features is None else features[0]
         except Exception as e:
-            logger.error(f"Erro ao calcular hash: {str(e)}")
-            return str(hash(file_path))
+            logger.warning(f"Ignorando exemplo {audio_file}: {str(e)}")
+            return None
     
-    def _cleanup_temp_files(self, file_path):
-        """Remove arquivos temporários"""
+    def _get_cache_key(self, audio_stream, language):
+        """Calcula a chave de cache a partir do conteúdo do áudio e do idioma"""
         try:
-            # Verificar se é arquivo temporário (está no diretório temp)
-            if file_path and isinstance(file_path, str) and os.path.exists(file_path):
-                if os.path.dirname(file_path) == self.temp_dir:
-                    os.remove(file_path)
-                    
+            if isinstance(audio_stream, str) and not os.path.exists(audio_stream):
+                return None
+            
+            digest = content_digest(audio_stream)
+            return f"{digest}:{language}" if digest else None
+            
         except Exception as e:
-            logger.warning(f"Erro ao limpar arquivo temporário: {str(e)}")
+            logger.error(f"Erro ao calcular digest para cache: {str(e)}")
+            return None
     
     def train_model(self, training_data, model_output_path=None):
         """
@@ -945,14 +1382,14 @@ class VoicemailDetector:
                 
             logger.info(f"Iniciando treinamento com {len(training_data)} exemplos")
             
-            # Extrair características
+            # Extrair características (em paralelo, com reaproveitamento do armazenamento)
             X = []
             y = []
             
-            for item in training_data:
-                features = self._extract_audio_features(item['audio_file'])
+            extracted = self._extract_training_features([item['audio_file'] for item in training_data])
+            for item, features in zip(training_data, extracted):
                 if features is not None:
-                    X.append(features[0])  # Remover dimensão extra
+                    X.append(features)
                     y.append(1 if item['is_voicemail'] else 0)
             
             if not X:
@@ -980,14 +1417,22 @@ class VoicemailDetector:
                 accuracy = model.score(X_test, y_test)
                 logger.info(f"Modelo treinado com acurácia: {accuracy:.2f}")
                 
-                # Salvar modelo
+                # Salvar modelo (no diretório versionado, se configurado)
+                version = time.strftime('%Y%m%d%H%M%S')
+                if not model_output_path and self.ai_model_dir:
+                    os.makedirs(self.ai_model_dir, exist_ok=True)
+                    model_output_path = os.path.join(self.ai_model_dir, f"voicemail-{version}.joblib")
                 if model_output_path:
                     import joblib
-                    joblib.dump(model, model_output_path)
+                    # Gravar com nome temporário (ignorado pelo watcher) e renomear:
+                    # outros processos nunca leem o arquivo pela metade
+                    temp_path = f"{model_output_path}.{os.getpid()}.tmp"
+                    joblib.dump(model, temp_path)
+                    os.replace(temp_path, model_output_path)
                     logger.info(f"Modelo salvo em: {model_output_path}")
                 
-                # Atualizar modelo atual
-                self.ai_model = model
+                # Ativar o novo modelo (validado por aquecimento, troca atômica)
+                self.model_registry.register(model, version, model_output_path)
                 
                 return True
                 
@@ -999,6 +1444,303 @@ class VoicemailDetector:
             logger.error(f"Erro ao treinar modelo: {str(e)}")
             return False
     
+    def _count_detection(self, is_voicemail, method_key=None):
+        """Atualiza os contadores de detecção de forma atômica"""
+        with self.stats_lock:
+            self.stats['total_analyzed'] += 1
+            if is_voicemail:
+                self.stats['voicemail_detected'] += 1
+            if method_key:
+                self.stats[method_key] += 1
+    
     def get_stats(self):
         """Retorna estatísticas do detector"""
-        return self.stats.copy()
+        with self.stats_lock:
+            stats = self.stats.copy()
+        stats['latency'] = self.metrics.snapshot()
+        stats['fingerprints'] = self.fingerprints.get_stats()
+        stats['model'] = self.model_registry.get_stats()
+        stats['cache'] = self.cache.get_stats()
+        stats['queue'] = self.scheduler.get_stats()
+        return stats
+    
+    def export_metrics(self, labels: Optional[Dict[str, str]] = None) -> str:
+        """
+        Exporta contadores e histogramas de latência no formato texto do Prometheus.
+        
+        Args:
+            labels: Rótulos fixos adicionados às séries (ex.: {'node': 'amd-01'})
+            
+        Returns:
+            str: Métricas em formato de exposição
+        """
+        with self.stats_lock:
+            counters = self.stats.copy()
+        cache_stats = self.cache.get_stats()
+        counters['cache_hits'] = cache_stats.get('hits', 0)
+        counters['cache_misses'] = cache_stats.get('misses', 0)
+        return self.metrics.to_prometheus('voicemail', counters=counters, labels=labels)
+    
+    def shutdown(self, wait: bool = False, timeout: Optional[float] = None):
+        """
+        Encerra o agendador e o executor de detectores. Análises na fila são
+        canceladas (callback com status 'cancelled'), ou concluídas antes se wait=True.
+        """
+        self.scheduler.shutdown(wait=wait, timeout=timeout)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class VoicemailStreamSession:
+    """
+    Sessão de detecção de caixa postal em streaming. Recebe quadros de áudio
+    de uma chamada ao vivo e mantém atualizadas as evidências de bipe,
+    silêncio, cadência da saudação e frases, decidindo assim que possível.
+    """
+    
+    def __init__(self, detector: VoicemailDetector, language: str = "pt-BR",
+                 encoding: str = "pcm16", sample_rate: int = 8000,
+                 deadline: float = 2.5):
+        """
+        Inicializa a sessão de streaming.
+        
+        Args:
+            detector: Detector que fornece os parâmetros e frases
+            language: Código do idioma para análise de frases
+            encoding: Codificação dos quadros ('pcm16', 'ulaw' ou 'alaw')
+            sample_rate: Taxa de amostragem dos quadros
+            deadline: Prazo máximo (segundos de áudio) para a decisão
+        """
+        self.detector = detector
+        self.language = language
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.deadline = deadline
+        self.params = detector.stream_params
+        self.max_volume = detector.audio_patterns['silence_before_beep']['max_volume']
+        
+        # Tempo de áudio já processado (segundos)
+        self.elapsed = 0.0
+        self.started_at = time.time()
+        self.peak_rms = 0.0
+        
+        # Evidências de silêncio e fala
+        self.speech_started = False
+        self.initial_silence = 0.0
+        self.greeting_length = 0.0
+        self.current_silence = 0.0
+        self.current_speech = 0.0
+        self.word_count = 0
+        
+        # Evidências de bipe (detector Goertzel incremental)
+        self.beep_detector = detector._create_beep_detector(
+            sample_rate, tone_ratio=self.params['beep_band_ratio']
+        )
+        self.beep_result = {'found': False, 'confidence': 0.0, 'timestamp': None}
+        
+        # Início da chamada guardado para comparação com saudações conhecidas
+        self.fingerprint_buffer = []
+        self.fingerprint_checked = 0.0
+        self.fingerprint_result = {'found': False, 'confidence': 0.0, 'greeting_id': None}
+        
+        # Evidências de texto (transcrição parcial fornecida externamente)
+        self.phrase_stream = detector.phrase_matcher.stream()
+        self.text_result = {'is_voicemail': False, 'confidence': 0.0, 'text': None, 'matched_phrases': []}
+        
+        self.decision = None
+    
+    def feed_frame(self, frame: Union[bytes, np.ndarray]) -> Dict:
+        """
+        Processa um quadro de áudio e atualiza as evidências.
+        
+        Args:
+            frame: Quadro bruto (bytes na codificação da sessão) ou amostras float32
+            
+        Returns:
+            Dict: Estado atual da decisão
+        """
+        if self.decision:
+            return self.decision
+        
+        frame_start = time.perf_counter()
+        try:
+            samples = frame if isinstance(frame, np.ndarray) else _decode_frame(frame, self.encoding)
+            if len(samples) == 0:
+                return self.get_result()
+            
+            duration = len(samples) / self.sample_rate
+            rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float32))))
+            self.peak_rms = max(self.peak_rms, rms)
+            
+            silent = rms < max(self.params['silence_floor'], self.max_volume * self.peak_rms)
+            
+            self.beep_result = self.beep_detector.process(samples)
+            self._update_cadence(duration, silent)
+            self.elapsed += duration
+            
+            self._check_fingerprint(samples)
+            self._evaluate()
+            
+        except Exception as e:
+            logger.error(f"Erro ao processar quadro de streaming: {str(e)}")
+        
+        self.detector.metrics.observe('stream_frame', time.perf_counter() - frame_start)
+        return self.get_result()
+    
+    def _check_fingerprint(self, samples):
+        """Compara o áudio acumulado com o índice a cada segundo, até o limite configurado"""
+        limit = self.detector.fingerprint_seconds
+        if not len(self.detector.fingerprints) or self.fingerprint_checked >= limit:
+            return
+        
+        self.fingerprint_buffer.append(np.array(samples, dtype=np.float32))
+        if self.elapsed < min(self.fingerprint_checked + 1.0, limit):
+            return
+        
+        self.fingerprint_checked = self.elapsed
+        self.fingerprint_result = self.detector._match_fingerprint({
+            'data': np.concatenate(self.fingerprint_buffer),
+            'sample_rate': self.sample_rate
+        }, max_seconds=limit)
+        
+        if self.fingerprint_checked >= limit:
+            self.fingerprint_buffer = []
+    
+    def feed_transcript(self, text: str) -> Dict:
+        """
+        Atualiza a evidência de frases com uma transcrição parcial. Apenas o
+        trecho novo da transcrição cumulativa passa pelo autômato.
+        
+        Args:
+            text: Transcrição acumulada até o momento
+            
+        Returns:
+            Dict: Estado atual da decisão
+        """
+        if self.decision:
+            return self.decision
+        
+        self.phrase_stream.update(text)
+        self.text_result = self.detector._build_text_result(text, self.phrase_stream.matches())
+        self._evaluate()
+        
+        return self.get_result()
+    
+    def _update_cadence(self, duration, silent):
+        """Atualiza silêncio inicial, duração da saudação e contagem de palavras"""
+        if silent:
+            if not self.speech_started:
+                self.initial_silence += duration
+            else:
+                self.current_speech = 0.0
+                self.current_silence += duration
+            return
+        
+        if not self.speech_started:
+            self.speech_started = True
+        
+        # Pausa curta entre palavras faz parte da saudação
+        if self.current_silence < self.params['after_greeting_silence']:
+            self.greeting_length += self.current_silence
+        self.current_silence = 0.0
+        
+        previous = self.current_speech
+        self.current_speech += duration
+        self.greeting_length += duration
+        
+        if previous < self.params['min_word_length'] <= self.current_speech:
+            self.word_count += 1
+    
+    def _evaluate(self):
+        """Verifica se as evidências acumuladas já permitem decidir"""
+        threshold = self.params['threshold']
+        
+        if self.fingerprint_result['found']:
+            self._decide(True, self.fingerprint_result['confidence'], 'fingerprint')
+            return
+        
+        if self.beep_result['found'] and self.beep_result['confidence'] >= threshold:
+            self._decide(True, self.beep_result['confidence'], 'beep')
+            return
+        
+        if self.text_result['is_voicemail'] and self.text_result['confidence'] >= threshold:
+            self._decide(True, self.text_result['confidence'], 'text')
+            return
+        
+        machine_score, human_score = self._cadence_scores()
+        
+        if machine_score >= threshold:
+            self._decide(True, machine_score, 'greeting')
+            return
+        
+        if human_score >= threshold:
+            self._decide(False, human_score, 'human_greeting')
+            return
+        
+        if self.elapsed >= self.deadline:
+            # No prazo, decidir pela evidência mais forte; na dúvida, tratar
+            # como humano para não deixar uma pessoa real em silêncio
+            machine_score = max(machine_score, self.text_result['confidence'],
+                                self.beep_result['confidence'])
+            if machine_score > human_score and machine_score > 0.5:
+                self._decide(True, machine_score, 'deadline')
+            else:
+                self._decide(False, max(human_score, 1.0 - machine_score), 'deadline')
+    
+    def _cadence_scores(self):
+        """Pontua a cadência da saudação (estilo AMD do Asterisk)"""
+        machine_score = 0.0
+        human_score = 0.0
+        
+        # Saudação longa e contínua é típica de mensagem gravada
+        if self.greeting_length >= self.params['greeting_limit']:
+            machine_score = 0.9
+        elif self.word_count > self.params['max_words']:
+            machine_score = 0.85
+        
+        # Saudação curta seguida de silêncio é típica de humano ("Alô?")
+        if self.speech_started and \
+           self.current_silence >= self.params['after_greeting_silence'] and \
+           self.greeting_length < self.params['greeting_limit']:
+            human_score = 0.9
+        
+        # Silêncio inicial prolongado sugere gravação ou linha muda
+        if not self.speech_started and self.initial_silence >= self.deadline * 0.8:
+            machine_score = max(machine_score, 0.6)
+        
+        return machine_score, human_score
+    
+    def _decide(self, is_voicemail, confidence, method):
+        """Registra a decisão final da sessão"""
+        self.decision = self._build_result(True, is_voicemail, confidence, method)
+        
+        self.detector._count_detection(is_voicemail, 'stream_detection')
+        self.detector.metrics.observe('stream_decision', self.elapsed)
+        
+        logger.info(f"Decisão AMD em streaming: {'caixa postal' if is_voicemail else 'humano'} "
+                    f"({method}, {confidence:.2f}) após {self.elapsed:.2f}s")
+    
+    def _build_result(self, decided, is_voicemail, confidence, method):
+        """Monta o dicionário de resultado da sessão"""
+        return {
+            'decided': decided,
+            'is_voicemail': is_voicemail,
+            'confidence': confidence,
+            'method': method,
+            'text': self.text_result.get('text'),
+            'elapsed': self.elapsed,
+            'analysis_time': time.time() - self.started_at,
+            'details': {
+                'beep': dict(self.beep_result),
+                'initial_silence': self.initial_silence,
+                'greeting_length': self.greeting_length,
+                'word_count': self.word_count,
+                'fingerprint': dict(self.fingerprint_result),
+                'text_analysis': self.text_result
+            }
+        }
+    
+    def get_result(self) -> Dict:
+        """Retorna a decisão (se houver) ou o estado parcial da sessão"""
+        if self.decision:
+            return self.decision
+        return self._build_result(False, False, 0.0, None)
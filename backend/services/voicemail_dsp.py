@@ -0,0 +1,593 @@
+# backend/services/voicemail_dsp.py
+import logging
+import os
+import struct
+import numpy as np
+from math import gcd
+from typing import Dict, Optional, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+# Extensões de arquivos G.711 brutos (formato nativo do Asterisk, 8 kHz)
+G711_EXTENSIONS = {
+    '.ulaw': 'ulaw',
+    '.ul': 'ulaw',
+    '.pcm': 'ulaw',
+    '.mu': 'ulaw',
+    '.alaw': 'alaw',
+    '.al': 'alaw'
+}
+
+
+def _build_ulaw_table() -> np.ndarray:
+    """Monta a tabela de decodificação G.711 μ-law para float32"""
+    table = np.zeros(256, dtype=np.float32)
+    for code in range(256):
+        value = ~code & 0xFF
+        exponent = (value >> 4) & 0x07
+        mantissa = value & 0x0F
+        sample = (((mantissa << 3) + 0x84) << exponent) - 0x84
+        table[code] = (-sample if value & 0x80 else sample) / 32768.0
+    return table
+
+
+def _build_alaw_table() -> np.ndarray:
+    """Monta a tabela de decodificação G.711 A-law para float32"""
+    table = np.zeros(256, dtype=np.float32)
+    for code in range(256):
+        value = code ^ 0x55
+        exponent = (value >> 4) & 0x07
+        mantissa = value & 0x0F
+        if exponent == 0:
+            sample = (mantissa << 4) + 8
+        else:
+            sample = ((mantissa << 4) + 0x108) << (exponent - 1)
+        table[code] = (sample if value & 0x80 else -sample) / 32768.0
+    return table
+
+
+ULAW_TABLE = _build_ulaw_table()
+ALAW_TABLE = _build_alaw_table()
+
+G711_TABLES = {
+    'ulaw': ULAW_TABLE,
+    'alaw': ALAW_TABLE
+}
+
+# Códigos de formato WAV dos payloads G.711
+_WAV_G711_FORMATS = {
+    6: 'alaw',
+    7: 'ulaw'
+}
+
+
+def decode_g711(payload: bytes, law: str = 'ulaw') -> np.ndarray:
+    """
+    Decodifica um payload G.711 por consulta direta à tabela (um byte por amostra).
+
+    Args:
+        payload: Bytes μ-law ou A-law
+        law: 'ulaw' ou 'alaw'
+
+    Returns:
+        np.ndarray: Amostras float32 na faixa [-1, 1]
+    """
+    table = G711_TABLES.get(law)
+    if table is None:
+        raise ValueError(f"Lei G.711 desconhecida: {law}")
+    return table[np.frombuffer(payload, dtype=np.uint8)]
+
+
+# Limites superiores dos segmentos μ-law (14 bits) e A-law (13 bits)
+_ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_ALAW_SEGMENT_ENDS = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def encode_g711(samples: np.ndarray, law: str = 'ulaw') -> bytes:
+    """
+    Codifica amostras em G.711 (um byte por amostra), inverso de decode_g711.
+
+    Args:
+        samples: Amostras float na faixa [-1, 1]
+        law: 'ulaw' ou 'alaw'
+
+    Returns:
+        bytes: Payload μ-law ou A-law
+    """
+    pcm = np.clip(np.asarray(samples, dtype=np.float64) * 32768.0, -32768, 32767).astype(np.int32)
+
+    if law == 'ulaw':
+        pcm = pcm >> 2
+        mask = np.where(pcm < 0, 0x7F, 0xFF)
+        magnitude = np.minimum(np.abs(pcm), 8159) + 0x21
+        segment = np.searchsorted(_ULAW_SEGMENT_ENDS, magnitude)
+        code = (np.minimum(segment, 7) << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+        code = np.where(segment >= 8, 0x7F, code)
+        return ((code ^ mask) & 0xFF).astype(np.uint8).tobytes()
+
+    if law == 'alaw':
+        pcm = pcm >> 3
+        mask = np.where(pcm >= 0, 0xD5, 0x55)
+        magnitude = np.where(pcm >= 0, pcm, -pcm - 1)
+        segment = np.searchsorted(_ALAW_SEGMENT_ENDS, magnitude)
+        shift = np.maximum(segment, 1)
+        code = (np.minimum(segment, 7) << 4) | ((magnitude >> shift) & 0x0F)
+        code = np.where(segment >= 8, 0x7F, code)
+        return ((code ^ mask) & 0xFF).astype(np.uint8).tobytes()
+
+    raise ValueError(f"Lei G.711 desconhecida: {law}")
+
+
+def parse_g711_wav(audio_bytes: bytes) -> Optional[Dict]:
+    """
+    Lê um WAV cujo payload é G.711 (formatos 6/7), que os leitores PCM
+    comuns não suportam.
+
+    Returns:
+        Optional[Dict]: {'data', 'sample_rate'} ou None se não for WAV G.711
+    """
+    if len(audio_bytes) < 12 or audio_bytes[:4] != b'RIFF' or audio_bytes[8:12] != b'WAVE':
+        return None
+
+    law = None
+    channels = 1
+    sample_rate = 8000
+    offset = 12
+    while offset + 8 <= len(audio_bytes):
+        chunk_id, chunk_size = struct.unpack('<4sI', audio_bytes[offset:offset + 8])
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            format_tag, channels, sample_rate = struct.unpack('<HHI', audio_bytes[body:body + 8])
+            law = _WAV_G711_FORMATS.get(format_tag)
+            if law is None:
+                return None
+        elif chunk_id == b'data' and law:
+            samples = decode_g711(audio_bytes[body:body + chunk_size], law)
+            if channels > 1:
+                samples = samples[:len(samples) - len(samples) % channels].reshape((-1, channels))
+            return {'data': samples, 'sample_rate': sample_rate}
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Reamostra um sinal com filtro polifásico (scipy), reduzindo a razão
+    pelas frações mínimas (ex.: 48000 → 8000 = 1/6).
+
+    Args:
+        samples: Sinal mono float32
+        sample_rate: Taxa de origem
+        target_rate: Taxa de destino
+
+    Returns:
+        np.ndarray: Sinal float32 na taxa de destino
+    """
+    sample_rate, target_rate = int(sample_rate), int(target_rate)
+    if sample_rate == target_rate or len(samples) == 0:
+        return samples
+
+    factor = gcd(sample_rate, target_rate)
+    up, down = target_rate // factor, sample_rate // factor
+
+    try:
+        from scipy.signal import resample_poly
+        return resample_poly(samples, up, down).astype(np.float32)
+    except ImportError:
+        # Sem scipy: interpolação linear (sem filtro anti-aliasing)
+        length = int(round(len(samples) * up / down))
+        positions = np.arange(length) * (down / up)
+        return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def normalize_audio(samples, sample_rate: int, target_rate: Optional[int] = None) -> Dict:
+    """
+    Converte amostras para o formato canônico de análise: float32 mono
+    contíguo, somente leitura, reamostrado uma única vez para a taxa de análise.
+
+    Args:
+        samples: Amostras (inteiras ou float, mono ou multicanal)
+        sample_rate: Taxa de origem
+        target_rate: Taxa de análise (None mantém a original)
+
+    Returns:
+        Dict: {'data', 'sample_rate', 'duration'}
+    """
+    samples = np.asarray(samples)
+
+    # Converter inteiros para float na faixa [-1, 1]
+    if samples.dtype.kind in 'iu':
+        info = np.iinfo(samples.dtype)
+        if samples.dtype.kind == 'u':
+            samples = (samples.astype(np.float32) - (info.max + 1) / 2) / ((info.max + 1) / 2)
+        else:
+            samples = samples.astype(np.float32) / float(-info.min)
+
+    # Se multicanal, converter para mono
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+
+    # Reamostragem polifásica para a taxa canônica (ex.: 44,1/48 kHz → 8 kHz)
+    if target_rate and int(sample_rate) != target_rate:
+        samples = np.ascontiguousarray(resample(samples, sample_rate, target_rate))
+        sample_rate = target_rate
+
+    samples.flags.writeable = False
+
+    return {
+        'data': samples,
+        'sample_rate': int(sample_rate),
+        'duration': len(samples) / float(sample_rate) if sample_rate else 0.0
+    }
+
+
+def load_audio_file(audio_file: str) -> Optional[Dict]:
+    """
+    Carrega um arquivo de áudio (G.711 bruto, ou o que librosa, scipy ou
+    pydub conseguirem ler), sem reamostrar.
+
+    Returns:
+        Optional[Dict]: {'data', 'sample_rate', 'duration'} ou None se falhar
+    """
+    try:
+        # G.711 bruto (.ulaw/.alaw do Asterisk): decodificação direta, 8 kHz
+        law = G711_EXTENSIONS.get(os.path.splitext(audio_file)[1].lower())
+        if law:
+            with open(audio_file, 'rb') as f:
+                samples = decode_g711(f.read(), law)
+            return {
+                'data': samples,
+                'sample_rate': 8000,
+                'duration': len(samples) / 8000.0
+            }
+
+        # Tentar diferentes bibliotecas, dependendo do que está disponível
+
+        # Tentativa com librosa (boa para análise)
+        try:
+            import librosa
+            # Mono nativo; a reamostragem para a taxa de análise é feita uma vez na normalização
+            audio_data, sample_rate = librosa.load(audio_file, sr=None, mono=True)
+            return {
+                'data': audio_data,
+                'sample_rate': sample_rate,
+                'duration': librosa.get_duration(y=audio_data, sr=sample_rate)
+            }
+        except Exception as e:
+            logger.warning(f"Falha ao carregar com librosa: {str(e)}")
+
+        # Tentativa com scipy
+        try:
+            from scipy.io import wavfile
+            sample_rate, audio_data = wavfile.read(audio_file)
+
+            # Converter para float se for int
+            if audio_data.dtype.kind == 'i':
+                audio_data = audio_data.astype(np.float32) / np.iinfo(audio_data.dtype).max
+
+            return {
+                'data': audio_data,
+                'sample_rate': sample_rate,
+                'duration': len(audio_data) / sample_rate
+            }
+        except Exception as e:
+            logger.warning(f"Falha ao carregar com scipy: {str(e)}")
+
+        # Tentativa com pydub
+        try:
+            from pydub import AudioSegment
+
+            audio = AudioSegment.from_file(audio_file)
+            samples = np.array(audio.get_array_of_samples())
+
+            # Converter para float
+            samples = samples.astype(np.float32) / np.iinfo(samples.dtype).max
+
+            # Se estéreo, converter para mono
+            if audio.channels == 2:
+                samples = samples.reshape((-1, 2)).mean(axis=1)
+
+            return {
+                'data': samples,
+                'sample_rate': audio.frame_rate,
+                'duration': audio.duration_seconds
+            }
+        except Exception as e:
+            logger.warning(f"Falha ao carregar com pydub: {str(e)}")
+
+        # Se todas as tentativas falharem
+        logger.error("Todas as tentativas de carregar áudio falharam")
+        return None
+
+    except Exception as e:
+        logger.error(f"Erro ao carregar áudio: {str(e)}")
+        return None
+
+
+def frame_signal(samples: np.ndarray, frame_length: int, hop: Optional[int] = None) -> np.ndarray:
+    """
+    Divide o sinal em quadros usando stride tricks (sem cópia).
+
+    Args:
+        samples: Sinal mono
+        frame_length: Amostras por quadro
+        hop: Deslocamento entre quadros (padrão: frame_length, sem sobreposição)
+
+    Returns:
+        np.ndarray: Visão (n_quadros, frame_length) sobre o buffer original
+    """
+    hop = hop or frame_length
+    if len(samples) < frame_length:
+        return np.empty((0, frame_length), dtype=samples.dtype)
+    return sliding_window_view(samples, frame_length)[::hop]
+
+
+def run_lengths(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Codificação run-length vetorizada das sequências verdadeiras de uma máscara.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: índices de início e comprimentos das sequências
+    """
+    padded = np.concatenate(([False], np.asarray(mask, dtype=bool), [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts = edges[::2]
+    return starts, edges[1::2] - starts
+
+
+def frame_envelope(samples: np.ndarray, frame_length: int, mode: str = 'peak') -> np.ndarray:
+    """
+    Envelope de amplitude por quadro, calculado sobre visões strided do sinal.
+
+    Args:
+        samples: Sinal mono
+        frame_length: Amostras por quadro
+        mode: 'peak' (pico absoluto) ou 'rms' (valor eficaz)
+
+    Returns:
+        np.ndarray: Um valor de envelope por quadro
+    """
+    frames = frame_signal(samples, frame_length)
+    if len(frames) == 0:
+        return np.empty(0, dtype=np.float32)
+    if mode == 'rms':
+        return np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_length).astype(np.float32)
+    return np.max(np.abs(frames), axis=1)
+
+
+class BeepDetector:
+    """
+    Detector de bipe de caixa postal por banco de filtros Goertzel vetorizado.
+    Avalia apenas as frequências da faixa do bipe (900–1100 Hz) em quadros
+    curtos, podendo operar sobre uma gravação inteira ou incrementalmente
+    sobre quadros de uma chamada ao vivo.
+    """
+
+    def __init__(self, sample_rate: int, min_freq: float = 900, max_freq: float = 1100,
+                 min_duration: float = 0.5, max_duration: float = 2.0,
+                 frame_ms: float = 20, freq_step: float = 20,
+                 tone_ratio: float = 0.7, energy_floor: float = 1e-4):
+        """
+        Inicializa o detector.
+
+        Args:
+            sample_rate: Taxa de amostragem do sinal
+            min_freq: Frequência mínima do bipe (Hz)
+            max_freq: Frequência máxima do bipe (Hz)
+            min_duration: Duração mínima do bipe (s)
+            max_duration: Duração máxima do bipe (s)
+            frame_ms: Duração de cada quadro (ms)
+            freq_step: Espaçamento entre os filtros Goertzel (Hz)
+            tone_ratio: Fração mínima da energia do quadro concentrada no tom
+            energy_floor: Energia média mínima por amostra para considerar o quadro
+        """
+        self.sample_rate = sample_rate
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.tone_ratio = tone_ratio
+        self.energy_floor = energy_floor
+
+        self.frame_length = max(int(sample_rate * frame_ms / 1000), 1)
+        self.frame_duration = self.frame_length / sample_rate
+
+        # Base dos filtros Goertzel: a saída de Goertzel na frequência f é o
+        # termo da DFT em f, calculado aqui para todos os quadros de uma vez
+        freqs = np.arange(min_freq, max_freq + freq_step / 2, freq_step)
+        n = np.arange(self.frame_length)[:, None]
+        omega = 2 * np.pi * freqs[None, :] / sample_rate
+        self.cos_basis = np.cos(omega * n).astype(np.float32)
+        self.sin_basis = np.sin(omega * n).astype(np.float32)
+
+        self.reset()
+
+    def reset(self):
+        """Reinicia o estado incremental"""
+        self.pending = np.empty(0, dtype=np.float32)
+        self.frames_seen = 0
+        self.run_frames = 0
+        self.run_power = 0.0
+        self.best = {'found': False, 'confidence': 0.0, 'timestamp': None}
+
+    def tone_ratios(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Fração da energia de cada quadro concentrada no tom mais forte da faixa.
+        Vale ~1.0 para um tom puro e ~0 para fala, ruído ou silêncio.
+        """
+        frames = np.asarray(frames, dtype=np.float32)
+        real = frames @ self.cos_basis
+        imag = frames @ self.sin_basis
+        tone_power = np.max(real * real + imag * imag, axis=1)
+
+        energy = np.einsum('ij,ij->i', frames, frames)
+        ratios = np.zeros(len(frames), dtype=np.float32)
+        active = energy > self.energy_floor * self.frame_length
+        ratios[active] = 2.0 * tone_power[active] / (self.frame_length * energy[active])
+        return np.minimum(ratios, 1.0)
+
+    def _confidence(self, duration, power):
+        """Confiança baseada na potência do tom e na duração (bipe típico ~1 s)"""
+        duration_factor = 1.0 - abs((duration - 1.0) / self.max_duration)
+        return 0.7 * power + 0.3 * duration_factor
+
+    def detect(self, samples: np.ndarray) -> Dict:
+        """
+        Procura o bipe mais provável em um sinal completo.
+
+        Returns:
+            Dict: {'found', 'confidence', 'timestamp'}
+        """
+        result = {'found': False, 'confidence': 0.0, 'timestamp': None}
+
+        frames = frame_signal(samples, self.frame_length)
+        if len(frames) == 0:
+            return result
+
+        ratios = self.tone_ratios(frames)
+        starts, lengths = run_lengths(ratios >= self.tone_ratio)
+        if len(starts) == 0:
+            return result
+
+        durations = lengths * self.frame_duration
+        valid = (durations >= self.min_duration) & (durations <= self.max_duration)
+        if not np.any(valid):
+            return result
+
+        # Potência média de cada sequência via soma acumulada (sem varrer regiões)
+        cumulative = np.concatenate(([0.0], np.cumsum(ratios, dtype=np.float64)))
+        powers = (cumulative[starts + lengths] - cumulative[starts]) / lengths
+
+        confidences = np.where(valid, self._confidence(durations, powers), -np.inf)
+        best = int(np.argmax(confidences))
+
+        result['found'] = True
+        result['confidence'] = float(confidences[best])
+        result['timestamp'] = float(starts[best] * self.frame_duration)
+        return result
+
+    def process(self, samples: np.ndarray) -> Dict:
+        """
+        Processa incrementalmente novas amostras de uma chamada ao vivo.
+        Um bipe em andamento é reportado assim que atinge a duração mínima.
+
+        Returns:
+            Dict: Melhor bipe encontrado até o momento
+        """
+        if len(self.pending):
+            samples = np.concatenate((self.pending, samples))
+
+        usable = len(samples) - len(samples) % self.frame_length
+        self.pending = np.array(samples[usable:], dtype=np.float32)
+        if usable == 0:
+            return self.best
+
+        ratios = self.tone_ratios(samples[:usable].reshape(-1, self.frame_length))
+
+        for ratio in ratios:
+            if ratio >= self.tone_ratio:
+                self.run_frames += 1
+                self.run_power += float(ratio)
+            else:
+                self.run_frames = 0
+                self.run_power = 0.0
+            self.frames_seen += 1
+
+            duration = self.run_frames * self.frame_duration
+            if self.min_duration <= duration <= self.max_duration:
+                confidence = self._confidence(duration, self.run_power / self.run_frames)
+                if confidence > self.best['confidence']:
+                    self.best = {
+                        'found': True,
+                        'confidence': float(confidence),
+                        'timestamp': (self.frames_seen - self.run_frames) * self.frame_duration
+                    }
+
+        return self.best
+
+
+def speech_segments(samples: np.ndarray, sample_rate: int, frame_ms: float = 20,
+                    energy_ratio: float = 3.0, energy_floor: float = 0.005,
+                    zcr_threshold: float = 0.25, min_speech_ms: float = 100,
+                    max_gap_ms: float = 300, padding_ms: float = 100) -> np.ndarray:
+    """
+    Detector de atividade de voz por energia e taxa de cruzamentos por zero.
+    Quadros bem acima do ruído de fundo contam como fala; quadros de energia
+    moderada com muitos cruzamentos (consoantes fricativas) também.
+
+    Args:
+        samples: Sinal mono float32
+        sample_rate: Taxa de amostragem
+        frame_ms: Duração do quadro de análise (ms)
+        energy_ratio: Múltiplo do ruído de fundo a partir do qual o quadro é fala
+        energy_floor: RMS mínimo absoluto para um quadro ser fala
+        zcr_threshold: Taxa de cruzamentos acima da qual quadros fracos contam como fala
+        min_speech_ms: Segmentos mais curtos são descartados (cliques, estalos)
+        max_gap_ms: Pausas mais curtas entre segmentos são unidas
+        padding_ms: Margem adicionada antes e depois de cada segmento
+
+    Returns:
+        np.ndarray: Matriz (n_segmentos, 2) com início e fim em amostras
+    """
+    frame_length = max(int(sample_rate * frame_ms / 1000), 1)
+    frames = frame_signal(samples, frame_length)
+    if len(frames) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_length)
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    # Ruído de fundo: quadros mais silenciosos da gravação
+    noise = float(np.percentile(rms, 10))
+    loud = rms >= max(energy_floor, noise * energy_ratio)
+    fricative = (rms >= max(energy_floor / 2, noise * energy_ratio / 2)) & (zcr >= zcr_threshold)
+
+    starts, lengths = run_lengths(loud | fricative)
+    if len(starts) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # Unir segmentos separados por pausas curtas (entre palavras)
+    ends = starts + lengths
+    max_gap = max_gap_ms / frame_ms
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] > max_gap))
+    merged_starts = starts[keep]
+    merged_ends = np.maximum.reduceat(ends, np.flatnonzero(keep))
+
+    # Descartar segmentos curtos demais
+    long_enough = (merged_ends - merged_starts) * frame_ms >= min_speech_ms
+    merged_starts, merged_ends = merged_starts[long_enough], merged_ends[long_enough]
+
+    padding = int(sample_rate * padding_ms / 1000)
+    segments = np.stack([
+        np.maximum(merged_starts * frame_length - padding, 0),
+        np.minimum(merged_ends * frame_length + padding, len(samples))
+    ], axis=1).astype(np.int64)
+    return segments
+
+
+def trim_to_speech(samples: np.ndarray, sample_rate: int, max_seconds: Optional[float] = None,
+                   **vad_options) -> np.ndarray:
+    """
+    Mantém apenas os trechos com fala, limitados aos primeiros max_seconds de fala.
+
+    Returns:
+        np.ndarray: Trechos de fala concatenados (vazio se não houver fala)
+    """
+    segments = speech_segments(samples, sample_rate, **vad_options)
+    budget = int(max_seconds * sample_rate) if max_seconds else None
+
+    pieces = []
+    for start, end in segments.tolist():
+        if budget is not None:
+            end = min(end, start + budget)
+            budget -= end - start
+        pieces.append(samples[start:end])
+        if budget is not None and budget <= 0:
+            break
+
+    if not pieces:
+        return np.empty(0, dtype=np.float32)
+    return np.ascontiguousarray(np.concatenate(pieces), dtype=np.float32)
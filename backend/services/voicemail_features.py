@@ -0,0 +1,357 @@
+# backend/services/voicemail_features.py
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import numpy as np
+from typing import Dict, Iterable, Optional
+
+from .voicemail_dsp import frame_signal, load_audio_file, normalize_audio
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Versão do vetor de características; mudar invalida o armazenamento em disco
+FEATURE_VERSION = 1
+
+N_MFCC = 13
+
+FEATURE_NAMES = (
+    [f'mfcc_{i}_mean' for i in range(N_MFCC)] +
+    [f'mfcc_{i}_std' for i in range(N_MFCC)] +
+    [
+        'centroid_mean', 'centroid_std',
+        'flux_mean', 'flux_std',
+        'zcr_mean', 'zcr_std',
+        'rms_mean', 'rms_std', 'rms_max',
+        'duration', 'silence_ratio'
+    ]
+)
+
+
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """Banco de filtros triangulares na escala mel, formato (n_mels, n_bins)"""
+    def hz_to_mel(freq):
+        return 2595.0 * np.log10(1.0 + freq / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    edges = mel_to_hz(np.linspace(0.0, hz_to_mel(sample_rate / 2.0), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def _dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """Matriz DCT-II ortonormal, formato (n_mfcc, n_mels)"""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    matrix = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+class FeatureExtractor:
+    """
+    Extrator vetorizado de características para o modelo de caixa postal:
+    MFCCs, centróide e fluxo espectral, taxa de cruzamentos por zero e
+    estatísticas de energia, calculados sobre quadros do buffer decodificado.
+    """
+
+    def __init__(self, frame_ms: float = 25, hop_ms: float = 10, n_mels: int = 26,
+                 silence_ratio: float = 0.1):
+        """
+        Inicializa o extrator.
+
+        Args:
+            frame_ms: Duração de cada quadro (ms)
+            hop_ms: Deslocamento entre quadros (ms)
+            n_mels: Número de filtros mel
+            silence_ratio: Fração do pico de energia abaixo da qual o quadro é silêncio
+        """
+        self.frame_ms = frame_ms
+        self.hop_ms = hop_ms
+        self.n_mels = n_mels
+        self.silence_ratio = silence_ratio
+
+        # Filtros e janelas dependem da taxa de amostragem; calculados uma vez por taxa
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    @property
+    def dimension(self) -> int:
+        """Tamanho do vetor de características"""
+        return len(FEATURE_NAMES)
+
+    def _get_tables(self, sample_rate: int) -> Dict:
+        """Retorna (e memoriza) janela, banco mel e DCT para a taxa dada"""
+        tables = self.tables.get(sample_rate)
+        if tables is not None:
+            return tables
+
+        with self.lock:
+            frame_length = max(int(sample_rate * self.frame_ms / 1000), 2)
+            n_fft = 1 << (frame_length - 1).bit_length()
+            tables = {
+                'frame_length': frame_length,
+                'hop': max(int(sample_rate * self.hop_ms / 1000), 1),
+                'n_fft': n_fft,
+                'window': np.hanning(frame_length).astype(np.float32),
+                'mel': _mel_filterbank(sample_rate, n_fft, self.n_mels),
+                'dct': _dct_matrix(N_MFCC, self.n_mels),
+                'bin_freqs': (np.fft.rfftfreq(n_fft, 1.0 / sample_rate) / (sample_rate / 2.0)).astype(np.float32)
+            }
+            self.tables[sample_rate] = tables
+        return tables
+
+    def extract(self, audio_data: Dict) -> Optional[np.ndarray]:
+        """
+        Extrai o vetor de características de um buffer decodificado.
+
+        Args:
+            audio_data: {'data': float32 mono, 'sample_rate': int, ...}
+
+        Returns:
+            Optional[np.ndarray]: Vetor (dimension,) float32, ou None se o áudio for curto demais
+        """
+        samples = audio_data['data']
+        sample_rate = audio_data['sample_rate']
+        tables = self._get_tables(sample_rate)
+
+        frames = frame_signal(samples, tables['frame_length'], tables['hop'])
+        if len(frames) < 2:
+            return None
+
+        # Estatísticas no domínio do tempo
+        rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / tables['frame_length'])
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        # Espectro de potência de todos os quadros de uma vez
+        magnitude = np.abs(np.fft.rfft(frames * tables['window'], n=tables['n_fft'], axis=1)).astype(np.float32)
+        power = magnitude * magnitude
+
+        # MFCCs
+        log_mel = np.log(power @ tables['mel'].T + 1e-10)
+        mfcc = log_mel @ tables['dct'].T
+
+        # Centróide espectral (normalizado pela frequência de Nyquist)
+        total_power = np.sum(power, axis=1) + 1e-10
+        centroid = (power @ tables['bin_freqs']) / total_power
+
+        # Fluxo espectral entre quadros consecutivos (magnitudes normalizadas)
+        normalized = magnitude / (np.sum(magnitude, axis=1, keepdims=True) + 1e-10)
+        flux = np.concatenate(([0.0], np.sqrt(np.sum(np.diff(normalized, axis=0) ** 2, axis=1))))
+
+        peak_rms = float(np.max(rms))
+        silence = float(np.mean(rms < self.silence_ratio * peak_rms)) if peak_rms > 0 else 1.0
+
+        return np.concatenate([
+            mfcc.mean(axis=0), mfcc.std(axis=0),
+            [centroid.mean(), centroid.std()],
+            [flux.mean(), flux.std()],
+            [zcr.mean(), zcr.std()],
+            [rms.mean(), rms.std(), peak_rms],
+            [len(samples) / float(sample_rate), silence]
+        ]).astype(np.float32)
+
+
+class FeatureStore:
+    """
+    Armazenamento em disco de vetores de características indexados pelo
+    digest do áudio. Os vetores ficam em um arquivo float32 contínuo lido
+    via memory-map; o índice digest → linha fica em um JSON ao lado.
+    """
+
+    def __init__(self, path: str, dimension: int, version: int = FEATURE_VERSION,
+                 flush_every: int = 100):
+        """
+        Abre (ou cria) o armazenamento.
+
+        Args:
+            path: Diretório do armazenamento
+            dimension: Tamanho dos vetores
+            version: Versão das características; versões diferentes são descartadas
+            flush_every: Grava o índice a cada N inserções
+        """
+        self.path = path
+        self.dimension = dimension
+        self.version = version
+        self.flush_every = flush_every
+
+        self.data_file = os.path.join(path, 'features.f32')
+        self.index_file = os.path.join(path, 'index.json')
+
+        self.lock = threading.Lock()
+        self.index = {}
+        self.rows = 0
+        self.dirty = 0
+        self.memmap = None
+
+        os.makedirs(path, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Carrega o índice, descartando dados de outra versão ou dimensão"""
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file) as f:
+                    meta = json.load(f)
+                if meta.get('version') == self.version and meta.get('dimension') == self.dimension:
+                    self.index = meta.get('keys', {})
+                    self.rows = meta.get('rows', len(self.index))
+                    
+                    # Descartar linhas gravadas após o último índice (ex.: queda do processo)
+                    row_bytes = self.dimension * np.dtype(np.float32).itemsize
+                    size = os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0
+                    if size >= self.rows * row_bytes:
+                        with open(self.data_file, 'r+b') as f:
+                            f.truncate(self.rows * row_bytes)
+                        return
+                    logger.warning("Arquivo de características truncado, recriando")
+                logger.info("Armazenamento de características desatualizado, recriando")
+        except Exception as e:
+            logger.warning(f"Índice de características inválido, recriando: {str(e)}")
+
+        self.index = {}
+        self.rows = 0
+        open(self.data_file, 'wb').close()
+        self._write_index()
+
+    def _write_index(self):
+        """Grava o índice de forma atômica"""
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({
+                'version': self.version,
+                'dimension': self.dimension,
+                'rows': self.rows,
+                'keys': self.index
+            }, f)
+        os.replace(temp_file, self.index_file)
+        self.dirty = 0
+
+    def _view(self) -> np.ndarray:
+        """Memory-map atualizado sobre o arquivo de vetores"""
+        if self.memmap is None or self.memmap.shape[0] != self.rows:
+            self.memmap = np.memmap(self.data_file, dtype=np.float32, mode='r',
+                                    shape=(self.rows, self.dimension))
+        return self.memmap
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, digest: str) -> Optional[np.ndarray]:
+        """Retorna o vetor de um áudio, ou None se ausente"""
+        with self.lock:
+            row = self.index.get(digest)
+            if row is None:
+                return None
+            return np.array(self._view()[row])
+
+    def get_many(self, digests: Iterable[str]) -> np.ndarray:
+        """Retorna a matriz de vetores dos digests informados (todos devem existir)"""
+        with self.lock:
+            rows = [self.index[digest] for digest in digests]
+            return np.array(self._view()[rows]) if rows else np.empty((0, self.dimension), np.float32)
+
+    def put(self, digest: str, vector: np.ndarray):
+        """Acrescenta o vetor de um áudio ao armazenamento"""
+        vector = np.ascontiguousarray(vector, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dimension:
+            raise ValueError(f"Dimensão inválida: {vector.shape[0]} != {self.dimension}")
+
+        with self.lock:
+            if digest in self.index:
+                return
+            with open(self.data_file, 'ab') as f:
+                f.write(vector.tobytes())
+            self.index[digest] = self.rows
+            self.rows += 1
+            self.dirty += 1
+
+            if self.dirty >= self.flush_every:
+                self._write_index()
+
+    def flush(self):
+        """Grava o índice pendente em disco"""
+        with self.lock:
+            if self.dirty:
+                self._write_index()
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do armazenamento"""
+        with self.lock:
+            return {
+                'entries': len(self.index),
+                'dimension': self.dimension,
+                'path': self.path
+            }
+
+
+# Extrator de cada processo do pool de extração (criado pelo initializer)
+_worker_extractor = None
+_worker_sample_rate = None
+
+
+def init_feature_worker(analysis_sample_rate: Optional[int] = None):
+    """Initializer do pool: prepara o extrator uma vez por processo"""
+    global _worker_extractor, _worker_sample_rate
+    _worker_extractor = FeatureExtractor()
+    _worker_sample_rate = analysis_sample_rate
+
+
+def extract_file_features(audio_file: str) -> Optional[np.ndarray]:
+    """
+    Decodifica um arquivo e extrai seu vetor de características. Roda nos
+    processos do pool: usa apenas a decodificação e o FeatureExtractor, sem
+    instanciar o detector (threads, modelos, índices).
+    """
+    if _worker_extractor is None:
+        init_feature_worker()
+
+    try:
+        audio_data = load_audio_file(audio_file)
+        if audio_data is None:
+            return None
+        audio_data = normalize_audio(audio_data['data'], audio_data['sample_rate'], _worker_sample_rate)
+        return _worker_extractor.extract(audio_data)
+
+    except Exception as e:
+        logger.warning(f"Ignorando exemplo {audio_file}: {str(e)}")
+        return None
+
+
+def worker_module():
+    """
+    Este módulo importado como `services.voicemail_features` (diretório
+    backend/ no sys.path, como no benchmark), para o pool de extração.
+
+    Processos spawn reimportam o initializer e a função de extração pelo nome
+    do módulo; pelo nome `backend.services...` cada processo executaria
+    backend/__init__ (app FastAPI, create_all/upgrade_schema no banco).
+    """
+    if not __name__.startswith('backend.'):
+        return sys.modules[__name__]
+
+    services_dir = os.path.dirname(os.path.abspath(__file__))
+    backend_dir = os.path.dirname(services_dir)
+    if backend_dir not in sys.path:
+        sys.path.append(backend_dir)
+
+    module = importlib.import_module('services.voicemail_features')
+    # Outro pacote `services` no sys.path teria precedência: usar este módulo
+    if os.path.dirname(os.path.abspath(module.__file__)) != services_dir:
+        logger.warning("Pacote 'services' no sys.path não é backend/services; "
+                       "processos de extração importarão o pacote backend")
+        return sys.modules[__name__]
+    return module
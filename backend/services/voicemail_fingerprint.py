@@ -0,0 +1,389 @@
+# backend/services/voicemail_fingerprint.py
+import json
+import logging
+import os
+import threading
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .voicemail_dsp import frame_signal, resample
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Versão do formato de hash; mudar invalida índices salvos
+FINGERPRINT_VERSION = 1
+
+
+class GreetingFingerprinter:
+    """
+    Gera impressões digitais de áudio a partir de picos espectrais
+    (constelação). Cada par de picos próximos vira um hash compacto
+    (freq. âncora, freq. alvo, distância em quadros) com o instante da âncora.
+
+    Tons estáveis (tom de chamada, sinais de linha) não identificam uma
+    saudação e se repetem em qualquer chamada: picos que permanecem no mesmo
+    bin por mais de max_steady_ms são descartados, assim como pares com
+    âncora e alvo no mesmo bin.
+    """
+
+    def __init__(self, sample_rate: int = 8000, frame_ms: float = 32,
+                 min_freq: float = 300, max_freq: float = 3400,
+                 peaks_per_frame: int = 5, neighborhood: tuple = (2, 5),
+                 fan_out: int = 10, max_delta: int = 63, peak_floor: float = 0.05,
+                 max_steady_ms: float = 300):
+        """
+        Inicializa o gerador.
+
+        Args:
+            sample_rate: Taxa de amostragem das impressões
+            frame_ms: Duração aproximada da janela da FFT (ms)
+            min_freq: Frequência mínima considerada (Hz)
+            max_freq: Frequência máxima considerada (Hz)
+            peaks_per_frame: Máximo de picos mantidos por quadro
+            neighborhood: Vizinhança (quadros, bins) em que o pico deve ser máximo
+            fan_out: Quantos picos seguintes formam par com cada âncora
+            max_delta: Distância máxima entre âncora e alvo (quadros)
+            peak_floor: Nível mínimo do pico relativo ao maior pico (descarta ruído de linha)
+            max_steady_ms: Duração máxima de um pico no mesmo bin (acima disso é tom)
+        """
+        self.sample_rate = sample_rate
+        self.n_fft = 1 << (max(int(sample_rate * frame_ms / 1000), 2) - 1).bit_length()
+        self.hop = self.n_fft // 2
+        self.frame_duration = self.hop / sample_rate
+        self.window = np.hanning(self.n_fft).astype(np.float32)
+
+        freqs = np.fft.rfftfreq(self.n_fft, 1.0 / sample_rate)
+        self.band = np.flatnonzero((freqs >= min_freq) & (freqs <= max_freq))
+
+        self.peaks_per_frame = peaks_per_frame
+        self.neighborhood = neighborhood
+        self.fan_out = fan_out
+        self.max_delta = min(max_delta, 63)
+        self.peak_floor = peak_floor
+        self.max_steady_frames = max(2, int(round(max_steady_ms / 1000.0 / self.frame_duration)))
+
+    def peaks(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Encontra os picos espectrais do sinal.
+
+        Returns:
+            np.ndarray: Matriz (n_picos, 2) com (quadro, bin), ordenada por quadro
+        """
+        frames = frame_signal(np.asarray(samples, dtype=np.float32), self.n_fft, self.hop)
+        if len(frames) < 2:
+            return np.empty((0, 2), dtype=np.int32)
+
+        magnitude = np.abs(np.fft.rfft(frames * self.window, axis=1))[:, self.band]
+        peak_level = float(magnitude.max())
+        if peak_level <= 0:
+            return np.empty((0, 2), dtype=np.int32)
+
+        # Máximo local na vizinhança tempo × frequência
+        dt, df = self.neighborhood
+        padded = np.pad(magnitude, ((dt, dt), (df, df)), constant_values=-1.0)
+        local_max = sliding_window_view(padded, (2 * dt + 1, 2 * df + 1)).max(axis=(-2, -1))
+        candidates = (magnitude >= local_max) & (magnitude > self.peak_floor * peak_level)
+
+        # Manter apenas os picos mais fortes de cada quadro
+        ranked = np.where(candidates, magnitude, 0.0)
+        keep = min(self.peaks_per_frame, ranked.shape[1])
+        top = np.argpartition(-ranked, keep - 1, axis=1)[:, :keep]
+        rows = np.repeat(np.arange(len(ranked)), keep)
+        cols = top.reshape(-1)
+        valid = ranked[rows, cols] > 0
+
+        rows, cols = rows[valid], cols[valid]
+
+        # Descartar tons: picos presentes no mesmo bin (±1) em quadros seguidos
+        steady = self._steady_runs(rows, cols, ranked.shape)
+        rows, cols = rows[~steady], cols[~steady]
+
+        peaks = np.stack([rows, self.band[cols]], axis=1).astype(np.int32)
+        return peaks[np.lexsort((peaks[:, 1], peaks[:, 0]))]
+
+    def _steady_runs(self, rows: np.ndarray, cols: np.ndarray, shape: tuple) -> np.ndarray:
+        """Marca os picos que fazem parte de uma sequência longa no mesmo bin"""
+        if len(rows) == 0:
+            return np.zeros(0, dtype=bool)
+
+        mask = np.zeros(shape, dtype=bool)
+        mask[rows, cols] = True
+        # Tolerância de um bin (vazamento espectral, leve variação de frequência)
+        mask[:, 1:] |= mask[:, :-1].copy()
+        mask[:, :-1] |= mask[:, 1:].copy()
+
+        # Comprimento da sequência (em quadros) que contém cada célula
+        starts = mask & ~np.vstack([np.zeros((1, shape[1]), dtype=bool), mask[:-1]])
+        run_ids = np.cumsum(starts, axis=0)
+        keys = run_ids * shape[1] + np.arange(shape[1])
+        lengths = np.bincount(keys[mask], minlength=int(keys.max()) + 1)
+
+        return lengths[keys[rows, cols]] > self.max_steady_frames
+
+    def hashes(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Calcula os hashes de pares de picos.
+
+        Returns:
+            np.ndarray: Matriz (n_hashes, 2) int64 com (hash, quadro da âncora)
+        """
+        peaks = self.peaks(samples)
+        pairs = []
+        for k in range(1, self.fan_out + 1):
+            if len(peaks) <= k:
+                break
+            anchors, targets = peaks[:-k], peaks[k:]
+            delta = targets[:, 0] - anchors[:, 0]
+            # Pares no mesmo bin descrevem energia contínua, não a saudação
+            valid = (delta > 0) & (delta <= self.max_delta) & (anchors[:, 1] != targets[:, 1])
+            if not np.any(valid):
+                continue
+            anchors, targets, delta = anchors[valid], targets[valid], delta[valid]
+            codes = (
+                (anchors[:, 1].astype(np.int64) & 0x3FF) << 16 |
+                (targets[:, 1].astype(np.int64) & 0x3FF) << 6 |
+                delta.astype(np.int64)
+            )
+            pairs.append(np.stack([codes, anchors[:, 0].astype(np.int64)], axis=1))
+
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.concatenate(pairs)
+
+
+class FingerprintIndex:
+    """
+    Índice em memória de impressões digitais de saudações conhecidas
+    (operadoras, caixas postais padrão). Um trecho de áudio é reconhecido
+    quando muitos hashes coincidem com o mesmo deslocamento de tempo de
+    uma saudação indexada. Pode ser salvo e carregado do disco.
+    """
+
+    def __init__(self, sample_rate: int = 8000, min_matches: int = 15,
+                 min_ratio: float = 0.1, min_distinct: int = 12,
+                 fingerprinter: Optional[GreetingFingerprinter] = None):
+        """
+        Inicializa o índice.
+
+        Args:
+            sample_rate: Taxa de amostragem das impressões
+            min_matches: Mínimo de hashes alinhados para considerar um reconhecimento
+            min_ratio: Fração mínima dos hashes do trecho que precisam estar alinhados
+            min_distinct: Mínimo de hashes distintos entre os alinhados (votos
+                          repetidos de um mesmo padrão não bastam)
+            fingerprinter: Gerador de impressões (padrão: GreetingFingerprinter na taxa dada)
+        """
+        self.fingerprinter = fingerprinter or GreetingFingerprinter(sample_rate)
+        self.sample_rate = self.fingerprinter.sample_rate
+        self.min_matches = min_matches
+        self.min_ratio = min_ratio
+        self.min_distinct = min_distinct
+
+        self.lock = threading.RLock()
+        self.table = {}
+        self.greetings = []
+        self.greeting_ids = {}
+
+    def __len__(self) -> int:
+        return len(self.greeting_ids)
+
+    def _prepare(self, audio_data: Dict, max_seconds: Optional[float] = None) -> np.ndarray:
+        """Ajusta o buffer à taxa do índice e ao trecho inicial desejado"""
+        samples = audio_data['data']
+        sample_rate = audio_data['sample_rate']
+        if max_seconds:
+            samples = samples[:int(max_seconds * sample_rate)]
+        return resample(samples, sample_rate, self.sample_rate)
+
+    def add(self, greeting_id: str, audio_data: Dict, label: Optional[str] = None) -> int:
+        """
+        Indexa uma saudação conhecida (substitui se o ID já existir).
+
+        Args:
+            greeting_id: Identificador da saudação
+            audio_data: {'data': float32 mono, 'sample_rate': int}
+            label: Descrição (ex.: operadora)
+
+        Returns:
+            int: Número de hashes indexados
+        """
+        hashes = self.fingerprinter.hashes(self._prepare(audio_data))
+
+        with self.lock:
+            if greeting_id in self.greeting_ids:
+                self.remove(greeting_id)
+
+            index = len(self.greetings)
+            self.greetings.append({
+                'id': greeting_id,
+                'label': label,
+                'hashes': int(len(hashes)),
+                'duration': len(audio_data['data']) / float(audio_data['sample_rate'])
+            })
+            self.greeting_ids[greeting_id] = index
+            self._insert(index, hashes)
+
+        logger.info(f"Saudação '{greeting_id}' indexada com {len(hashes)} hashes")
+        return int(len(hashes))
+
+    def _insert(self, index: int, hashes: np.ndarray):
+        """Insere os hashes de uma saudação na tabela"""
+        for code, offset in hashes.tolist():
+            self.table.setdefault(code, []).append((index, offset))
+
+    def remove(self, greeting_id: str) -> bool:
+        """Remove uma saudação do índice"""
+        with self.lock:
+            index = self.greeting_ids.pop(greeting_id, None)
+            if index is None:
+                return False
+            self.greetings[index] = None
+
+            for code in list(self.table):
+                entries = [entry for entry in self.table[code] if entry[0] != index]
+                if entries:
+                    self.table[code] = entries
+                else:
+                    del self.table[code]
+            return True
+
+    def match(self, audio_data: Dict, max_seconds: Optional[float] = None) -> Dict:
+        """
+        Procura a saudação indexada que corresponde ao trecho de áudio.
+
+        Args:
+            audio_data: {'data': float32 mono, 'sample_rate': int}
+            max_seconds: Analisar apenas os primeiros N segundos
+
+        Returns:
+            Dict: {'found', 'confidence', 'score', 'greeting_id', 'label', 'matches',
+                   'distinct', 'offset'}
+        """
+        result = {
+            'found': False,
+            'confidence': 0.0,
+            'score': 0.0,
+            'greeting_id': None,
+            'label': None,
+            'matches': 0,
+            'distinct': 0,
+            'offset': None
+        }
+
+        if not self.greeting_ids:
+            return result
+
+        hashes = self.fingerprinter.hashes(self._prepare(audio_data, max_seconds))
+        if len(hashes) == 0:
+            return result
+
+        # Votação por (saudação, deslocamento): hashes de um mesmo áudio
+        # mantêm a mesma diferença de tempo em relação à referência
+        votes = Counter()
+        codes = {}
+        with self.lock:
+            for code, offset in hashes.tolist():
+                for index, reference_offset in self.table.get(code, ()):
+                    key = (index, reference_offset - offset)
+                    votes[key] += 1
+                    codes.setdefault(key, set()).add(code)
+            if not votes:
+                return result
+
+            # Entre os mais votados, o alinhamento com mais hashes distintos
+            (index, delta), count = max(
+                votes.most_common(5),
+                key=lambda item: (len(codes[item[0]]), item[1])
+            )
+            distinct = len(codes[(index, delta)])
+            greeting = self.greetings[index]
+
+        score = count / float(len(hashes))
+        result.update({
+            'score': score,
+            'greeting_id': greeting['id'],
+            'label': greeting['label'],
+            'matches': count,
+            'distinct': distinct,
+            'offset': delta * self.fingerprinter.frame_duration
+        })
+
+        if count >= self.min_matches and distinct >= self.min_distinct and score >= self.min_ratio:
+            result['found'] = True
+            result['confidence'] = min(0.99, 0.85 + 0.3 * score)
+
+        return result
+
+    def save(self, path: str):
+        """Grava o índice em disco (.npz) de forma atômica"""
+        with self.lock:
+            rows = [
+                (code, index, offset)
+                for code, entries in self.table.items()
+                for index, offset in entries
+            ]
+            meta = {
+                'version': FINGERPRINT_VERSION,
+                'sample_rate': self.sample_rate,
+                'greetings': self.greetings
+            }
+
+        data = np.array(rows, dtype=np.int64).reshape(-1, 3)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_file = path + '.tmp.npz'
+        np.savez_compressed(temp_file, entries=data, meta=np.array(json.dumps(meta)))
+        os.replace(temp_file, path)
+
+    def load(self, path: str) -> bool:
+        """
+        Carrega um índice salvo, substituindo o conteúdo atual.
+
+        Returns:
+            bool: True se carregado; False se ausente ou incompatível
+        """
+        try:
+            with np.load(path) as archive:
+                meta = json.loads(str(archive['meta']))
+                entries = archive['entries']
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Índice de impressões digitais inválido: {str(e)}")
+            return False
+
+        if meta.get('version') != FINGERPRINT_VERSION or meta.get('sample_rate') != self.sample_rate:
+            logger.info("Índice de impressões digitais desatualizado, ignorando")
+            return False
+
+        with self.lock:
+            self.greetings = meta['greetings']
+            self.greeting_ids = {
+                greeting['id']: index
+                for index, greeting in enumerate(self.greetings) if greeting
+            }
+            self.table = {}
+            for code, index, offset in entries.tolist():
+                self.table.setdefault(code, []).append((index, offset))
+
+        logger.info(f"Índice de impressões digitais carregado: {len(self.greeting_ids)} saudações")
+        return True
+
+    def list_greetings(self) -> List[Dict]:
+        """Saudações indexadas"""
+        with self.lock:
+            return [dict(greeting) for greeting in self.greetings if greeting]
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do índice"""
+        with self.lock:
+            return {
+                'greetings': len(self.greeting_ids),
+                'hashes': sum(len(entries) for entries in self.table.values()),
+                'sample_rate': self.sample_rate
+            }
@@ -0,0 +1,288 @@
+# backend/services/voicemail_jobs.py
+import itertools
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AnalysisJobScheduler:
+    """
+    Agendador de análises assíncronas com vários workers, fila limitada
+    (com backpressure) e faixas de prioridade, para que chamadas ao vivo
+    passem à frente de reprocessamentos em lote.
+    """
+
+    # Faixas de prioridade (menor valor = atendido primeiro)
+    PRIORITIES = {
+        'live': 0,
+        'normal': 1,
+        'batch': 2
+    }
+
+    def __init__(self, handler: Callable[[Any], Dict], workers: int = 4,
+                 max_queue: int = 1000, max_finished: int = 10000,
+                 name: str = 'voicemail-jobs'):
+        """
+        Inicializa o agendador.
+
+        Args:
+            handler: Função que processa o payload de um trabalho e retorna o resultado
+            workers: Número de threads de trabalho
+            max_queue: Capacidade máxima da fila (trabalhos pendentes)
+            max_finished: Quantos trabalhos concluídos manter para consulta
+            name: Prefixo do nome das threads
+        """
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.name = name
+
+        self.queue = queue.PriorityQueue(maxsize=max_queue)
+        self.sequence = itertools.count()
+        self.jobs = {}
+        self.finished = deque()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.running = False
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'rejected': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'total_run_time': 0.0
+        }
+        self.lane_depth = {lane: 0 for lane in self.PRIORITIES}
+
+    def start(self):
+        """Inicia as threads de trabalho (idempotente)"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.threads = [
+                threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self.threads:
+                thread.start()
+
+    def submit(self, payload: Any, priority: str = 'normal',
+               callback: Optional[Callable[[Dict], None]] = None,
+               block: bool = False, timeout: Optional[float] = None) -> str:
+        """
+        Enfileira um trabalho.
+
+        Args:
+            payload: Dados repassados ao handler
+            priority: Faixa de prioridade ('live', 'normal' ou 'batch')
+            callback: Função chamada com o resultado ao final
+            block: Se True, aguarda espaço na fila quando cheia
+            timeout: Tempo máximo de espera quando block=True
+
+        Returns:
+            str: ID do trabalho
+
+        Raises:
+            queue.Full: Se a fila estiver cheia (backpressure)
+        """
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Prioridade desconhecida: {priority}")
+
+        self.start()
+
+        job_id = f"job_{uuid.uuid4().hex}"
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'priority': priority,
+            'payload': payload,
+            'callback': callback,
+            'queued_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+
+        with self.lock:
+            self.jobs[job_id] = job
+            self.lane_depth[priority] += 1
+            sequence = next(self.sequence)
+
+        try:
+            self.queue.put((self.PRIORITIES[priority], sequence, job_id), block=block, timeout=timeout)
+        except queue.Full:
+            with self.lock:
+                self.jobs.pop(job_id, None)
+                self.lane_depth[priority] -= 1
+                self.stats['rejected'] += 1
+            raise
+
+        with self.lock:
+            self.stats['submitted'] += 1
+
+        return job_id
+
+    def _worker(self):
+        """Loop de uma thread de trabalho"""
+        while self.running:
+            try:
+                _, _, job_id = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Erro na thread de análise: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def _run_job(self, job_id: str):
+        """Executa um trabalho e registra resultado e métricas"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+            self.lane_depth[job['priority']] -= 1
+
+            wait_time = job['started_at'] - job['queued_at']
+            self.stats['total_wait_time'] += wait_time
+            self.stats['max_wait_time'] = max(self.stats['max_wait_time'], wait_time)
+
+        try:
+            result = self.handler(job['payload'])
+            status = 'completed'
+            error = None
+        except Exception as e:
+            logger.error(f"Erro ao processar job {job_id}: {str(e)}")
+            result = None
+            status = 'error'
+            error = str(e)
+
+        with self.lock:
+            job['status'] = status
+            job['result'] = result
+            job['error'] = error
+            job['finished_at'] = time.time()
+            job['payload'] = None  # liberar o áudio assim que possível
+
+            self.stats['completed' if status == 'completed' else 'failed'] += 1
+            self.stats['total_run_time'] += job['finished_at'] - job['started_at']
+
+            # Manter apenas os trabalhos concluídos mais recentes
+            self.finished.append(job_id)
+            while len(self.finished) > self.max_finished:
+                self.jobs.pop(self.finished.popleft(), None)
+
+        callback = job['callback']
+        if callback:
+            try:
+                callback(self._job_view(job))
+            except Exception as e:
+                logger.error(f"Erro no callback do job {job_id}: {str(e)}")
+
+    def _job_view(self, job: Dict) -> Dict:
+        """Representação pública de um trabalho (sem payload nem callback)"""
+        return {
+            'job_id': job['id'],
+            'status': job['status'],
+            'priority': job['priority'],
+            'queued_at': job['queued_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at'],
+            'result': job['result'],
+            'error': job['error']
+        }
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Consulta status e resultado de um trabalho pelo ID"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return self._job_view(job) if job else None
+
+    def queue_depth(self) -> int:
+        """Número de trabalhos aguardando na fila"""
+        return self.queue.qsize()
+
+    def shutdown(self, wait: bool = False, timeout: Optional[float] = None):
+        """
+        Interrompe os workers.
+
+        Args:
+            wait: Se True, processa antes os trabalhos já enfileirados
+            timeout: Tempo máximo de espera quando wait=True
+
+        Trabalhos que não chegaram a rodar ficam com status 'cancelled' e
+        têm o callback chamado, para que ninguém espere um resultado que
+        não virá.
+        """
+        if wait and self.running:
+            deadline = time.time() + timeout if timeout is not None else None
+            while self.queue.unfinished_tasks:
+                if deadline is not None and time.time() >= deadline:
+                    break
+                time.sleep(0.05)
+
+        self.running = False
+
+        while True:
+            try:
+                _, _, job_id = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._cancel_job(job_id)
+            finally:
+                self.queue.task_done()
+
+    def _cancel_job(self, job_id: str):
+        """Finaliza um trabalho que não chegou a rodar e avisa o callback"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] != 'queued':
+                return
+            job['status'] = 'cancelled'
+            job['error'] = 'Agendador encerrado antes da execução'
+            job['finished_at'] = time.time()
+            job['payload'] = None
+            self.lane_depth[job['priority']] -= 1
+            self.stats['cancelled'] += 1
+
+            self.finished.append(job_id)
+            while len(self.finished) > self.max_finished:
+                self.jobs.pop(self.finished.popleft(), None)
+
+        callback = job['callback']
+        if callback:
+            try:
+                callback(self._job_view(job))
+            except Exception as e:
+                logger.error(f"Erro no callback do job {job_id}: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """Retorna métricas de fila e de tempo de espera"""
+        with self.lock:
+            stats = self.stats.copy()
+            started = stats['completed'] + stats['failed']
+            stats['queue_depth'] = self.queue.qsize()
+            stats['lane_depth'] = dict(self.lane_depth)
+            stats['workers'] = self.workers
+            stats['max_queue'] = self.max_queue
+            stats['avg_wait_time'] = stats['total_wait_time'] / started if started else 0.0
+            stats['avg_run_time'] = stats['total_run_time'] / started if started else 0.0
+        return stats
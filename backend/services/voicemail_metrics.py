@@ -0,0 +1,182 @@
+# backend/services/voicemail_metrics.py
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+# Limites superiores dos intervalos do histograma (segundos), em escala
+# aproximadamente logarítmica de 0,5 ms a 30 s
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências com intervalos fixos, protegido por lock.
+    Custo de registro constante e memória fixa, independente do volume;
+    percentis são estimados por interpolação dentro do intervalo.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zera as contagens"""
+        with self.lock:
+            # Um intervalo extra para valores acima do último limite (+Inf)
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+
+    def observe(self, seconds: float):
+        """Registra uma medição"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+
+    def _percentile(self, counts, count, minimum, maximum, q: float) -> float:
+        """Estimativa do percentil q (0–100) a partir das contagens"""
+        rank = q / 100.0 * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if not bucket_count:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else maximum
+                # Limitar ao mínimo/máximo observados para não extrapolar
+                lower, upper = max(lower, minimum), min(upper, maximum)
+                fraction = (rank - cumulative) / bucket_count
+                return lower + (upper - lower) * fraction
+            cumulative += bucket_count
+        return maximum
+
+    def snapshot(self, percentiles: Iterable[float] = (50, 90, 95, 99)) -> Dict:
+        """
+        Retorna um resumo consistente do histograma.
+
+        Returns:
+            Dict: count, sum, avg, min, max e os percentis pedidos (p50, p90, ...)
+        """
+        with self.lock:
+            counts = list(self.counts)
+            count, total = self.count, self.total
+            minimum, maximum = self.min, self.max
+
+        summary = {
+            'count': count,
+            'sum': total,
+            'avg': total / count if count else 0.0,
+            'min': minimum or 0.0,
+            'max': maximum or 0.0
+        }
+        for q in percentiles:
+            summary[f'p{q:g}'] = self._percentile(counts, count, minimum, maximum, q) if count else 0.0
+        return summary
+
+    def cumulative_counts(self):
+        """Contagens acumuladas por limite, no formato de histograma do Prometheus"""
+        with self.lock:
+            counts = list(self.counts)
+            count, total = self.count, self.total
+
+        cumulative, running = [], 0
+        for bound, bucket_count in zip(list(self.buckets) + [float('inf')], counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return cumulative, count, total
+
+
+class StageMetrics:
+    """
+    Latências por etapa do pipeline (decodificação, bipe, silêncio, STT,
+    características, inferência...), uma instância de histograma por etapa.
+    """
+
+    def __init__(self, stages: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.histograms = {stage: LatencyHistogram(self.buckets) for stage in stages}
+
+    def _histogram(self, stage: str) -> LatencyHistogram:
+        """Retorna (ou cria) o histograma de uma etapa"""
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram(self.buckets))
+        return histogram
+
+    def observe(self, stage: str, seconds: float):
+        """Registra a duração de uma etapa"""
+        self._histogram(stage).observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        """Mede a duração do bloco e registra na etapa (inclusive se houver erro)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Resumo (contagem, média, percentis) de todas as etapas"""
+        return {stage: histogram.snapshot() for stage, histogram in list(self.histograms.items())}
+
+    def reset(self):
+        """Zera todos os histogramas"""
+        for histogram in list(self.histograms.values()):
+            histogram.reset()
+
+    def to_prometheus(self, prefix: str = 'voicemail', counters: Optional[Dict[str, float]] = None,
+                      labels: Optional[Dict[str, str]] = None) -> str:
+        """
+        Exporta as métricas no formato texto do Prometheus.
+
+        Args:
+            prefix: Prefixo dos nomes das métricas
+            counters: Contadores adicionais (nome -> valor)
+            labels: Rótulos fixos adicionados a todas as séries (ex.: nó)
+
+        Returns:
+            str: Métricas em formato de exposição texto
+        """
+        base_labels = ','.join(f'{key}="{value}"' for key, value in (labels or {}).items())
+
+        def label_set(*extra):
+            parts = [part for part in (base_labels,) + extra if part]
+            return '{' + ','.join(parts) + '}' if parts else ''
+
+        lines = []
+        for name, value in (counters or {}).items():
+            metric = f'{prefix}_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{label_set()} {value}')
+
+        metric = f'{prefix}_stage_duration_seconds'
+        lines.append(f'# HELP {metric} Duração de cada etapa da análise de caixa postal')
+        lines.append(f'# TYPE {metric} histogram')
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative, count, total = histogram.cumulative_counts()
+            stage_label = f'stage="{stage}"'
+            for bound, running in cumulative:
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                le_label = 'le="' + le + '"'
+                lines.append(f'{metric}_bucket{label_set(stage_label, le_label)} {running}')
+            lines.append(f'{metric}_sum{label_set(stage_label)} {total}')
+            lines.append(f'{metric}_count{label_set(stage_label)} {count}')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,300 @@
+# backend/services/voicemail_models.py
+import logging
+import os
+import re
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Extensões de modelo suportadas pelo registro
+MODEL_EXTENSIONS = ('.joblib', '.pkl', '.onnx')
+
+
+def _version_key(version: str):
+    """Chave de ordenação natural de versões (ex.: 'v10' > 'v9')"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', version)]
+
+
+def _file_key(path: str):
+    """Identifica o conteúdo atual de um arquivo de modelo (caminho, mtime)"""
+    try:
+        return path, os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None
+
+
+class OnnxModel:
+    """Adaptador de uma sessão ONNX Runtime para a interface predict_proba"""
+
+    def __init__(self, path: str):
+        import onnxruntime
+
+        self.session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        outputs = self.session.run(None, {self.input_name: np.asarray(features, dtype=np.float32)})
+
+        # Classificadores convertidos do scikit-learn retornam [rótulos, probabilidades]
+        probabilities = outputs[-1]
+        if isinstance(probabilities, list):
+            probabilities = np.array([[row.get(0, 0.0), row.get(1, 0.0)] for row in probabilities])
+        probabilities = np.asarray(probabilities, dtype=float)
+        if probabilities.ndim == 1 or probabilities.shape[1] == 1:
+            positive = probabilities.reshape(-1)
+            probabilities = np.stack([1.0 - positive, positive], axis=1)
+        return probabilities
+
+
+class VoicemailModelRegistry:
+    """
+    Registro de modelos locais de detecção de caixa postal (joblib/ONNX).
+    Versões são carregadas e validadas com uma predição de aquecimento fora
+    do caminho das requisições e ativadas por troca atômica de referência:
+    quem está analisando nunca espera um carregamento. Uma instância por processo.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, model_dir: Optional[str] = None, feature_dimension: Optional[int] = None):
+        """
+        Inicializa o registro.
+
+        Args:
+            model_dir: Diretório com modelos versionados (ex.: voicemail-3.joblib)
+            feature_dimension: Tamanho do vetor de características usado no aquecimento
+        """
+        self.model_dir = model_dir
+        self.feature_dimension = feature_dimension
+
+        # Entrada ativa: {'model', 'version', 'path', 'loaded_at', 'warmup_time'}
+        self.active = None
+        self.previous = None
+        # (caminho, mtime) de arquivos reprovados no aquecimento; um arquivo
+        # regravado tem outro mtime e volta a ser tentado
+        self.rejected = set()
+        self.load_lock = threading.Lock()
+        self.watcher = None
+        self.watching = False
+
+        self.stats = {
+            'loads': 0,
+            'failed_loads': 0,
+            'swaps': 0
+        }
+
+    @classmethod
+    def get_instance(cls, model_dir: Optional[str] = None,
+                     feature_dimension: Optional[int] = None) -> 'VoicemailModelRegistry':
+        """Retorna a instância compartilhada pelo processo"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(model_dir=model_dir, feature_dimension=feature_dimension)
+
+        instance = cls._instance
+        if model_dir and not instance.model_dir:
+            instance.model_dir = model_dir
+        if feature_dimension and not instance.feature_dimension:
+            instance.feature_dimension = feature_dimension
+        return instance
+
+    def get_model(self):
+        """Modelo ativo (ou None); apenas leitura de referência, nunca bloqueia"""
+        entry = self.active
+        return entry['model'] if entry else None
+
+    @property
+    def version(self) -> Optional[str]:
+        """Versão do modelo ativo"""
+        entry = self.active
+        return entry['version'] if entry else None
+
+    def available_versions(self) -> List[Dict]:
+        """
+        Lista os modelos versionados do diretório, do mais antigo ao mais novo.
+
+        Returns:
+            List[Dict]: {'version', 'path'} de cada arquivo
+        """
+        if not self.model_dir or not os.path.isdir(self.model_dir):
+            return []
+
+        versions = []
+        for name in os.listdir(self.model_dir):
+            stem, extension = os.path.splitext(name)
+            if extension.lower() not in MODEL_EXTENSIONS:
+                continue
+            version = stem.split('-', 1)[1] if '-' in stem else stem
+            versions.append({'version': version, 'path': os.path.join(self.model_dir, name)})
+
+        return sorted(versions, key=lambda item: _version_key(item['version']))
+
+    def _read_model(self, path: str):
+        """Lê um modelo do disco conforme a extensão"""
+        if path.lower().endswith('.onnx'):
+            return OnnxModel(path)
+
+        import joblib
+        return joblib.load(path)
+
+    def _warm_up(self, model):
+        """
+        Valida o modelo com uma predição sobre um vetor neutro.
+
+        Raises:
+            ValueError: Se a saída não for uma probabilidade válida
+        """
+        dimension = self.feature_dimension or getattr(model, 'n_features_in_', None)
+        if not dimension:
+            raise ValueError("Dimensão das características desconhecida para o aquecimento")
+
+        sample = np.zeros((2, dimension), dtype=np.float32)
+        if hasattr(model, 'predict_proba'):
+            output = np.asarray(model.predict_proba(sample), dtype=float)
+            if output.ndim != 2 or output.shape[0] != 2 or output.shape[1] < 2:
+                raise ValueError(f"Saída inesperada de predict_proba: {output.shape}")
+        else:
+            output = np.asarray(model.predict(sample), dtype=float)
+            if output.shape[0] != 2:
+                raise ValueError(f"Saída inesperada de predict: {output.shape}")
+
+        if not np.all(np.isfinite(output)):
+            raise ValueError("Modelo produziu valores não finitos no aquecimento")
+
+    def register(self, model, version: str, path: Optional[str] = None) -> bool:
+        """
+        Valida e ativa um modelo já em memória (ex.: recém-treinado).
+
+        Args:
+            model: Modelo com predict_proba ou predict
+            version: Identificador da versão
+            path: Arquivo de origem, se houver
+
+        Returns:
+            bool: True se o modelo foi ativado
+        """
+        start = time.time()
+        try:
+            self._warm_up(model)
+        except Exception as e:
+            self.stats['failed_loads'] += 1
+            logger.error(f"Modelo {version} rejeitado no aquecimento: {str(e)}")
+            return False
+
+        entry = {
+            'model': model,
+            'version': version,
+            'path': path,
+            'loaded_at': time.time(),
+            'warmup_time': time.time() - start
+        }
+
+        # Troca atômica: análises em andamento continuam com a referência antiga
+        self.previous, self.active = self.active, entry
+        self.stats['swaps'] += 1
+        logger.info(f"Modelo de caixa postal ativo: versão {version}")
+        return True
+
+    def load(self, path: str, version: Optional[str] = None) -> bool:
+        """
+        Carrega, valida e ativa um modelo do disco. O carregamento acontece
+        na thread chamadora, sem bloquear quem usa o modelo ativo.
+
+        Args:
+            path: Arquivo .joblib/.pkl/.onnx
+            version: Identificador da versão (padrão: nome do arquivo)
+
+        Returns:
+            bool: True se o modelo foi ativado
+        """
+        version = version or os.path.splitext(os.path.basename(path))[0]
+
+        with self.load_lock:
+            entry = self.active
+            if entry and entry['path'] == path and entry['version'] == version:
+                return True
+
+            file_key = _file_key(path)
+            try:
+                model = self._read_model(path)
+                self.stats['loads'] += 1
+            except Exception as e:
+                # Erro de leitura (ex.: arquivo ainda sendo copiado) não rejeita a
+                # versão: a próxima verificação tenta de novo
+                self.stats['failed_loads'] += 1
+                logger.error(f"Erro ao carregar modelo {path}: {str(e)}")
+                return False
+
+            if not self.register(model, version, path):
+                self.rejected.add(file_key)
+                return False
+            return True
+
+    def refresh(self) -> bool:
+        """
+        Ativa a versão mais nova do diretório, se diferente da ativa.
+
+        Returns:
+            bool: True se houve troca de versão
+        """
+        versions = self.available_versions()
+        if not versions:
+            return False
+
+        # Arquivos reprovados no aquecimento não são tentados de novo até serem regravados
+        candidates = [item for item in versions if _file_key(item['path']) not in self.rejected]
+        if not candidates:
+            return False
+
+        latest = candidates[-1]
+        if self.active and self.active['version'] == latest['version']:
+            return False
+
+        return self.load(latest['path'], latest['version'])
+
+    def rollback(self) -> bool:
+        """Reativa a versão anterior"""
+        if not self.previous:
+            return False
+        self.active, self.previous = self.previous, self.active
+        self.stats['swaps'] += 1
+        logger.info(f"Modelo de caixa postal revertido para a versão {self.active['version']}")
+        return True
+
+    def start_watcher(self, interval: float = 60.0):
+        """Verifica periodicamente o diretório e ativa novas versões (idempotente)"""
+        if self.watching or not self.model_dir:
+            return
+
+        self.watching = True
+
+        def watch():
+            while self.watching:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Erro ao verificar novas versões de modelo: {str(e)}")
+
+        self.watcher = threading.Thread(target=watch, name='voicemail-model-watcher', daemon=True)
+        self.watcher.start()
+
+    def stop_watcher(self):
+        """Interrompe a verificação periódica"""
+        self.watching = False
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do registro"""
+        entry = self.active
+        stats = self.stats.copy()
+        stats['active_version'] = entry['version'] if entry else None
+        stats['loaded_at'] = entry['loaded_at'] if entry else None
+        stats['warmup_time'] = entry['warmup_time'] if entry else None
+        stats['model_dir'] = self.model_dir
+        return stats
@@ -0,0 +1,174 @@
+# backend/services/voicemail_phrases.py
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+def fold_char(char: str) -> str:
+    """
+    Normaliza um caractere: minúsculo, sem acentos; qualquer caractere que
+    não seja letra ou dígito vira espaço.
+    """
+    folded = ''.join(
+        c for c in unicodedata.normalize('NFKD', char.lower())
+        if not unicodedata.combining(c)
+    )
+    return folded if folded.isalnum() else ' '
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza um texto inteiro (minúsculo, sem acentos, espaços únicos)"""
+    return ' '.join(''.join(fold_char(c) for c in text).split())
+
+
+class PhraseMatcher:
+    """
+    Autômato Aho-Corasick compilado uma única vez sobre as frases de caixa
+    postal de todos os idiomas. Encontra todas as frases em uma só passada
+    pelo texto normalizado, com custo independente do número de frases.
+    """
+
+    def __init__(self, phrases_by_language: Dict[str, Iterable[str]]):
+        """
+        Compila o autômato.
+
+        Args:
+            phrases_by_language: Frases de caixa postal por código de idioma
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        self.phrase_count = 0
+
+        for language, phrases in phrases_by_language.items():
+            for phrase in phrases:
+                self._add(phrase, language)
+
+        self._build_failure_links()
+
+    def _add(self, phrase: str, language: str):
+        """Insere uma frase na trie (prefixada por espaço para exigir início de palavra)"""
+        normalized = normalize_text(phrase)
+        if not normalized:
+            return
+
+        state = 0
+        for char in ' ' + normalized:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+
+        self.outputs[state].append((phrase, language))
+        self.phrase_count += 1
+
+    def _build_failure_links(self):
+        """Calcula os links de falha em largura (BFS)"""
+        pending = deque()
+        for state in self.goto[0].values():
+            self.fail[state] = 0
+            pending.append(state)
+
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self.goto[state].items():
+                pending.append(next_state)
+
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                if self.fail[next_state] == next_state:
+                    self.fail[next_state] = 0
+
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def step(self, state: int, char: str) -> int:
+        """Avança o autômato em um caractere já normalizado"""
+        while state and char not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(char, 0)
+
+    def stream(self) -> 'PhraseStream':
+        """Cria um casamento incremental para transcrições parciais"""
+        return PhraseStream(self)
+
+    def match(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Encontra as frases presentes em um texto completo.
+
+        Returns:
+            List[Tuple[str, str]]: (frase, idioma) de cada frase encontrada
+        """
+        stream = self.stream()
+        stream.feed(text)
+        return stream.matches()
+
+
+class PhraseStream:
+    """
+    Estado incremental do casamento de frases. Recebe o texto em partes
+    (ou transcrições parciais cumulativas) sem reprocessar o que já foi visto.
+    """
+
+    def __init__(self, matcher: PhraseMatcher):
+        self.matcher = matcher
+        self.reset()
+
+    def reset(self):
+        """Reinicia o estado"""
+        self.state = 0
+        self.last_char = ' '
+        self.text = ''
+        # (idioma, frase) -> None: conjunto ordenado; a mesma frase pode
+        # estar cadastrada em mais de um idioma
+        self.found = {}
+        self.pending = []
+        # Início do texto equivale a uma fronteira de palavra
+        self.state = self.matcher.step(self.state, ' ')
+
+    def feed(self, chunk: str):
+        """Processa um novo trecho de texto (continuação do anterior)"""
+        self.text += chunk
+
+        for raw in chunk:
+            for char in fold_char(raw):
+                if char == ' ' and self.last_char == ' ':
+                    continue
+                self._consume(char)
+
+    def _consume(self, char: str):
+        """Consome um caractere normalizado e confirma/descarta frases pendentes"""
+        # Uma frase só conta se terminar em fronteira de palavra
+        if self.pending:
+            if char == ' ':
+                for phrase, language in self.pending:
+                    self.found[(language, phrase)] = None
+            self.pending = []
+
+        self.last_char = char
+        self.state = self.matcher.step(self.state, char)
+        if self.matcher.outputs[self.state]:
+            self.pending = list(self.matcher.outputs[self.state])
+
+    def update(self, transcript: str):
+        """
+        Atualiza com uma transcrição parcial cumulativa. Se a nova versão
+        apenas estende a anterior, somente o sufixo é processado.
+        """
+        if transcript.startswith(self.text):
+            self.feed(transcript[len(self.text):])
+        else:
+            self.reset()
+            self.feed(transcript)
+
+    def matches(self) -> List[Tuple[str, str]]:
+        """Frases encontradas até agora (o fim do texto conta como fronteira)"""
+        found = dict(self.found)
+        for phrase, language in self.pending:
+            found[(language, phrase)] = None
+        return [(phrase, language) for language, phrase in found]
@@ -0,0 +1,404 @@
+# backend/services/voip_ami.py
+import asyncio
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Prioridade de envio por action (menor = antes). Comandos que liberam ou
+# movem canais passam à frente de consultas de status na fila do socket
+PRIORITY_CONTROL = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_STATUS = 2
+
+ACTION_PRIORITY = {
+    'hangup': PRIORITY_CONTROL,
+    'redirect': PRIORITY_CONTROL,
+    'blindtransfer': PRIORITY_CONTROL,
+    'atxfer': PRIORITY_CONTROL,
+    'logoff': PRIORITY_CONTROL,
+    'coreshowchannel': PRIORITY_STATUS,
+    'coreshowchannels': PRIORITY_STATUS,
+    'status': PRIORITY_STATUS,
+    'getvar': PRIORITY_STATUS,
+    'ping': PRIORITY_STATUS,
+    'command': PRIORITY_STATUS
+}
+
+
+def action_priority(action: Dict) -> int:
+    """Prioridade padrão de uma action pelo nome"""
+    return ACTION_PRIORITY.get(str(action.get('Action', '')).lower(), PRIORITY_DEFAULT)
+
+
+class AMIError(Exception):
+    """Erro de protocolo ou de conexão com o AMI"""
+
+
+class _PendingAction:
+    """Action enviada aguardando resposta (e eventos, se for uma lista)"""
+
+    __slots__ = ('future', 'written', 'events', 'response')
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.written = False
+        self.events = None
+        self.response = None
+
+
+class AsyncAMIClient:
+    """
+    Cliente AMI (Asterisk Manager Interface) assíncrono.
+
+    Cada action recebe um ActionID e vira um future resolvido quando a
+    resposta correspondente chega, de modo que muitas actions ficam em voo
+    no mesmo socket sem que um chamador espere a resposta de outro. As
+    actions aguardam envio numa fila de prioridade com janela limitada de
+    actions em voo: desligamentos e transferências passam à frente de
+    consultas de status. Eventos são entregues aos manipuladores registrados;
+    a queda do socket é avisada aos manipuladores de desconexão.
+    """
+
+    def __init__(self, max_in_flight: int = 16, timeout: float = 10.0):
+        """
+        Inicializa o cliente.
+
+        Args:
+            max_in_flight: Máximo de actions enviadas aguardando resposta
+            timeout: Tempo limite padrão de resposta (s)
+        """
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+
+        self.reader = None
+        self.writer = None
+        self.queue = None
+        self.window = None
+        self.tasks = []
+        self.pending = {}
+        self.handlers = {}
+        self.disconnect_handlers = []
+        self.connected = False
+
+        self.action_prefix = f"{os.getpid():x}"
+        self.sequence = itertools.count(1)
+
+        self.stats = {
+            'actions': 0,
+            'responses': 0,
+            'events': 0,
+            'timeouts': 0
+        }
+
+    async def connect(self, host: str, port: int = 5038):
+        """Abre o socket e inicia as tarefas de leitura e escrita"""
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        banner = await self.reader.readline()
+        logger.info(f"AMI conectado: {banner.decode(errors='replace').strip()}")
+
+        self.queue = asyncio.PriorityQueue()
+        self.window = asyncio.Semaphore(self.max_in_flight)
+        self.connected = True
+        self.tasks = [
+            asyncio.ensure_future(self._read_loop()),
+            asyncio.ensure_future(self._write_loop())
+        ]
+
+    async def login(self, username: str, secret: str):
+        """
+        Autentica a sessão.
+
+        Raises:
+            AMIError: Se as credenciais forem recusadas
+        """
+        response = await self.send_action({
+            'Action': 'Login',
+            'Username': username,
+            'Secret': secret,
+            'Events': 'on'
+        }, priority=PRIORITY_CONTROL)
+        if response.get('Response') != 'Success':
+            raise AMIError(response.get('Message', 'Falha na autenticação AMI'))
+
+    def register_event(self, name: str, handler: Callable):
+        """Registra manipulador de evento (nome do evento ou '*' para todos)"""
+        self.handlers.setdefault(name, []).append(handler)
+
+    def register_disconnect(self, handler: Callable):
+        """Registra manipulador chamado como handler(erro, cliente) quando a conexão cai"""
+        self.disconnect_handlers.append(handler)
+
+    async def send_action(self, action: Dict, priority: Optional[int] = None,
+                          timeout: Optional[float] = None) -> Dict:
+        """
+        Enfileira uma action e aguarda a resposta.
+
+        Args:
+            action: Cabeçalhos da action ({'Action': ..., ...}); ActionID é gerado se ausente
+            priority: Prioridade de envio (padrão: pela action)
+            timeout: Tempo limite de resposta
+
+        Returns:
+            Dict: Cabeçalhos da resposta; actions em lista trazem 'events'
+        """
+        if not self.connected:
+            raise AMIError("AMI não conectado")
+
+        action = dict(action)
+        action_id = str(action.get('ActionID') or f"{self.action_prefix}-{next(self.sequence)}")
+        action['ActionID'] = action_id
+        if action_id in self.pending:
+            raise AMIError(f"ActionID duplicado: {action_id}")
+
+        pending = _PendingAction(asyncio.get_running_loop().create_future())
+        self.pending[action_id] = pending
+        self.stats['actions'] += 1
+
+        priority = action_priority(action) if priority is None else priority
+        self.queue.put_nowait((priority, next(self.sequence), action_id, self._encode(action)))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending.future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise AMIError(f"Tempo esgotado aguardando resposta de {action.get('Action')}")
+        finally:
+            self._finish(action_id)
+
+    def _finish(self, action_id: str):
+        """Remove a action pendente e libera sua vaga na janela"""
+        pending = self.pending.pop(action_id, None)
+        if pending is not None and pending.written:
+            self.window.release()
+        if pending is not None and not pending.future.done():
+            pending.future.cancel()
+
+    @staticmethod
+    def _encode(action: Dict) -> bytes:
+        """Serializa a action no formato 'Chave: valor' do AMI"""
+        lines = []
+        for key, value in action.items():
+            for item in (value if isinstance(value, (list, tuple)) else [value]):
+                lines.append(f"{key}: {item}")
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+    @staticmethod
+    def _decode(raw: bytes) -> Dict:
+        """Converte uma mensagem AMI em dict (cabeçalhos repetidos são unidos por linha)"""
+        message = {}
+        for line in raw.decode(errors='replace').split('\r\n'):
+            if not line:
+                continue
+            key, separator, value = line.partition(': ')
+            if not separator:
+                # Saída bruta de 'Response: Follows' (Asterisk antigo)
+                key, value = 'Output', line
+            if key in message:
+                message[key] = f"{message[key]}\n{value}"
+            else:
+                message[key] = value
+        return message
+
+    async def _write_loop(self):
+        """Envia actions por prioridade, respeitando a janela de actions em voo"""
+        try:
+            while True:
+                await self.window.acquire()
+                _, _, action_id, payload = await self.queue.get()
+
+                pending = self.pending.get(action_id)
+                if pending is None or pending.future.done():
+                    # Expirada ou cancelada antes do envio
+                    self.window.release()
+                    continue
+
+                pending.written = True
+                self.writer.write(payload)
+                await self.writer.drain()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Erro ao enviar para o AMI: {e}")
+            self._connection_lost(e)
+
+    async def _read_loop(self):
+        """Lê mensagens, resolve respostas pelo ActionID e despacha eventos"""
+        try:
+            while True:
+                raw = await self.reader.readuntil(b'\r\n\r\n')
+                self._dispatch(self._decode(raw[:-4]))
+        except asyncio.CancelledError:
+            pass
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logger.warning("Conexão AMI encerrada pelo servidor")
+            self._connection_lost(e)
+        except Exception as e:
+            logger.error(f"Erro ao ler do AMI: {e}")
+            self._connection_lost(e)
+
+    def _dispatch(self, message: Dict):
+        """Roteia uma mensagem recebida"""
+        action_id = message.get('ActionID')
+        pending = self.pending.get(action_id) if action_id else None
+
+        # Eventos também podem ter o cabeçalho Response (ex.: OriginateResponse)
+        if 'Event' not in message:
+            if pending is None:
+                return
+            self.stats['responses'] += 1
+            # Actions de lista: a resposta abre a lista e os eventos vêm em seguida
+            if message.get('EventList', '').lower() == 'start' and message.get('Response') == 'Success':
+                pending.response = message
+                pending.events = []
+                return
+            if not pending.future.done():
+                pending.future.set_result(message)
+            return
+
+        if pending is not None and pending.events is not None:
+            if message.get('EventList', '').lower() == 'complete':
+                result = dict(pending.response, events=pending.events)
+                if not pending.future.done():
+                    pending.future.set_result(result)
+            else:
+                pending.events.append(message)
+            return
+
+        name = message.get('Event')
+        if not name:
+            return
+        self.stats['events'] += 1
+        for handler in self.handlers.get(name, []) + self.handlers.get('*', []):
+            try:
+                handler(message, self)
+            except Exception as e:
+                logger.error(f"Erro no manipulador do evento {name}: {e}")
+
+    def _connection_lost(self, error: Exception):
+        """Falha todas as actions pendentes e avisa os manipuladores de desconexão"""
+        was_connected = self.connected
+        self.connected = False
+        for pending in list(self.pending.values()):
+            if not pending.future.done():
+                pending.future.set_exception(AMIError(f"Conexão AMI perdida: {error}"))
+
+        # Leitura e escrita podem falhar juntas: avisar uma única vez
+        if not was_connected:
+            return
+        for task in self.tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        if self.writer:
+            self.writer.close()
+        for handler in self.disconnect_handlers:
+            try:
+                handler(error, self)
+            except Exception as e:
+                logger.error(f"Erro no manipulador de desconexão: {e}")
+
+    async def close(self):
+        """Encerra a sessão (Logoff) e o socket"""
+        if self.connected:
+            try:
+                await self.send_action({'Action': 'Logoff'}, timeout=2)
+            except Exception:
+                pass
+        self.connected = False
+        for task in self.tasks:
+            task.cancel()
+        if self.writer:
+            self.writer.close()
+
+
+class AMIClient:
+    """
+    Fachada síncrona do AsyncAMIClient com a interface do pyst2 usada pelo
+    VoIPManager (connect, login, register_event, send_action, command,
+    logoff, close). O laço asyncio roda em uma thread própria; cada chamador
+    espera apenas a própria resposta, com todas as actions multiplexadas
+    no mesmo socket. Respostas são dicts.
+    """
+
+    def __init__(self, max_in_flight: int = 16, timeout: float = 10.0):
+        self.timeout = timeout
+        self.client = AsyncAMIClient(max_in_flight=max_in_flight, timeout=timeout)
+        self.loop = None
+        self.thread = None
+
+    @property
+    def connected(self) -> bool:
+        return self.client.connected
+
+    def _run(self, coroutine, timeout: Optional[float] = None):
+        """Executa uma corrotina no laço do cliente e aguarda o resultado"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(
+            (timeout or self.timeout) + 1.0
+        )
+
+    def connect(self, host: str, port: int = 5038):
+        """Inicia o laço asyncio e conecta ao AMI"""
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever, name='ami-client', daemon=True)
+            self.thread.start()
+        self._run(self.client.connect(host, int(port)))
+
+    def login(self, username: str, secret: str):
+        self._run(self.client.login(username, secret))
+
+    def register_event(self, name: str, handler: Callable):
+        """Manipuladores são chamados na thread do cliente como handler(evento, cliente)"""
+        self.client.register_event(name, handler)
+
+    def register_disconnect(self, handler: Callable):
+        """
+        Manipulador chamado na thread do cliente como handler(erro, cliente)
+        quando a conexão cai (não em close()), recebendo esta fachada.
+        Não deve bloquear.
+        """
+        self.client.register_disconnect(lambda error, client: handler(error, self))
+
+    def send_action(self, action: Dict, priority: Optional[int] = None,
+                    timeout: Optional[float] = None) -> Dict:
+        """Envia uma action e aguarda a resposta (bloqueia apenas o chamador)"""
+        return self._run(self.client.send_action(action, priority, timeout), timeout)
+
+    def send_action_async(self, action: Dict, priority: Optional[int] = None,
+                          timeout: Optional[float] = None) -> Future:
+        """Envia uma action sem aguardar; retorna um concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(
+            self.client.send_action(action, priority, timeout), self.loop
+        )
+
+    def command(self, command: str) -> Dict:
+        """Executa um comando de CLI do Asterisk"""
+        return self.send_action({'Action': 'Command', 'Command': command})
+
+    def logoff(self):
+        if self.client.connected:
+            try:
+                self.send_action({'Action': 'Logoff'}, timeout=2)
+            except Exception:
+                pass
+
+    def close(self):
+        """Encerra a conexão e o laço asyncio"""
+        if self.loop is None:
+            return
+        try:
+            self._run(self.client.close(), timeout=2)
+        except Exception as e:
+            logger.warning(f"Erro ao encerrar cliente AMI: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop = None
+
+    def get_stats(self) -> Dict:
+        stats = self.client.stats.copy()
+        stats['pending'] = len(self.client.pending)
+        return stats
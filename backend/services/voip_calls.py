@@ -0,0 +1,345 @@
+# backend/services/voip_calls.py
+import itertools
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Campos de registro indexados -> índice secundário correspondente
+_INDEXED_FIELDS = {
+    'channel': 'channel',
+    'provider_id': 'provider',
+    'call_uuid': 'provider'
+}
+
+# Nomes de chave usados pelo VoIPManager que diferem do atributo
+_KEY_ALIASES = {
+    'from': 'from_number',
+    'to': 'to_number'
+}
+
+# Estados finais de uma chamada (não voltam a mudar)
+TERMINAL_STATUSES = ('completed', 'failed', 'busy', 'no-answer', 'canceled')
+
+_NON_DIGITS = re.compile(r'\D')
+
+# IDs monotônicos compartilhados por todos os registros do processo
+# (vários troncos): prefixo único do processo + contador
+_ID_PREFIX = f"call_{int(time.time() * 1000):x}_{os.getpid():x}"
+_ID_COUNTER = itertools.count(1)
+
+
+def normalize_phone(number: Optional[str]) -> str:
+    """Normaliza um número para o índice (apenas dígitos: '+55 11 9...' == '55119...')"""
+    return _NON_DIGITS.sub('', number or '')
+
+
+class CallRecord:
+    """
+    Estado de uma chamada em andamento. Registro compacto (__slots__) com
+    interface de dicionário (get, [], update, setdefault) para os campos
+    usados pelo VoIPManager; campos eventuais ficam em `extra`.
+    Alterar um campo indexado (canal, IDs do provedor) atualiza os índices.
+    """
+
+    __slots__ = (
+        'registry', 'call_id', 'from_number', 'to_number', 'status',
+        'start_time', 'answer_time', 'end_time', 'last_event', 'variables',
+        'channel', 'channel_bound', 'uniqueid', 'provider_id', 'call_uuid',
+        'extra'
+    )
+
+    _FIELDS = frozenset(__slots__) - {'registry', 'extra'}
+
+    def __init__(self, registry: Optional['CallRegistry'], call_id: str, from_number: str = '',
+                 to_number: str = '', status: str = 'dialing', start_time: Optional[float] = None,
+                 variables: Optional[Dict] = None):
+        self.registry = registry
+        self.call_id = call_id
+        self.from_number = from_number
+        self.to_number = to_number
+        self.status = status
+        self.start_time = start_time or time.time()
+        self.answer_time = None
+        self.end_time = None
+        self.last_event = None
+        self.variables = variables or {}
+        self.channel = None
+        self.channel_bound = False
+        self.uniqueid = None
+        self.provider_id = None
+        self.call_uuid = None
+        self.extra = {}
+
+    def __getitem__(self, key: str):
+        attribute = _KEY_ALIASES.get(key, key)
+        if attribute in self._FIELDS:
+            value = getattr(self, attribute)
+            if value is None:
+                raise KeyError(key)
+            return value
+        return self.extra[key]
+
+    def __setitem__(self, key: str, value):
+        attribute = _KEY_ALIASES.get(key, key)
+        if attribute not in self._FIELDS:
+            self.extra[key] = value
+            return
+
+        old = getattr(self, attribute)
+        setattr(self, attribute, value)
+        if old == value or self.registry is None:
+            return
+        if attribute in _INDEXED_FIELDS:
+            self.registry._reindex(self, _INDEXED_FIELDS[attribute], old, value)
+        elif attribute == 'status':
+            self.registry._status_changed(self, old, value)
+
+    def __contains__(self, key: str) -> bool:
+        attribute = _KEY_ALIASES.get(key, key)
+        if attribute in self._FIELDS:
+            return getattr(self, attribute) is not None
+        return key in self.extra
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key: str, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, fields: Optional[Dict] = None, **kwargs):
+        for key, value in dict(fields or {}, **kwargs).items():
+            self[key] = value
+
+    def __repr__(self) -> str:
+        return f"CallRecord({self.call_id!r}, status={self.status!r})"
+
+    def to_dict(self) -> Dict:
+        """Cópia serializável do registro (formato dos webhooks e de get_call_status)"""
+        data = {
+            'call_id': self.call_id,
+            'from': self.from_number,
+            'to': self.to_number,
+            'status': self.status,
+            'start_time': self.start_time,
+            'variables': self.variables
+        }
+        for attribute in ('answer_time', 'end_time', 'last_event', 'channel', 'uniqueid',
+                          'provider_id', 'call_uuid'):
+            value = getattr(self, attribute)
+            if value is not None:
+                data[attribute] = value
+        if self.channel_bound:
+            data['channel_bound'] = True
+        data.update(self.extra)
+        return data
+
+
+class CallRegistry:
+    """
+    Registro de chamadas em andamento com índices secundários por canal,
+    ID do provedor (CallSid, RequestUUID, CallUUID) e número de telefone.
+    A localização por evento é O(1) independente do volume de chamadas.
+
+    Travas: `lock` protege o mapa principal e os índices (seções curtas);
+    mudanças de estado de uma chamada usam `lock_for(call_id)`, um de
+    vários locks distribuídos por hash, para não serializar chamadas distintas.
+    """
+
+    def __init__(self, stripes: int = 64):
+        """
+        Inicializa o registro.
+
+        Args:
+            stripes: Número de locks de estado distribuídos entre as chamadas
+        """
+        self.lock = threading.RLock()
+        self.stripes = [threading.RLock() for _ in range(max(1, stripes))]
+
+        self.calls = {}
+        self.channel_index = {}
+        self.provider_index = {}
+        self.phone_index = {}
+
+        # Chamadas em andamento (status não final), mantido a cada transição
+        self.active = 0
+
+        # Chamado com o registro a cada nova chamada e mudança de status
+        # (ex.: persistência); deve ser rápido, pode rodar sob o lock da chamada
+        self.listener = None
+
+    def new_id(self) -> str:
+        """Gera um ID de chamada único e crescente (único no processo)"""
+        return f"{_ID_PREFIX}_{next(_ID_COUNTER):08d}"
+
+    def lock_for(self, call_id: str) -> threading.RLock:
+        """Lock de estado da chamada"""
+        return self.stripes[hash(call_id) % len(self.stripes)]
+
+    def add(self, call_id: str, from_number: str = '', to_number: str = '',
+            status: str = 'dialing', variables: Optional[Dict] = None, **fields) -> CallRecord:
+        """
+        Registra uma chamada (substitui se o ID já existir).
+
+        Args:
+            call_id: ID da chamada
+            from_number: Número de origem
+            to_number: Número de destino
+            status: Status inicial
+            variables: Variáveis da chamada
+            **fields: Campos adicionais (channel, provider_id, ...)
+
+        Returns:
+            CallRecord: Registro criado
+        """
+        record = CallRecord(None, call_id, from_number, to_number, status, variables=variables)
+        record.update(fields)
+
+        with self.lock:
+            if call_id in self.calls:
+                self.remove(call_id)
+
+            self.calls[call_id] = record
+            if record.status not in TERMINAL_STATUSES:
+                self.active += 1
+            if record.channel:
+                self.channel_index.setdefault(record.channel, {})[call_id] = None
+            for provider_id in (record.provider_id, record.call_uuid):
+                if provider_id:
+                    self.provider_index[provider_id] = call_id
+            for number in (from_number, to_number):
+                phone = normalize_phone(number)
+                if phone:
+                    self.phone_index.setdefault(phone, {})[call_id] = None
+
+            # A partir daqui, alterações de campos indexados passam pelo registro
+            record.registry = self
+
+        if self.listener:
+            self.listener(record)
+        return record
+
+    def remove(self, call_id: str) -> Optional[CallRecord]:
+        """Remove uma chamada e suas entradas nos índices"""
+        with self.lock:
+            record = self.calls.pop(call_id, None)
+            if record is None:
+                return None
+
+            record.registry = None
+            if record.status not in TERMINAL_STATUSES:
+                self.active -= 1
+            self._discard(self.channel_index, record.channel, call_id)
+            for provider_id in (record.provider_id, record.call_uuid):
+                if provider_id and self.provider_index.get(provider_id) == call_id:
+                    del self.provider_index[provider_id]
+            for number in (record.from_number, record.to_number):
+                self._discard(self.phone_index, normalize_phone(number), call_id)
+            return record
+
+    @staticmethod
+    def _discard(index: Dict, key: Optional[str], call_id: str):
+        """Remove call_id do conjunto (ordenado) de uma chave do índice"""
+        if not key:
+            return
+        entries = index.get(key)
+        if entries is not None:
+            entries.pop(call_id, None)
+            if not entries:
+                del index[key]
+
+    def _status_changed(self, record: CallRecord, old: Optional[str], new: Optional[str]):
+        """Atualiza a contagem de chamadas em andamento e avisa o listener"""
+        was_active = old not in TERMINAL_STATUSES
+        is_active = new not in TERMINAL_STATUSES
+        if was_active != is_active:
+            with self.lock:
+                if self.calls.get(record.call_id) is record:
+                    self.active += 1 if is_active else -1
+        if self.listener:
+            self.listener(record)
+
+    def _reindex(self, record: CallRecord, index_name: str, old: Optional[str], new: Optional[str]):
+        """Atualiza um índice secundário após mudança de campo do registro"""
+        with self.lock:
+            if self.calls.get(record.call_id) is not record:
+                return
+            if index_name == 'channel':
+                self._discard(self.channel_index, old, record.call_id)
+                if new:
+                    self.channel_index.setdefault(new, {})[record.call_id] = None
+            else:
+                if old and self.provider_index.get(old) == record.call_id:
+                    del self.provider_index[old]
+                if new:
+                    self.provider_index[new] = record.call_id
+
+    def get(self, call_id: str, default=None) -> Optional[CallRecord]:
+        return self.calls.get(call_id, default)
+
+    def __getitem__(self, call_id: str) -> CallRecord:
+        return self.calls[call_id]
+
+    def __contains__(self, call_id: str) -> bool:
+        return call_id in self.calls
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    def pop(self, call_id: str, default=None) -> Optional[CallRecord]:
+        record = self.remove(call_id)
+        return default if record is None else record
+
+    def items(self) -> List[Tuple[str, CallRecord]]:
+        """Cópia da lista de chamadas, segura para iterar durante alterações"""
+        with self.lock:
+            return list(self.calls.items())
+
+    def __iter__(self) -> Iterator[str]:
+        with self.lock:
+            return iter(list(self.calls))
+
+    def by_channel(self, channel: str) -> Optional[CallRecord]:
+        """
+        Chamada de um canal AMI. Canais nomeados com sufixo (SIP/1000-0000002a)
+        casam com a chamada ainda não vinculada cujo canal é a base (SIP/1000)
+        somente se ela for a única: com várias chamadas pendentes na mesma base
+        (mesmo tronco) o evento é ambíguo e retorna None em vez de arriscar a
+        chamada errada. A localização principal é por Uniqueid/ActionID.
+        """
+        with self.lock:
+            entries = self.channel_index.get(channel)
+            if entries:
+                return self.calls.get(next(iter(entries)))
+
+            entries = self.channel_index.get(channel.rsplit('-', 1)[0])
+            if entries and len(entries) == 1:
+                record = self.calls.get(next(iter(entries)))
+                if record is not None and not record.channel_bound:
+                    return record
+        return None
+
+    def by_provider_id(self, provider_id: str) -> Optional[CallRecord]:
+        """Chamada por ID do provedor (CallSid, RequestUUID ou CallUUID)"""
+        with self.lock:
+            call_id = self.provider_index.get(provider_id)
+            return self.calls.get(call_id) if call_id else None
+
+    def by_phone(self, number: str) -> List[CallRecord]:
+        """Chamadas de/para um número de telefone"""
+        with self.lock:
+            entries = self.phone_index.get(normalize_phone(number), {})
+            return [self.calls[call_id] for call_id in entries if call_id in self.calls]
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Quantidade de chamadas por status"""
+        counts = {}
+        for _, record in self.items():
+            counts[record.status] = counts.get(record.status, 0) + 1
+        return counts
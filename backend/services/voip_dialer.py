@@ -0,0 +1,339 @@
+# backend/services/voip_dialer.py
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+
+from .voip_service import TERMINAL_STATUSES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Limitador de taxa (chamadas por segundo) com rajada limitada"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        # Começar com um único crédito: nenhuma rajada acima do CPS na partida
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+
+    def refill(self, rate: Optional[float] = None):
+        """Acumula créditos desde a última chamada (na taxa atual)"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * (self.rate if rate is None else rate))
+        self.updated = now
+
+    def take(self) -> bool:
+        """Consome um crédito, se houver"""
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class BulkDialer:
+    """
+    Discador em massa sobre VoIPManager.make_call, independente do provedor.
+
+    Coloca chamadas de uma lista de leads respeitando o limite de chamadas
+    por segundo (CPS) da operadora e o máximo de canais simultâneos. No modo
+    preditivo, a quantidade de chamadas em toque e a taxa de discagem são
+    ajustadas pela taxa de atendimento e pelo tempo médio de atendimento
+    (AHT) observados, para manter os agentes ocupados sem excesso de discagem.
+    """
+
+    def __init__(self, voip_manager, config: Optional[Dict] = None,
+                 result_callback: Optional[Callable[[Dict], None]] = None):
+        """
+        Inicializa o discador.
+
+        Args:
+            voip_manager: VoIPManager conectado
+            config: Configurações (calls_per_second, max_channels, predictive, agents, ...)
+            result_callback: Função chamada com o resultado de cada lead concluído
+        """
+        self.voip = voip_manager
+        self.config = config or {}
+        self.result_callback = result_callback
+
+        self.calls_per_second = float(self.config.get('calls_per_second', 1.0))
+        self.max_channels = int(self.config.get('max_channels', 10))
+        self.predictive = self.config.get('predictive', False)
+        self.agents = int(self.config.get('agents', self.max_channels))
+        self.min_answer_rate = self.config.get('min_answer_rate', 0.05)
+        self.min_samples = self.config.get('min_samples', 20)
+        self.smoothing = self.config.get('smoothing', 0.1)
+        self.tick_interval = self.config.get('tick_interval', 0.05)
+        self.default_from = self.config.get('from_number')
+        self.callback_url = self.config.get('callback_url')
+
+        # Rajada padrão: o que a taxa acumula em um ciclo do loop
+        self.bucket = TokenBucket(
+            self.calls_per_second,
+            self.config.get('burst', self.calls_per_second * self.tick_interval)
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.config.get('dial_workers', 8),
+            thread_name_prefix='dialer'
+        )
+
+        self.lock = threading.Lock()
+        self.leads = deque()
+        self.pending = 0
+        self.in_flight = {}
+        self.results = deque(maxlen=self.config.get('results_limit', 10000))
+
+        self.running = False
+        self.paused = False
+        self.thread = None
+
+        # Médias móveis exponenciais observadas nas chamadas concluídas
+        self.answer_rate = None
+        self.handle_time = None
+        self.ring_time = None
+        self.current_rate = self.calls_per_second
+
+        self.stats = {
+            'leads': 0,
+            'attempts': 0,
+            'dial_errors': 0,
+            'answered': 0,
+            'completed': 0,
+            'outcomes': {}
+        }
+
+    def add_leads(self, leads: List[Union[str, Dict]]) -> int:
+        """
+        Enfileira leads para discagem.
+
+        Args:
+            leads: Números ou dicts {'to', 'from', 'variables', 'callback_url', 'lead_id'}
+
+        Returns:
+            int: Leads aguardando discagem
+        """
+        with self.lock:
+            for lead in leads:
+                self.leads.append({'to': lead} if isinstance(lead, str) else dict(lead))
+            self.stats['leads'] += len(leads)
+            return len(self.leads)
+
+    def start(self):
+        """Inicia a discagem (idempotente)"""
+        if self.running:
+            return
+        self.running = True
+        self.paused = False
+        self.thread = threading.Thread(target=self._dial_loop, name='bulk-dialer', daemon=True)
+        self.thread.start()
+        logger.info(f"Discador iniciado: {self.calls_per_second} CPS, {self.max_channels} canais"
+                    f"{', modo preditivo' if self.predictive else ''}")
+
+    def pause(self):
+        """Suspende novas discagens (chamadas em andamento continuam)"""
+        self.paused = True
+
+    def resume(self):
+        """Retoma as discagens"""
+        self.paused = False
+
+    def stop(self, wait: bool = False):
+        """Encerra o discador; leads não discados permanecem na fila"""
+        self.running = False
+        if wait and self.thread:
+            self.thread.join()
+        self.executor.shutdown(wait=wait)
+
+    @property
+    def finished(self) -> bool:
+        """True quando não há leads na fila nem chamadas em andamento"""
+        with self.lock:
+            return not self.leads and not self.pending and not self.in_flight
+
+    def _dial_loop(self):
+        """Loop de cadência: coleta resultados, recalcula a taxa e disca"""
+        while self.running:
+            try:
+                self._collect_finished()
+
+                if not self.paused:
+                    counts = self._counts()
+                    rate, ringing_limit = self._pacing(counts)
+                    self.current_rate = rate
+                    self.bucket.refill(rate)
+
+                    # Limites de canais e de chamadas em toque, atualizados a cada discagem
+                    in_flight = counts['ringing'] + counts['answered']
+                    ringing = counts['ringing']
+                    while self.leads and in_flight < self.max_channels and \
+                            ringing < ringing_limit and self.bucket.take():
+                        with self.lock:
+                            lead = self.leads.popleft()
+                            self.pending += 1
+                        self.executor.submit(self._dial, lead)
+                        in_flight += 1
+                        ringing += 1
+
+                time.sleep(self.tick_interval)
+
+            except Exception as e:
+                logger.error(f"Erro no loop do discador: {e}")
+                time.sleep(1)
+
+    def _counts(self) -> Dict[str, int]:
+        """Chamadas do discador por fase (aguardando provedor, tocando, atendidas)"""
+        ringing = answered = 0
+        with self.lock:
+            call_ids = list(self.in_flight)
+            pending = self.pending
+        for call_id in call_ids:
+            call_info = self.voip.active_calls.get(call_id)
+            if call_info is None or call_info.get('status') in TERMINAL_STATUSES:
+                continue
+            if call_info.get('answer_time') or call_info.get('status') == 'in-progress':
+                answered += 1
+            else:
+                ringing += 1
+        return {'pending': pending, 'ringing': ringing + pending, 'answered': answered}
+
+    def _pacing(self, counts: Dict[str, int]):
+        """
+        Calcula a taxa de discagem e o limite de chamadas em toque.
+
+        Modo progressivo: taxa fixa (CPS) e limite de canais. Modo preditivo
+        (após min_samples resultados): mantém em toque as chamadas necessárias
+        para ocupar os agentes livres — e os que devem liberar durante o tempo
+        de toque — dado a taxa de atendimento; a taxa sobe para cobrir o déficit
+        e, no regime, fica em agentes / (AHT × taxa de atendimento).
+
+        Returns:
+            Tuple[float, int]: (chamadas por segundo, máximo de chamadas em toque)
+        """
+        if not self.predictive:
+            return self.calls_per_second, self.max_channels
+        if self.stats['completed'] < self.min_samples or not self.handle_time:
+            # Sem histórico suficiente: uma chamada por agente (progressivo)
+            return self.calls_per_second, max(0, self.agents - counts['answered'])
+
+        answer_rate = max(self.min_answer_rate, self.answer_rate or 1.0)
+        ring_time = max(self.ring_time or 1.0, 0.1)
+        handle_time = max(self.handle_time, 1.0)
+
+        # Agentes livres agora mais os que devem liberar durante o próximo toque
+        releasing = counts['answered'] * min(1.0, ring_time / handle_time)
+        free_agents = max(0.0, self.agents - counts['answered'] + releasing)
+        ringing_limit = int(math.ceil(free_agents / answer_rate))
+
+        steady_rate = self.agents / (handle_time * answer_rate)
+        deficit = max(0, ringing_limit - counts['ringing'])
+        rate = min(self.calls_per_second, max(steady_rate, deficit / ring_time))
+        return rate, ringing_limit
+
+    def _dial(self, lead: Dict):
+        """Coloca a chamada de um lead (executado no pool de discagem)"""
+        try:
+            from_number = lead.get('from') or self.default_from
+            success, call_id = self.voip.make_call(
+                from_number,
+                lead['to'],
+                callback_url=lead.get('callback_url') or self.callback_url,
+                variables=lead.get('variables')
+            )
+        except Exception as e:
+            logger.error(f"Erro ao discar para {lead.get('to')}: {e}")
+            success, call_id = False, ''
+
+        with self.lock:
+            self.pending -= 1
+            self.stats['attempts'] += 1
+            if success:
+                self.in_flight[call_id] = lead
+            else:
+                self.stats['dial_errors'] += 1
+
+        if not success:
+            self._record({'lead': lead, 'call_id': None, 'status': 'failed', 'answered': False})
+
+    def _collect_finished(self):
+        """Registra chamadas encerradas e atualiza as médias observadas"""
+        with self.lock:
+            call_ids = list(self.in_flight)
+
+        for call_id in call_ids:
+            call_info = self.voip.active_calls.get(call_id)
+            status = call_info.get('status') if call_info is not None else 'completed'
+            if status not in TERMINAL_STATUSES:
+                continue
+
+            with self.lock:
+                lead = self.in_flight.pop(call_id, None)
+            if lead is None:
+                continue
+
+            start_time = call_info.get('start_time') if call_info is not None else None
+            answer_time = call_info.get('answer_time') if call_info is not None else None
+            end_time = call_info.get('end_time') if call_info is not None else None
+            answered = answer_time is not None
+
+            result = {
+                'lead': lead,
+                'call_id': call_id,
+                'status': status,
+                'answered': answered,
+                'ring_time': (answer_time - start_time) if answered and start_time else None,
+                'handle_time': (end_time - answer_time) if answered and end_time else None
+            }
+            self._observe(result)
+            self._record(result)
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        """Atualiza uma média móvel exponencial"""
+        return value if current is None else current + self.smoothing * (value - current)
+
+    def _observe(self, result: Dict):
+        """Atualiza taxa de atendimento, tempo de toque e AHT"""
+        self.answer_rate = self._ewma(self.answer_rate, 1.0 if result['answered'] else 0.0)
+        if result['ring_time'] is not None:
+            self.ring_time = self._ewma(self.ring_time, result['ring_time'])
+        if result['handle_time'] is not None:
+            self.handle_time = self._ewma(self.handle_time, result['handle_time'])
+
+    def _record(self, result: Dict):
+        """Guarda o resultado e notifica o callback"""
+        with self.lock:
+            self.results.append(result)
+            self.stats['completed'] += 1
+            if result['answered']:
+                self.stats['answered'] += 1
+            outcomes = self.stats['outcomes']
+            outcomes[result['status']] = outcomes.get(result['status'], 0) + 1
+
+        if self.result_callback:
+            try:
+                self.result_callback(result)
+            except Exception as e:
+                logger.error(f"Erro no callback de resultado do discador: {e}")
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do discador"""
+        counts = self._counts()
+        with self.lock:
+            stats = dict(self.stats, outcomes=dict(self.stats['outcomes']))
+            stats['queued'] = len(self.leads)
+        stats.update({
+            'ringing': counts['ringing'],
+            'in_progress': counts['answered'],
+            'dial_rate': self.current_rate,
+            'answer_rate': self.answer_rate,
+            'average_handle_time': self.handle_time,
+            'average_ring_time': self.ring_time,
+            'predictive': self.predictive,
+            'running': self.running and not self.paused
+        })
+        return stats
@@ -0,0 +1,357 @@
+# backend/services/voip_persistence.py
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from .voip_calls import TERMINAL_STATUSES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Limite de parâmetros por consulta IN (SQLite aceita no mínimo 999)
+_QUERY_CHUNK = 500
+
+
+def _timestamp(value) -> Optional[datetime]:
+    """Converte epoch (time.time()) para o DateTime UTC usado nos modelos"""
+    return datetime.utcfromtimestamp(value) if value else None
+
+
+class CallStateStore:
+    """
+    Persistência write-behind do estado das chamadas na tabela `calls`.
+
+    Cada transição é primeiro anexada a um journal local (uma linha JSON,
+    sem esperar o banco) e marcada como pendente; transições da mesma chamada
+    entre dois ciclos se fundem em uma única linha. Uma thread grava as
+    pendências em lote (upsert em massa) a cada flush_interval, ou antes se
+    o lote atingir max_batch. A cada ciclo o journal é rotacionado em um
+    segmento, apagado somente após o commit: se o processo cair, os segmentos
+    restantes são reaplicados na próxima inicialização. Enquanto o banco
+    falha, nenhum segmento novo é criado e as tentativas seguem com espera
+    exponencial (até max_retry_delay).
+    """
+
+    def __init__(self, config: Optional[Dict] = None,
+                 session_factory: Optional[Callable] = None):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            config: Configurações (journal_path, flush_interval, max_batch, fsync,
+                    max_retry_delay)
+            session_factory: Fábrica de sessões SQLAlchemy (padrão: SessionLocal)
+        """
+        config = config or {}
+        self.journal_path = config.get('journal_path', 'voip_calls.journal')
+        self.flush_interval = config.get('flush_interval', 1.0)
+        self.max_batch = config.get('max_batch', 1000)
+        # Não ligar quando chamado na thread de eventos (ver record)
+        self.fsync = config.get('fsync', False)
+        self.max_retry_delay = config.get('max_retry_delay', 60.0)
+        self.session_factory = session_factory
+
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.segments = []
+        self.sequence = 0
+        self.journal = None
+
+        # Espera após falhas do banco (0 quando a última gravação funcionou)
+        self.retry_delay = 0.0
+        self.retry_at = 0.0
+
+        self.running = False
+        self.thread = None
+
+        self.stats = {
+            'journaled': 0,
+            'flushed': 0,
+            'batches': 0,
+            'errors': 0,
+            'recovered': 0
+        }
+
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+
+        if self.pending:
+            with self.condition:
+                self._start_writer()
+
+    def _segment_path(self, sequence: int) -> str:
+        return f"{self.journal_path}.{sequence:08d}"
+
+    def _recover(self):
+        """Recarrega transições de journals não gravados no banco (após queda)"""
+        segments = sorted(glob.glob(f"{glob.escape(self.journal_path)}.[0-9]*"))
+        for segment in segments:
+            try:
+                self.sequence = max(self.sequence, int(segment.rsplit('.', 1)[1]))
+            except ValueError:
+                continue
+            self.segments.append(segment)
+
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path):
+            self.sequence += 1
+            segment = self._segment_path(self.sequence)
+            os.replace(self.journal_path, segment)
+            self.segments.append(segment)
+
+        for segment in self.segments:
+            with open(segment, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última linha incompleta (queda durante a escrita)
+                        continue
+                    self.pending[entry['call']['call_id']] = (entry['scope'], entry['call'], {})
+                    self.stats['recovered'] += 1
+
+        if self.pending:
+            logger.info(f"Journal de chamadas: {len(self.pending)} chamadas pendentes recuperadas")
+
+    def record(self, record, scope: str = 'default', **context):
+        """
+        Registra uma transição de estado. Não acessa o banco.
+
+        O VoIPManager chama este método pelo listener do CallRegistry, sob a
+        trava da chamada e na thread de eventos AMI: a escrita no journal
+        (write + flush, para o cache do SO) acontece com a trava global, e
+        cada transição espera por ela. Com fsync ligado, cada evento também
+        espera o disco e todos os eventos da central ficam serializados nessa
+        espera; por isso fsync deve ficar desligado nesse uso. O journal
+        protege contra queda do processo, não contra queda da máquina.
+
+        Args:
+            record: CallRecord (ou dicionário no formato de to_dict)
+            scope: Identificação do gerenciador/tronco dono da chamada
+            **context: Dados persistidos junto com a chamada (ex.: callback_url)
+        """
+        snapshot = record.to_dict() if hasattr(record, 'to_dict') else dict(record)
+        snapshot.update(context)
+        line = json.dumps({'scope': scope, 'call': snapshot}, default=str)
+
+        with self.condition:
+            self.journal.write(line + '\n')
+            self.journal.flush()
+            if self.fsync:
+                os.fsync(self.journal.fileno())
+
+            # O lote usa o registro vivo: a gravação leva o estado mais recente
+            self.pending[snapshot['call_id']] = (scope, record, context)
+            self.stats['journaled'] += 1
+
+            if not self.running:
+                self._start_writer()
+            if len(self.pending) >= self.max_batch:
+                self.condition.notify()
+
+    def _start_writer(self):
+        """Inicia a thread de gravação (com a trava)"""
+        self.running = True
+        self.thread = threading.Thread(target=self._writer, name='call-store', daemon=True)
+        self.thread.start()
+
+    def _writer(self):
+        """Grava lotes a cada flush_interval até o encerramento"""
+        while True:
+            with self.condition:
+                if self.running:
+                    # Após falhas, esperar o backoff mesmo com o lote cheio
+                    backoff = self.retry_at - time.monotonic()
+                    if backoff > 0:
+                        self.condition.wait(timeout=backoff)
+                    elif len(self.pending) < self.max_batch:
+                        self.condition.wait(timeout=self.flush_interval)
+                running = self.running
+                if running and time.monotonic() < self.retry_at:
+                    continue
+
+            self.flush()
+            if not running:
+                return
+
+    def flush(self) -> bool:
+        """
+        Grava as transições pendentes em um único lote.
+
+        Returns:
+            bool: True se não restaram pendências
+        """
+        with self.condition:
+            if not self.pending:
+                return True
+            batch = self.pending
+            self.pending = {}
+
+            # Transições que chegarem durante a gravação vão para um novo segmento.
+            # Se um lote anterior falhou, seus segmentos continuam pendentes e
+            # o journal atual não é rotacionado: o lote refeito já contém tudo
+            # o que há nele, e as linhas ficam para a rotação seguinte
+            if not self.segments:
+                self.journal.close()
+                self.sequence += 1
+                segment = self._segment_path(self.sequence)
+                os.replace(self.journal_path, segment)
+                self.segments.append(segment)
+                self.journal = open(self.journal_path, 'a', encoding='utf-8')
+            committed_segments = list(self.segments)
+
+        try:
+            self._upsert([self._row(*item) for item in batch.values()])
+        except Exception as e:
+            with self.condition:
+                # Manter no lote seguinte o que não foi substituído por transição mais nova
+                for call_id, item in batch.items():
+                    self.pending.setdefault(call_id, item)
+                self.stats['errors'] += 1
+                self.retry_delay = min(self.max_retry_delay, self.retry_delay * 2 or self.flush_interval)
+                self.retry_at = time.monotonic() + self.retry_delay
+                retry_delay = self.retry_delay
+            logger.error(f"Erro ao gravar estado de {len(batch)} chamadas "
+                         f"(nova tentativa em {retry_delay:.1f}s): {e}")
+            return False
+
+        with self.condition:
+            self.retry_delay = 0.0
+            self.retry_at = 0.0
+            for segment in committed_segments:
+                self.segments.remove(segment)
+            self.stats['flushed'] += len(batch)
+            self.stats['batches'] += 1
+
+        for segment in committed_segments:
+            try:
+                os.remove(segment)
+            except OSError as e:
+                logger.warning(f"Falha ao remover segmento do journal {segment}: {e}")
+        return True
+
+    @staticmethod
+    def _row(scope: str, item, context: Dict) -> Dict:
+        """Linha da tabela `calls` para o estado de uma chamada"""
+        data = item.to_dict() if hasattr(item, 'to_dict') else dict(item)
+        data.update(context)
+        answer_time = data.get('answer_time')
+        end_time = data.get('end_time')
+        return {
+            'voip_call_id': data['call_id'],
+            'voip_scope': scope,
+            'direction': 'outbound',
+            'status': data.get('status'),
+            'from_number': data.get('from'),
+            'to_number': data.get('to'),
+            'provider_id': data.get('provider_id') or data.get('call_uuid'),
+            'start_time': _timestamp(data.get('start_time')),
+            'answer_time': _timestamp(answer_time),
+            'end_time': _timestamp(end_time),
+            'last_event': _timestamp(data.get('last_event')),
+            'duration': int(end_time - answer_time) if answer_time and end_time else None,
+            'call_data': json.dumps(data, default=str)
+        }
+
+    def _session(self):
+        if self.session_factory is None:
+            from backend.models.db import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def _upsert(self, rows: List[Dict]):
+        """Insere ou atualiza as linhas em massa, em uma única transação"""
+        from backend.models.db import Call
+
+        session = self._session()
+        try:
+            for start in range(0, len(rows), _QUERY_CHUNK):
+                chunk = rows[start:start + _QUERY_CHUNK]
+                existing = dict(
+                    session.query(Call.voip_call_id, Call.id)
+                    .filter(Call.voip_call_id.in_([row['voip_call_id'] for row in chunk]))
+                    .all()
+                )
+
+                updates, inserts = [], []
+                for row in chunk:
+                    if row['voip_call_id'] in existing:
+                        updates.append(dict(row, id=existing[row['voip_call_id']]))
+                    else:
+                        inserts.append(row)
+
+                if updates:
+                    session.bulk_update_mappings(Call, updates)
+                if inserts:
+                    session.bulk_insert_mappings(Call, inserts)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def load_active(self, scope: str = 'default') -> List[Dict]:
+        """
+        Chamadas em andamento gravadas por um gerenciador, para reconstruir
+        o registro após reinício. Inclui transições ainda só no journal.
+
+        Returns:
+            List[Dict]: Estados das chamadas (formato de CallRecord.to_dict)
+        """
+        from backend.models.db import Call
+
+        calls = {}
+        session = self._session()
+        try:
+            rows = session.query(Call.call_data).filter(
+                Call.voip_scope == scope,
+                Call.voip_call_id.isnot(None),
+                ~Call.status.in_(TERMINAL_STATUSES)
+            ).all()
+            for (call_data,) in rows:
+                data = json.loads(call_data)
+                calls[data['call_id']] = data
+        finally:
+            session.close()
+
+        # O journal é mais recente que o banco
+        with self.condition:
+            for call_id, (item_scope, item, context) in self.pending.items():
+                if item_scope != scope:
+                    continue
+                data = item.to_dict() if hasattr(item, 'to_dict') else dict(item)
+                data.update(context)
+                if data.get('status') in TERMINAL_STATUSES:
+                    calls.pop(call_id, None)
+                else:
+                    calls[call_id] = data
+
+        return list(calls.values())
+
+    def close(self, timeout: float = 5.0):
+        """Grava as pendências e encerra a thread de gravação"""
+        with self.condition:
+            running = self.running
+            self.running = False
+            self.condition.notify_all()
+        if running and self.thread:
+            self.thread.join(timeout)
+        else:
+            self.flush()
+        with self.condition:
+            self.journal.close()
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do armazenamento"""
+        with self.condition:
+            stats = self.stats.copy()
+            stats['pending'] = len(self.pending)
+            stats['segments'] = len(self.segments)
+        return stats
@@ -0,0 +1,260 @@
+# backend/services/voip_prompts.py
+import logging
+import os
+import threading
+import wave
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from .voicemail_cache import content_digest
+from .voicemail_dsp import decode_g711, encode_g711, parse_g711_wav, resample
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Versão das conversões; mudar gera novos arquivos (o digest inclui a versão)
+PROMPT_FORMAT_VERSION = 1
+
+# Taxa nativa da telefonia (G.711)
+PROMPT_SAMPLE_RATE = 8000
+
+# Extensões de payload G.711 sem cabeçalho
+_RAW_G711 = {
+    '.ulaw': 'ulaw',
+    '.ul': 'ulaw',
+    '.mu': 'ulaw',
+    '.alaw': 'alaw',
+    '.al': 'alaw'
+}
+
+
+def _load_samples(path: str) -> np.ndarray:
+    """
+    Decodifica um arquivo de áudio em float32 mono na taxa da telefonia.
+    WAV (PCM ou G.711) e G.711 cru são lidos diretamente; outros formatos
+    (ex.: MP3 dos serviços de TTS) usam o librosa.
+    """
+    law = _RAW_G711.get(os.path.splitext(path)[1].lower())
+    if law:
+        with open(path, 'rb') as f:
+            return decode_g711(f.read(), law)
+
+    with open(path, 'rb') as f:
+        audio_bytes = f.read()
+
+    parsed = parse_g711_wav(audio_bytes)
+    if parsed is None and audio_bytes[:4] == b'RIFF':
+        try:
+            with wave.open(path, 'rb') as wav:
+                width = wav.getsampwidth()
+                frames = wav.readframes(wav.getnframes())
+                dtype = {1: np.uint8, 2: '<i2', 4: '<i4'}.get(width)
+                if dtype is not None:
+                    data = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+                    data = (data - 128.0) / 128.0 if width == 1 else data / float(2 ** (8 * width - 1))
+                    if wav.getnchannels() > 1:
+                        data = data.reshape((-1, wav.getnchannels()))
+                    parsed = {'data': data, 'sample_rate': wav.getframerate()}
+        except wave.Error:
+            parsed = None
+
+    if parsed is None:
+        import librosa
+        data, sample_rate = librosa.load(path, sr=None, mono=True)
+        parsed = {'data': data, 'sample_rate': sample_rate}
+
+    samples = parsed['data']
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    return resample(samples.astype(np.float32), parsed['sample_rate'], PROMPT_SAMPLE_RATE)
+
+
+def _write_atomic(path: str, payload: bytes):
+    """Grava o arquivo de forma atômica (temporário + rename)"""
+    temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(payload)
+    os.replace(temp_file, path)
+
+
+def _wav_payload(samples: np.ndarray) -> bytes:
+    """WAV PCM 16 bits mono na taxa da telefonia"""
+    import io
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(PROMPT_SAMPLE_RATE)
+        wav.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+class PromptCache:
+    """
+    Cache de prompts de áudio pré-convertidos para o formato nativo de
+    cada provedor, endereçado pelo conteúdo do arquivo de origem.
+
+    Cada áudio é decodificado uma única vez e gravado como G.711 8 kHz
+    (.ulaw e .alaw, com o mesmo nome) em asterisk_sounds_dir — que o Asterisk
+    precisa enxergar; ele escolhe o arquivo do codec do canal sem
+    transcodificar — e como WAV 8 kHz em media_dir, o diretório publicado em
+    media_base_url para Twilio/Plivo. Cada saída só é usada se o respectivo
+    diretório estiver configurado; sem ele, o caminho ou URL original do
+    áudio continua valendo. Os arquivos persistem entre reinícios: um digest
+    já convertido é reutilizado.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Inicializa o cache.
+
+        Args:
+            config: asterisk_sounds_dir, media_dir (servido em media_base_url),
+                    media_base_url
+        """
+        config = config or {}
+        self.asterisk_dir = config.get('asterisk_sounds_dir')
+        self.media_base_url = (config.get('media_base_url') or '').rstrip('/')
+        # A URL do WAV só existe se o diretório de mídia for o publicado na URL base
+        self.media_dir = config.get('media_dir') if self.media_base_url else None
+
+        self.lock = threading.Lock()
+        self.convert_locks = {}
+        self.sources = {}
+        self.entries = {}
+
+        self.stats = {
+            'hits': 0,
+            'conversions': 0,
+            'errors': 0
+        }
+
+    def _digest(self, audio_file: str) -> str:
+        """Digest do conteúdo, memorizado por (caminho, tamanho, mtime)"""
+        stat = os.stat(audio_file)
+        key = (os.path.abspath(audio_file), stat.st_size, stat.st_mtime_ns)
+        digest = self.sources.get(key)
+        if digest is None:
+            digest = f"{content_digest(audio_file)}v{PROMPT_FORMAT_VERSION}"
+            with self.lock:
+                self.sources[key] = digest
+        return digest
+
+    @property
+    def enabled(self) -> bool:
+        """Algum diretório de saída configurado"""
+        return bool(self.asterisk_dir or self.media_dir)
+
+    def _paths(self, digest: str) -> Dict[str, str]:
+        """Arquivos convertidos, apenas dos diretórios configurados"""
+        paths = {}
+        if self.asterisk_dir:
+            paths['ulaw'] = os.path.join(self.asterisk_dir, f"{digest}.ulaw")
+            paths['alaw'] = os.path.join(self.asterisk_dir, f"{digest}.alaw")
+        if self.media_dir:
+            paths['wav'] = os.path.join(self.media_dir, f"{digest}.wav")
+        return paths
+
+    def prepare(self, audio_file: str) -> Optional[Dict]:
+        """
+        Garante as versões convertidas de um áudio.
+
+        Args:
+            audio_file: Arquivo de origem (MP3, WAV, G.711...)
+
+        Returns:
+            Optional[Dict]: {'digest', 'asterisk_file' (sem extensão), 'wav', 'url'},
+                            com None nas saídas não configuradas, ou None se
+                            nenhuma estiver configurada ou a conversão falhar
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            digest = self._digest(audio_file)
+            entry = self.entries.get(digest)
+            if entry is not None:
+                self.stats['hits'] += 1
+                return entry
+
+            with self.lock:
+                convert_lock = self.convert_locks.setdefault(digest, threading.Lock())
+
+            # Apenas uma thread converte cada áudio; as demais aguardam o resultado
+            with convert_lock:
+                entry = self.entries.get(digest)
+                if entry is not None:
+                    self.stats['hits'] += 1
+                    return entry
+
+                paths = self._paths(digest)
+                if not all(os.path.exists(path) for path in paths.values()):
+                    self._convert(audio_file, paths)
+                    self.stats['conversions'] += 1
+
+                entry = {
+                    'digest': digest,
+                    'asterisk_file': os.path.splitext(paths['ulaw'])[0] if 'ulaw' in paths else None,
+                    'wav': paths.get('wav'),
+                    'url': f"{self.media_base_url}/{digest}.wav" if 'wav' in paths else None
+                }
+                self.entries[digest] = entry
+
+            with self.lock:
+                self.convert_locks.pop(digest, None)
+            return entry
+
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Erro ao preparar prompt {audio_file}: {e}")
+            return None
+
+    def _convert(self, audio_file: str, paths: Dict[str, str]):
+        """Decodifica uma vez e grava todos os formatos"""
+        samples = _load_samples(audio_file)
+
+        # Evitar saturação na codificação G.711
+        peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+        if peak > 1.0:
+            samples = samples / peak
+
+        if self.asterisk_dir:
+            os.makedirs(self.asterisk_dir, exist_ok=True)
+            _write_atomic(paths['ulaw'], encode_g711(samples, 'ulaw'))
+            _write_atomic(paths['alaw'], encode_g711(samples, 'alaw'))
+        if self.media_dir:
+            os.makedirs(self.media_dir, exist_ok=True)
+            _write_atomic(paths['wav'], _wav_payload(samples))
+
+        logger.info(f"Prompt convertido: {audio_file} ({len(samples) / PROMPT_SAMPLE_RATE:.1f}s)")
+
+    def asterisk_file(self, audio_file: str) -> Optional[str]:
+        """Caminho (sem extensão) para a action Playback; None sem asterisk_sounds_dir"""
+        if not self.asterisk_dir:
+            return None
+        entry = self.prepare(audio_file)
+        return entry['asterisk_file'] if entry else None
+
+    def media_url(self, audio_file: str) -> Optional[str]:
+        """URL pública do WAV convertido (Twilio/Plivo); None sem media_dir"""
+        if not self.media_dir:
+            return None
+        entry = self.prepare(audio_file)
+        return entry['url'] if entry else None
+
+    def warm(self, audio_files: Iterable[str]) -> int:
+        """
+        Converte antecipadamente os prompts de uma campanha.
+
+        Returns:
+            int: Quantidade de prompts prontos
+        """
+        return sum(1 for audio_file in audio_files if self.prepare(audio_file))
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do cache"""
+        stats = self.stats.copy()
+        stats['prompts'] = len(self.entries)
+        return stats
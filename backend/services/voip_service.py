@@ -5,37 +5,119 @@ import logging
 import threading
 import time
 from typing import Dict, List, Optional, Tuple, Union
-import requests
+from urllib.parse import urlencode
+
+from .voip_ami import AMIClient
+from .voip_calls import TERMINAL_STATUSES, CallRecord, CallRegistry
+from .voip_persistence import CallStateStore
+from .voip_prompts import PromptCache
+from .voip_webhooks import WebhookDispatcher
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Resultado do evento DialEnd do Asterisk -> status da chamada
+ASTERISK_DIAL_STATUS = {
+    'ANSWER': 'in-progress',
+    'BUSY': 'busy',
+    'NOANSWER': 'no-answer',
+    'CANCEL': 'canceled',
+    'CONGESTION': 'failed',
+    'CHANUNAVAIL': 'failed',
+    'DONTCALL': 'failed',
+    'TORTURE': 'failed',
+    'INVALIDARGS': 'failed'
+}
+
+# Motivo de falha do OriginateResponse (Reason) -> status da chamada
+ASTERISK_ORIGINATE_REASON = {
+    '1': 'failed',      # Desligada antes de atender
+    '3': 'no-answer',   # Tempo de toque esgotado
+    '5': 'busy',
+    '8': 'failed'       # Congestionamento
+}
+
+# Status de callbacks de provedores que diferem do vocabulário interno
+PROVIDER_STATUS_ALIASES = {
+    'queued': 'dialing',
+    'initiated': 'dialing',
+    'answered': 'in-progress',
+    'timeout': 'no-answer',
+    'cancel': 'canceled',
+    'hangup': 'completed'
+}
+
 class VoIPManager:
     """
     Gerenciador de conexões VoIP com suporte para vários provedores.
     Suporta Asterisk, Twilio, Plivo, e configurações SIP personalizadas.
     """
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, webhooks: Optional[WebhookDispatcher] = None,
+                 call_store: Optional[CallStateStore] = None):
         """
         Inicializa o gerenciador VoIP com a configuração fornecida.
         
         Args:
             config: Dicionário com configurações do serviço VoIP
+            webhooks: Despachante de webhooks compartilhado (ex.: entre troncos)
+            call_store: Persistência de chamadas compartilhada (ex.: entre troncos)
         """
         self.voip_type = config.get('type', 'asterisk')
         self.config = config
         self.connection = None
         self.status = "disconnected"
         self.extensions = {}
-        self.active_calls = {}
+        self.active_calls = CallRegistry(config.get('call_lock_stripes', 64))
+
+        # Prompts pré-convertidos para o formato nativo de cada provedor
+        self.prompts = PromptCache(config)
         self.call_callbacks = {}
         self.monitor_thread = None
         self.connected = False
         
+        # Reconexão automática quando o socket AMI cai
+        self.reconnect_delay = config.get('reconnect_delay', 5)
+        self.reconnect_max_delay = config.get('reconnect_max_delay', 60)
+        self.reconnect_lock = threading.Lock()
+        self.reconnect_thread = None
+        self.closed = False
+        
+        # O estado das chamadas é atualizado por eventos (AMI e callbacks de
+        # provedores); a consulta ativa é só uma varredura lenta de reconciliação
+        self.status_callback_url = config.get('status_callback_url')
+        self.reconcile_interval = config.get('reconcile_interval', 300)
+        self.reconcile_stale_after = config.get('reconcile_stale_after', 120)
+        self.completed_call_ttl = config.get('completed_call_ttl', 300)
+        
+        # Webhooks são entregues em segundo plano; eventos nunca esperam a rede
+        self.webhooks = webhooks or WebhookDispatcher(config.get('webhooks'))
+        self.owns_webhooks = webhooks is None
+        
+        # Estado das chamadas gravado em segundo plano (journal local + lotes no banco),
+        # opcional (persist_calls). As chamadas em andamento de uma execução
+        # anterior são recarregadas em initialize_connection, não aqui
+        self.call_scope = config.get('name') or self.voip_type
+        self.call_store = call_store
+        self.owns_call_store = False
+        self.calls_restored = False
+        if self.call_store is None and config.get('persist_calls', False):
+            try:
+                # Um journal por escopo: gerenciadores do mesmo processo não
+                # rotacionam o journal um do outro
+                store_config = dict({'journal_path': f"voip_calls-{self.call_scope}.journal"},
+                                    **(config.get('call_store') or {}))
+                self.call_store = CallStateStore(store_config)
+                self.owns_call_store = True
+            except Exception as e:
+                logger.error(f"Persistência de chamadas indisponível: {e}")
+        
+        # Cliente AMI: 'async' (ActionID + futures, sem dependências) ou 'pyst2'
+        self.ami_client = config.get('ami_client', 'async')
+        
         # Carregar adaptadores específicos
-        if self.voip_type == 'asterisk':
+        if self.voip_type == 'asterisk' and self.ami_client == 'pyst2':
             try:
                 import asterisk.manager
                 self.asterisk = asterisk.manager
@@ -57,6 +139,8 @@ class VoIPManager:
         Returns:
             bool: True se a conexão for bem-sucedida, False caso contrário
         """
+        self._start_persistence()
+        
         if self.voip_type == 'asterisk':
             return self._connect_asterisk()
         elif self.voip_type == 'twilio':
@@ -71,6 +155,7 @@ class VoIPManager:
     
     def _connect_asterisk(self) -> bool:
         """Conecta ao servidor Asterisk"""
+        manager = None
         try:
             # Parâmetros de conexão
             host = self.config.get('host', 'localhost')
@@ -78,17 +163,33 @@ class VoIPManager:
             username = self.config.get('username', 'admin')
             password = self.config.get('password', 'admin')
             
+            if self.ami_client == 'pyst2':
+                manager = self.asterisk.Manager()
+            else:
+                manager = AMIClient(
+                    max_in_flight=self.config.get('ami_max_in_flight', 16),
+                    timeout=self.config.get('ami_timeout', 10)
+                )
+            
+            # Registrar eventos que mantêm o estado das chamadas
+            manager.register_event('OriginateResponse', self._on_asterisk_originate_response)
+            manager.register_event('Newstate', self._on_asterisk_newstate)
+            manager.register_event('DialBegin', self._on_asterisk_dial_begin)
+            manager.register_event('DialEnd', self._on_asterisk_dial_end)
+            manager.register_event('BridgeEnter', self._on_asterisk_bridge_enter)
+            manager.register_event('Hangup', self._on_asterisk_hangup)
+            
+            # Queda do socket: marcar desconectado e reconectar em segundo plano
+            if hasattr(manager, 'register_disconnect'):
+                manager.register_disconnect(self._on_asterisk_disconnect)
+            else:
+                manager.register_event('Shutdown', self._on_asterisk_disconnect)
+            
             # Iniciar conexão
             logger.info(f"Conectando ao Asterisk em {host}:{port}...")
-            manager = self.asterisk.Manager()
             manager.connect(host, port)
             manager.login(username, password)
             
-            # Registrar evento de desconexão
-            manager.register_event('Hangup', self._on_asterisk_hangup)
-            manager.register_event('DialBegin', self._on_asterisk_dial_begin)
-            manager.register_event('DialEnd', self._on_asterisk_dial_end)
-            
             # Guardar conexão
             self.connection = manager
             self.status = "connected"
@@ -103,8 +204,57 @@ class VoIPManager:
         except Exception as e:
             logger.error(f"Erro ao conectar ao Asterisk: {e}")
             self.status = f"error: {str(e)}"
+            # Não deixar o laço do cliente de uma tentativa falha rodando
+            if isinstance(manager, AMIClient):
+                manager.close()
             return False
     
+    def _on_asterisk_disconnect(self, error=None, manager=None):
+        """Conexão AMI perdida (chamado na thread do cliente; não bloqueia)"""
+        if self.closed or (manager is not None and manager is not self.connection):
+            return
+        
+        logger.warning(f"Conexão com Asterisk perdida: {error}")
+        self.connected = False
+        self.status = "reconnecting"
+        
+        with self.reconnect_lock:
+            if self.reconnect_thread and self.reconnect_thread.is_alive():
+                return
+            self.reconnect_thread = threading.Thread(
+                target=self._reconnect_loop,
+                name='ami-reconnect',
+                daemon=True
+            )
+            self.reconnect_thread.start()
+    
+    @property
+    def reconnecting(self) -> bool:
+        """Reconexão automática em andamento"""
+        return bool(self.reconnect_thread and self.reconnect_thread.is_alive())
+    
+    def _reconnect_loop(self):
+        """Tenta reconectar com espera exponencial até conseguir ou o gerenciador ser encerrado"""
+        delay = self.reconnect_delay
+        
+        while not self.closed and not self.connected:
+            time.sleep(delay)
+            if self.closed:
+                return
+            
+            old_connection, self.connection = self.connection, None
+            if old_connection:
+                try:
+                    old_connection.close()
+                except Exception as e:
+                    logger.warning(f"Erro ao descartar conexão AMI anterior: {e}")
+            
+            if self._connect_asterisk():
+                # Eventos perdidos durante a queda são corrigidos pela reconciliação
+                logger.info("Reconectado ao Asterisk")
+                return
+            delay = min(delay * 2, self.reconnect_max_delay)
+    
     def _connect_twilio(self) -> bool:
         """Configura conexão com API Twilio"""
         try:
@@ -136,6 +286,9 @@ class VoIPManager:
             self.status = "connected"
             self.connected = True
             
+            # Iniciar reconciliação (o estado chega pelos callbacks de status)
+            self._start_monitor()
+            
             logger.info("Conexão com Twilio estabelecida")
             return True
             
@@ -175,6 +328,9 @@ class VoIPManager:
             self.status = "connected"
             self.connected = True
             
+            # Iniciar reconciliação (o estado chega pelos callbacks de status)
+            self._start_monitor()
+            
             logger.info("Conexão com Plivo estabelecida")
             return True
             
@@ -316,7 +472,7 @@ class VoIPManager:
                 
             # Preparar variáveis
             call_vars = variables or {}
-            call_id = f"call_{int(time.time())}_{hash(from_number + to_number) % 10000}"
+            call_id = self.active_calls.new_id()
             
             # Registrar callback se fornecido
             if callback_url:
@@ -357,9 +513,12 @@ class VoIPManager:
             timeout = 30000  # 30 segundos
             caller_id = variables.get('caller_id', from_number)
             
-            # Preparar action de Originate
+            # Preparar action de Originate. O ActionID volta no OriginateResponse
+            # e o ChannelId vira o Uniqueid do canal, presente em todos os eventos
             action = {
                 'Action': 'Originate',
+                'ActionID': call_id,
+                'ChannelId': call_id,
                 'Channel': channel,
                 'Exten': exten,
                 'Priority': priority,
@@ -374,27 +533,23 @@ class VoIPManager:
             if context:
                 action['Context'] = context
                 
+            # Guardar informações da chamada antes do envio: os eventos do
+            # canal podem chegar antes da resposta do Originate
+            self.active_calls.add(call_id, from_number, to_number, variables=variables, channel=channel)
+            
             # Enviar comando
             response = self.connection.send_action(action)
             
             if response.get('Response') == 'Success':
-                # Guardar informações da chamada
-                self.active_calls[call_id] = {
-                    'from': from_number,
-                    'to': to_number,
-                    'status': 'dialing',
-                    'start_time': time.time(),
-                    'variables': variables,
-                    'channel': channel
-                }
-                
                 logger.info(f"Chamada {call_id} iniciada de {from_number} para {to_number}")
                 return True, call_id
             else:
+                self.active_calls.remove(call_id)
                 logger.error(f"Falha ao iniciar chamada: {response.get('Message', 'Erro desconhecido')}")
                 return False, ""
                 
         except Exception as e:
+            self.active_calls.remove(call_id)
             logger.error(f"Erro ao fazer chamada via Asterisk: {e}")
             return False, ""
     
@@ -413,30 +568,27 @@ class VoIPManager:
             if not to_number.startswith('+'):
                 to_number = '+' + to_number
             
+            # Guardar informações da chamada antes da criação: os callbacks de
+            # status (initiated, ringing ou uma falha rápida) podem chegar antes
+            # do retorno, e são localizados pelo call_id da URL
+            call_info = self.active_calls.add(call_id, from_number, to_number, variables=variables)
+            
             # Iniciar chamada
             call = client.calls.create(
                 to=to_number,
                 from_=from_number,
                 url=callback_url or self.config.get('default_twiml_url'),
-                status_callback=callback_url,
+                status_callback=self._status_callback_for(call_id) or callback_url,
                 status_callback_event=['initiated', 'ringing', 'answered', 'completed'],
                 status_callback_method='POST'
             )
-            
-            # Guardar informações da chamada
-            self.active_calls[call_id] = {
-                'from': from_number,
-                'to': to_number,
-                'status': 'dialing',
-                'start_time': time.time(),
-                'variables': variables,
-                'provider_id': call.sid
-            }
+            call_info.setdefault('provider_id', call.sid)
             
             logger.info(f"Chamada {call_id} iniciada via Twilio de {from_number} para {to_number}")
             return True, call_id
             
         except Exception as e:
+            self.active_calls.remove(call_id)
             logger.error(f"Erro ao fazer chamada via Twilio: {e}")
             return False, ""
     
@@ -448,6 +600,20 @@ class VoIPManager:
             # Preparar cliente Plivo
             client = self.connection
             
+            # Callbacks de status (toque e desligamento) alimentam o estado da chamada
+            status_urls = {}
+            status_callback = self._status_callback_for(call_id)
+            if status_callback:
+                status_urls = {
+                    'ring_url': status_callback,
+                    'ring_method': 'POST',
+                    'hangup_url': status_callback,
+                    'hangup_method': 'POST'
+                }
+            
+            # Guardar informações da chamada antes da criação (callbacks adiantados)
+            call_info = self.active_calls.add(call_id, from_number, to_number, variables=variables)
+            
             # Iniciar chamada
             response = client.calls.create(
                 from_=from_number,
@@ -455,32 +621,32 @@ class VoIPManager:
                 answer_url=callback_url or self.config.get('default_answer_url'),
                 answer_method='POST',
                 callback_url=callback_url,
-                callback_method='POST'
+                callback_method='POST',
+                **status_urls
             )
             
             if response.get('message') == 'call fired':
-                plivo_call_id = response.get('request_uuid')
-                
-                # Guardar informações da chamada
-                self.active_calls[call_id] = {
-                    'from': from_number,
-                    'to': to_number,
-                    'status': 'dialing',
-                    'start_time': time.time(),
-                    'variables': variables,
-                    'provider_id': plivo_call_id
-                }
+                call_info.setdefault('provider_id', response.get('request_uuid'))
                 
                 logger.info(f"Chamada {call_id} iniciada via Plivo de {from_number} para {to_number}")
                 return True, call_id
             else:
+                self.active_calls.remove(call_id)
                 logger.error(f"Falha ao iniciar chamada Plivo: {response.get('error')}")
                 return False, ""
                 
         except Exception as e:
+            self.active_calls.remove(call_id)
             logger.error(f"Erro ao fazer chamada via Plivo: {e}")
             return False, ""
     
+    def _status_callback_for(self, call_id: str) -> Optional[str]:
+        """status_callback_url com o ID interno da chamada na query (?call_id=...)"""
+        if not self.status_callback_url:
+            return None
+        separator = '&' if '?' in self.status_callback_url else '?'
+        return f"{self.status_callback_url}{separator}{urlencode({'call_id': call_id})}"
+    
     def _make_custom_call(self, call_id: str, from_number: str, 
                          to_number: str, variables: Dict) -> Tuple[bool, str]:
         """Inicia chamada via sistema SIP personalizado"""
@@ -488,13 +654,7 @@ class VoIPManager:
         # Este é um placeholder
         
         # Guardar informações da chamada
-        self.active_calls[call_id] = {
-            'from': from_number,
-            'to': to_number,
-            'status': 'dialing',
-            'start_time': time.time(),
-            'variables': variables
-        }
+        self.active_calls.add(call_id, from_number, to_number, variables=variables)
         
         logger.info(f"Chamada {call_id} iniciada via SIP de {from_number} para {to_number}")
         return True, call_id
@@ -760,8 +920,7 @@ class VoIPManager:
             call = client.calls(provider_id).update(status='completed')
             
             # Atualizar informações da chamada
-            self.active_calls[call_id]['status'] = 'completed'
-            self.active_calls[call_id]['end_time'] = time.time()
+            self._provider_hangup_requested(call_id)
             
             logger.info(f"Chamada {call_id} encerrada")
             return True
@@ -788,8 +947,7 @@ class VoIPManager:
             response = client.calls.hangup(call_uuid=provider_id)
             
             # Atualizar informações da chamada
-            self.active_calls[call_id]['status'] = 'completed'
-            self.active_calls[call_id]['end_time'] = time.time()
+            self._provider_hangup_requested(call_id)
             
             logger.info(f"Chamada {call_id} encerrada")
             return True
@@ -798,6 +956,22 @@ class VoIPManager:
             logger.error(f"Erro ao encerrar chamada via Plivo: {e}")
             return False
     
+    def _provider_hangup_requested(self, call_id: str):
+        """
+        Estado após pedir o desligamento ao Twilio/Plivo. Com callbacks de
+        status, a chamada fica em 'hangup-requested' (não final) e o callback
+        'completed' do provedor a encerra com duração e horários; sem eles,
+        o encerramento local é a única notificação.
+        """
+        if self.status_callback_url:
+            with self.active_calls.lock_for(call_id):
+                call_info = self.active_calls.get(call_id)
+                if call_info is not None and call_info['status'] not in TERMINAL_STATUSES:
+                    call_info['last_event'] = time.time()
+                    call_info['status'] = 'hangup-requested'
+        else:
+            self._update_call_state(call_id, 'completed', event_type='hangup')
+    
     def _hangup_custom_call(self, call_id: str) -> bool:
         """Encerra chamada via sistema SIP personalizado"""
         # Implementação específica para seu sistema SIP
@@ -976,14 +1150,14 @@ class VoIPManager:
             
             # Tentar obter status atualizado do provedor
             if self.voip_type == 'asterisk':
-                return self._get_asterisk_call_status(call_id)
+                call_info = self._get_asterisk_call_status(call_id)
             elif self.voip_type == 'twilio':
-                return self._get_twilio_call_status(call_id)
+                call_info = self._get_twilio_call_status(call_id)
             elif self.voip_type == 'plivo':
-                return self._get_plivo_call_status(call_id)
+                call_info = self._get_plivo_call_status(call_id)
             
-            # Retornar informações locais
-            return call_info
+            # Retornar cópia das informações locais
+            return call_info.to_dict() if isinstance(call_info, CallRecord) else call_info
             
         except Exception as e:
             logger.error(f"Erro ao obter status da chamada: {e}")
@@ -1010,19 +1184,23 @@ class VoIPManager:
             response = self.connection.send_action(action)
             
             if response.get('Response') == 'Success':
-                # Atualizar informações da chamada
-                call_info['channel_state'] = response.get('ChannelState')
-                call_info['channel_state_desc'] = response.get('ChannelStateDesc')
-                
                 # Mapear estado do canal para status da chamada
                 state_desc = response.get('ChannelStateDesc', '').lower()
+                status = None
                 if 'up' in state_desc:
-                    call_info['status'] = 'in-progress'
+                    status = 'in-progress'
                 elif 'ring' in state_desc:
-                    call_info['status'] = 'ringing'
+                    status = 'ringing'
                 elif 'down' in state_desc or not state_desc:
-                    call_info['status'] = 'completed'
-                    call_info['end_time'] = time.time()
+                    status = 'completed'
+                
+                # Atualizar informações da chamada
+                self._update_call_state(
+                    call_id, status,
+                    event_type='hangup' if status in TERMINAL_STATUSES else 'status',
+                    channel_state=response.get('ChannelState'),
+                    channel_state_desc=response.get('ChannelStateDesc')
+                )
             
             return call_info
                 
@@ -1048,10 +1226,8 @@ class VoIPManager:
             call = client.calls(provider_id).fetch()
             
             # Atualizar informações locais
-            call_info['status'] = call.status
-            
-            if call.status in ['completed', 'failed', 'canceled', 'busy']:
-                call_info['end_time'] = time.time()
+            fields = {'duration': call.duration} if getattr(call, 'duration', None) else {}
+            self._apply_provider_status(call_id, call.status, **fields)
                 
             return call_info
             
@@ -1077,10 +1253,8 @@ class VoIPManager:
             response = client.calls.get(provider_id)
             
             # Atualizar informações locais
-            call_info['status'] = response.get('status', call_info['status'])
-            
-            if response.get('status') in ['completed', 'failed', 'busy']:
-                call_info['end_time'] = time.time()
+            fields = {'duration': response.get('duration')} if response.get('duration') else {}
+            self._apply_provider_status(call_id, response.get('status'), **fields)
                 
             return call_info
             
@@ -1131,6 +1305,17 @@ class VoIPManager:
             logger.error(f"Erro ao reproduzir áudio: {e}")
             return False
     
+    def _media_url(self, audio_file: str) -> Optional[str]:
+        """URL do áudio para Twilio/Plivo (WAV 8 kHz pré-convertido se media_dir estiver configurado)"""
+        audio_url = self.prompts.media_url(audio_file)
+        if audio_url:
+            return audio_url
+
+        media_base_url = self.config.get('media_base_url')
+        if not media_base_url:
+            return None
+        return f"{media_base_url}/{os.path.basename(audio_file)}"
+    
     def _play_asterisk_audio(self, call_id: str, audio_file: str) -> bool:
         """Reproduz áudio via Asterisk"""
         try:
@@ -1146,7 +1331,7 @@ class VoIPManager:
             action = {
                 'Action': 'Playback',
                 'Channel': channel,
-                'File': os.path.splitext(audio_file)[0]  # Remover extensão
+                'File': self.prompts.asterisk_file(audio_file) or os.path.splitext(audio_file)[0]  # Remover extensão
             }
                 
             # Enviar comando
@@ -1178,14 +1363,10 @@ class VoIPManager:
             client = self.connection
             
             # Verificar se temos URL para o arquivo
-            audio_url = self.config.get('media_base_url')
+            audio_url = self._media_url(audio_file)
             if not audio_url:
                 logger.error("URL base para mídia não configurada")
                 return False
-                
-            # Construir URL completa
-            file_name = os.path.basename(audio_file)
-            audio_url = f"{audio_url}/{file_name}"
             
             # Preparar TwiML para reprodução
             twiml = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -1221,14 +1402,10 @@ class VoIPManager:
             client = self.connection
             
             # Verificar se temos URL para o arquivo
-            audio_url = self.config.get('media_base_url')
+            audio_url = self._media_url(audio_file)
             if not audio_url:
                 logger.error("URL base para mídia não configurada")
                 return False
-                
-            # Construir URL completa
-            file_name = os.path.basename(audio_file)
-            audio_url = f"{audio_url}/{file_name}"
             
             # Enviar comando de reprodução
             response = client.calls.play(
@@ -1251,47 +1428,262 @@ class VoIPManager:
         logger.info(f"Reproduzindo áudio para chamada {call_id}")
         return True
     
-    def _on_asterisk_hangup(self, event):
+    @staticmethod
+    def _event_header(event, name: str, default=None):
+        """Lê um cabeçalho de evento AMI (dict ou Event do pyst2)"""
+        headers = getattr(event, 'headers', event)
+        try:
+            return headers.get(name, default)
+        except AttributeError:
+            return default
+    
+    def _find_asterisk_call(self, event) -> Optional[str]:
+        """
+        Localiza a chamada a que um evento AMI pertence.
+        
+        O Originate define o Uniqueid do canal como o ID da chamada; pernas
+        discadas a partir dele carregam o mesmo valor em Linkedid, e respostas
+        à action carregam o ActionID (também o ID da chamada).
+        """
+        for header in ('Uniqueid', 'Linkedid', 'ActionID'):
+            value = self._event_header(event, header)
+            if value and value in self.active_calls:
+                return value
+        
+        channel = self._event_header(event, 'Channel')
+        if not channel:
+            return None
+        
+        # Asterisk sem ChannelId: localizar pelo índice de canais (None se ambíguo)
+        record = self.active_calls.by_channel(channel)
+        return record.call_id if record else None
+    
+    def _update_call_state(self, call_id: str, status: Optional[str] = None,
+                           event_type: str = 'status', **fields) -> bool:
+        """
+        Aplica uma transição de estado vinda de um evento.
+        
+        Args:
+            call_id: ID da chamada
+            status: Novo status (None para só atualizar campos)
+            event_type: Tipo de evento enviado ao webhook se o status mudar
+            **fields: Campos adicionais da chamada
+            
+        Returns:
+            bool: True se o status mudou
+        """
+        call_info = self.active_calls.get(call_id)
+        if call_info is None:
+            return False
+        
+        with self.active_calls.lock_for(call_id):
+            now = time.time()
+            call_info.update(fields)
+            call_info['last_event'] = now
+            
+            current = call_info.get('status')
+            if not status or status == current or current in TERMINAL_STATUSES:
+                return False
+            
+            if status == 'in-progress' and 'answer_time' not in call_info:
+                call_info['answer_time'] = now
+            if status in TERMINAL_STATUSES:
+                call_info.setdefault('end_time', now)
+            if event_type == 'hangup':
+                call_info['hangup_notified'] = True
+            # Status por último: a transição é registrada com os demais campos já aplicados
+            call_info['status'] = status
+            payload = call_info.to_dict()
+        
+        logger.info(f"Chamada {call_id}: {current} -> {status}")
+        self._send_webhook(call_id, event_type, payload)
+        return True
+    
+    def _on_asterisk_originate_response(self, event, manager=None):
+        """Manipulador do resultado de um Originate assíncrono"""
+        try:
+            call_id = self._event_header(event, 'ActionID')
+            if call_id not in self.active_calls:
+                return
+            
+            if self._event_header(event, 'Response') == 'Success':
+                fields = {'channel_bound': True}
+                channel = self._event_header(event, 'Channel')
+                if channel:
+                    fields['channel'] = channel
+                if self._event_header(event, 'Uniqueid'):
+                    fields['uniqueid'] = self._event_header(event, 'Uniqueid')
+                self._update_call_state(call_id, **fields)
+            else:
+                reason = str(self._event_header(event, 'Reason', ''))
+                self._update_call_state(
+                    call_id, ASTERISK_ORIGINATE_REASON.get(reason, 'failed'),
+                    originate_reason=reason
+                )
+        except Exception as e:
+            logger.error(f"Erro ao processar resultado de originate: {e}")
+    
+    def _on_asterisk_newstate(self, event, manager=None):
+        """Manipulador de mudança de estado de canal Asterisk"""
+        try:
+            call_id = self._find_asterisk_call(event)
+            if not call_id:
+                return
+            
+            state = (self._event_header(event, 'ChannelStateDesc') or '').lower()
+            fields = {'channel_state_desc': self._event_header(event, 'ChannelStateDesc')}
+            if state in ('ring', 'ringing'):
+                self._update_call_state(call_id, 'ringing', **fields)
+            elif state == 'up':
+                self._update_call_state(call_id, 'in-progress', **fields)
+            else:
+                self._update_call_state(call_id, **fields)
+        except Exception as e:
+            logger.error(f"Erro ao processar evento de estado: {e}")
+    
+    def _on_asterisk_hangup(self, event, manager=None):
         """Manipulador de evento de desligamento de chamada Asterisk"""
         try:
-            # Procurar chamada pelo canal
-            channel = event.get('Channel')
-            if not channel:
+            call_id = self._find_asterisk_call(event)
+            if not call_id:
                 return
-                
-            # Encontrar chamada correspondente
-            for call_id, call_info in self.active_calls.items():
-                if call_info.get('channel') == channel:
-                    # Atualizar status
-                    call_info['status'] = 'completed'
-                    call_info['end_time'] = time.time()
-                    call_info['cause'] = event.get('Cause')
-                    call_info['cause_txt'] = event.get('Cause-txt')
-                    
-                    # Enviar webhook se configurado
-                    self._send_webhook(call_id, 'hangup', call_info)
-                    
-                    logger.info(f"Chamada {call_id} encerrada: {event.get('Cause-txt')}")
-                    break
+            
+            call_info = self.active_calls[call_id]
+            channel = self._event_header(event, 'Channel')
+            uniqueid = self._event_header(event, 'Uniqueid')
+            
+            # Só o canal da chamada a encerra: o Uniqueid é o ChannelId do Originate
+            # (o call_id) ou o canal vinculado pelo OriginateResponse. Antes do
+            # vínculo não há como distinguir pernas secundárias; a falha do
+            # Originate chega pelo OriginateResponse
+            if uniqueid != call_id and (not call_info.get('channel_bound') or
+                                        channel != call_info.get('channel')):
+                return
+            
+            changed = self._update_call_state(
+                call_id, 'completed', event_type='hangup',
+                cause=self._event_header(event, 'Cause'),
+                cause_txt=self._event_header(event, 'Cause-txt')
+            )
+            
+            # Chamada já encerrada localmente (hangup_call): notificar o desligamento uma vez
+            if not changed:
+                with self.active_calls.lock_for(call_id):
+                    notify = not call_info.get('hangup_notified')
+                    call_info['hangup_notified'] = True
+                if notify:
+                    self._send_webhook(call_id, 'hangup', call_info.to_dict())
+            
+            logger.info(f"Chamada {call_id} encerrada: {self._event_header(event, 'Cause-txt')}")
         except Exception as e:
             logger.error(f"Erro ao processar evento de desligamento: {e}")
     
-    def _on_asterisk_dial_begin(self, event):
+    def _on_asterisk_dial_begin(self, event, manager=None):
         """Manipulador de evento de início de discagem Asterisk"""
-        pass
+        try:
+            call_id = self._find_asterisk_call(event)
+            if call_id:
+                self._update_call_state(
+                    call_id, 'ringing',
+                    dest_channel=self._event_header(event, 'DestChannel')
+                )
+        except Exception as e:
+            logger.error(f"Erro ao processar início de discagem: {e}")
     
-    def _on_asterisk_dial_end(self, event):
+    def _on_asterisk_dial_end(self, event, manager=None):
         """Manipulador de evento de fim de discagem Asterisk"""
-        pass
+        try:
+            call_id = self._find_asterisk_call(event)
+            if not call_id:
+                return
+            
+            dial_status = (self._event_header(event, 'DialStatus') or '').upper()
+            self._update_call_state(
+                call_id, ASTERISK_DIAL_STATUS.get(dial_status),
+                dial_status=dial_status
+            )
+        except Exception as e:
+            logger.error(f"Erro ao processar fim de discagem: {e}")
+    
+    def _on_asterisk_bridge_enter(self, event, manager=None):
+        """Manipulador de entrada de canal em ponte (chamada conectada)"""
+        try:
+            call_id = self._find_asterisk_call(event)
+            if call_id:
+                self._update_call_state(
+                    call_id, 'in-progress',
+                    bridge_id=self._event_header(event, 'BridgeUniqueid')
+                )
+        except Exception as e:
+            logger.error(f"Erro ao processar entrada em ponte: {e}")
+    
+    def handle_provider_callback(self, params: Dict) -> bool:
+        """
+        Processa um callback de status do Twilio ou Plivo (parâmetros do POST
+        recebido em status_callback_url).
+        
+        Args:
+            params: Parâmetros do callback (CallSid/CallUUID, CallStatus, ...)
+                    junto com os da query string (call_id)
+            
+        Returns:
+            bool: True se o callback corresponde a uma chamada conhecida
+        """
+        try:
+            provider_ids = [
+                params.get(key) for key in ('CallSid', 'RequestUUID', 'CallUUID')
+                if params.get(key)
+            ]
+            
+            # O call_id da URL funciona mesmo antes de o SID ser conhecido
+            record = self.active_calls.get(params['call_id']) if params.get('call_id') else None
+            for provider_id in provider_ids:
+                if record:
+                    break
+                record = self.active_calls.by_provider_id(provider_id)
+            
+            if not record:
+                logger.warning(f"Callback de status para chamada desconhecida: {provider_ids}")
+                return False
+            
+            fields = {}
+            if not record.get('provider_id') and (params.get('CallSid') or params.get('RequestUUID')):
+                fields['provider_id'] = params.get('CallSid') or params.get('RequestUUID')
+            if params.get('CallUUID'):
+                fields['call_uuid'] = params['CallUUID']
+            for source, target in (('CallDuration', 'duration'), ('Duration', 'duration'),
+                                   ('AnsweredBy', 'answered_by'), ('HangupCause', 'cause_txt')):
+                if params.get(source):
+                    fields[target] = params[source]
+            
+            self._apply_provider_status(record.call_id, params.get('CallStatus'), **fields)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Erro ao processar callback de status: {e}")
+            return False
+    
+    def _apply_provider_status(self, call_id: str, provider_status: Optional[str], **fields) -> bool:
+        """
+        Aplica um status do Twilio/Plivo (callback ou consulta) pelo mesmo
+        caminho dos eventos: vocabulário interno, horários e webhook.
+        """
+        status = (provider_status or '').lower()
+        status = PROVIDER_STATUS_ALIASES.get(status, status)
+        event_type = 'hangup' if status in TERMINAL_STATUSES else 'status'
+        return self._update_call_state(call_id, status or None, event_type=event_type, **fields)
     
     def _send_webhook(self, call_id: str, event_type: str, data: Dict):
-        """Envia webhook para callback configurado"""
+        """Enfileira webhook para o callback configurado (entrega assíncrona)"""
         try:
             # Verificar se temos URL de callback
             callback_url = self.call_callbacks.get(call_id)
             if not callback_url:
                 return
                 
+            if isinstance(data, CallRecord):
+                data = data.to_dict()
+            
             # Preparar payload
             payload = {
                 'call_id': call_id,
@@ -1300,17 +1692,62 @@ class VoIPManager:
                 'data': data
             }
             
-            # Enviar requisição
-            requests.post(
-                callback_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=5
-            )
+            # Enfileirar entrega
+            self.webhooks.dispatch(callback_url, payload)
             
         except Exception as e:
             logger.error(f"Erro ao enviar webhook: {e}")
     
+    def _persist_call(self, call_info: CallRecord):
+        """
+        Listener do registro: anexa a transição ao journal de persistência.
+        Roda sob a trava da chamada, na thread de eventos AMI (ou do callback):
+        o custo é uma escrita no cache do SO, desde que fsync fique desligado.
+        """
+        try:
+            self.call_store.record(
+                call_info, self.call_scope,
+                callback_url=self.call_callbacks.get(call_info.call_id)
+            )
+        except Exception as e:
+            logger.error(f"Erro ao registrar estado da chamada {call_info.call_id}: {e}")
+    
+    def _start_persistence(self):
+        """Recarrega as chamadas persistidas e passa a gravar as transições (uma vez)"""
+        if not self.call_store or self.calls_restored:
+            return
+        self.calls_restored = True
+        self._restore_calls()
+        self.active_calls.listener = self._persist_call
+    
+    def _restore_calls(self):
+        """Reconstrói as chamadas em andamento gravadas antes de um reinício"""
+        try:
+            calls = self.call_store.load_active(self.call_scope)
+        except Exception as e:
+            logger.error(f"Erro ao recuperar chamadas em andamento: {e}")
+            return
+        
+        for data in calls:
+            data = dict(data)
+            call_id = data.pop('call_id')
+            callback_url = data.pop('callback_url', None)
+            start_time = data.pop('start_time', None)
+            call_info = self.active_calls.add(
+                call_id, data.pop('from', ''), data.pop('to', ''),
+                status=data.pop('status', 'dialing'), variables=data.pop('variables', None),
+                **data
+            )
+            if start_time:
+                call_info['start_time'] = start_time
+            if callback_url:
+                self.call_callbacks[call_id] = callback_url
+        
+        # O estado pode ter mudado sem eventos durante a parada: a reconciliação
+        # consulta estas chamadas no primeiro ciclo (last_event antigo)
+        if calls:
+            logger.info(f"{len(calls)} chamadas em andamento recuperadas")
+    
     def _start_monitor(self):
         """Inicia thread de monitoramento de chamadas"""
         if self.monitor_thread and self.monitor_thread.is_alive():
@@ -1323,28 +1760,31 @@ class VoIPManager:
         self.monitor_thread.start()
     
     def _monitor_loop(self):
-        """Loop de monitoramento de chamadas"""
+        """
+        Loop de manutenção das chamadas: remove chamadas encerradas e, a cada
+        reconcile_interval, consulta o provedor apenas para chamadas sem
+        eventos recentes (eventos ou callbacks perdidos).
+        """
+        next_reconcile = time.time() + self.reconcile_interval
+        
         while self.connected:
             try:
-                # Verificar chamadas ativas
                 current_time = time.time()
                 calls_to_remove = []
                 
                 for call_id, call_info in self.active_calls.items():
-                    # Verificar status para chamadas antigas
-                    if call_info['status'] == 'completed' and \
-                       current_time - call_info.get('end_time', 0) > 300:  # 5 minutos
+                    if call_info['status'] in TERMINAL_STATUSES and \
+                       current_time - call_info.get('end_time', current_time) > self.completed_call_ttl:
                         calls_to_remove.append(call_id)
-                        continue
-                        
-                    # Atualizar status de chamadas em andamento
-                    if call_info['status'] not in ['completed', 'failed', 'busy']:
-                        # Tentar atualizar status
-                        self.get_call_status(call_id)
                 
                 # Remover chamadas antigas
                 for call_id in calls_to_remove:
-                    del self.active_calls[call_id]
+                    self.active_calls.remove(call_id)
+                    self.call_callbacks.pop(call_id, None)
+                
+                if current_time >= next_reconcile:
+                    next_reconcile = current_time + self.reconcile_interval
+                    self._reconcile_calls(current_time)
                     
                 # Dormir
                 time.sleep(10)
@@ -1353,9 +1793,26 @@ class VoIPManager:
                 logger.error(f"Erro no monitoramento: {e}")
                 time.sleep(5)
     
+    def _reconcile_calls(self, current_time: float):
+        """Consulta o provedor para chamadas em andamento sem eventos recentes"""
+        stale = [
+            call_id for call_id, call_info in self.active_calls.items()
+            if call_info['status'] not in TERMINAL_STATUSES and
+            current_time - call_info.get('last_event', call_info['start_time']) > self.reconcile_stale_after
+        ]
+        
+        # A consulta aplica o status por _update_call_state (aliases, horários, webhook)
+        for call_id in stale:
+            if call_id in self.active_calls:
+                self.get_call_status(call_id)
+        
+        if stale:
+            logger.info(f"Reconciliação de estado: {len(stale)} chamadas consultadas")
+    
     def close(self):
         """Encerra conexão com o servidor VoIP"""
         try:
+            self.closed = True
             self.connected = False
             
             if self.voip_type == 'asterisk' and self.connection:
@@ -1365,6 +1822,14 @@ class VoIPManager:
             self.connection = None
             self.status = "disconnected"
             
+            # Entregar webhooks pendentes antes de sair
+            if self.owns_webhooks:
+                self.webhooks.close(timeout=self.config.get('webhook_flush_timeout', 5))
+            
+            # Gravar as transições pendentes
+            if self.owns_call_store:
+                self.call_store.close()
+            
             logger.info("Conexão VoIP encerrada")
             
         except Exception as e:
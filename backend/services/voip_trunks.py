@@ -0,0 +1,362 @@
+# backend/services/voip_trunks.py
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .voip_dialer import TokenBucket
+from .voip_persistence import CallStateStore
+from .voip_service import VoIPManager
+from .voip_webhooks import WebhookDispatcher
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Trunk:
+    """Um tronco (conexão de provedor) do pool com seus limites e saúde"""
+
+    def __init__(self, name: str, manager: VoIPManager, weight: float = 1.0,
+                 max_channels: int = 100, calls_per_second: float = 10.0):
+        self.name = name
+        self.manager = manager
+        self.weight = weight
+        self.max_channels = max_channels
+        self.bucket = TokenBucket(calls_per_second, max(1.0, calls_per_second * 0.1))
+        self.bucket_lock = threading.Lock()
+
+        # Canais reservados por chamadas sendo originadas (ainda fora do registro)
+        self.reserved = 0
+        self.channel_lock = threading.Lock()
+
+        self.consecutive_errors = 0
+        self.disabled_until = 0.0
+        self.stats = {'calls': 0, 'errors': 0, 'failovers': 0}
+
+    @property
+    def active_channels(self) -> int:
+        """Chamadas em andamento no tronco"""
+        return self.manager.active_calls.active
+
+    @property
+    def used_channels(self) -> int:
+        """Chamadas em andamento mais as reservadas em originação"""
+        return self.active_channels + self.reserved
+
+    @property
+    def utilization(self) -> float:
+        """Fração dos canais do tronco em uso"""
+        return self.used_channels / float(self.max_channels) if self.max_channels else 1.0
+
+    @property
+    def connected(self) -> bool:
+        """Conexão viva: o gerenciador e, no Asterisk, o socket AMI"""
+        if not self.manager.connected:
+            return False
+        connection = self.manager.connection
+        live = getattr(connection, 'connected', True) if connection is not None else True
+        # pyst2: connected() é método
+        return bool(live() if callable(live) else live)
+
+    def healthy(self, now: float) -> bool:
+        """Conectado e fora do período de espera após falhas"""
+        return self.connected and now >= self.disabled_until
+
+    def reserve_channel(self) -> bool:
+        """Reserva um canal livre antes de originar; False se o tronco estiver cheio"""
+        with self.channel_lock:
+            if self.used_channels >= self.max_channels:
+                return False
+            self.reserved += 1
+            return True
+
+    def release_channel(self):
+        """Libera a reserva (a chamada originada já conta no registro)"""
+        with self.channel_lock:
+            self.reserved -= 1
+
+    def take_slot(self) -> bool:
+        """Consome um crédito de CPS do tronco"""
+        with self.bucket_lock:
+            self.bucket.refill()
+            return self.bucket.take()
+
+
+class _PoolCalls:
+    """Visão somente leitura das chamadas de todos os troncos (interface do CallRegistry)"""
+
+    def __init__(self, pool: 'TrunkPool'):
+        self.pool = pool
+
+    def get(self, call_id: str, default=None):
+        trunk = self.pool.call_trunks.get(call_id)
+        return trunk.manager.active_calls.get(call_id, default) if trunk else default
+
+    def __getitem__(self, call_id: str):
+        record = self.get(call_id)
+        if record is None:
+            raise KeyError(call_id)
+        return record
+
+    def __contains__(self, call_id: str) -> bool:
+        return self.get(call_id) is not None
+
+    def __len__(self) -> int:
+        return sum(len(trunk.manager.active_calls) for trunk in self.pool.trunks)
+
+    @property
+    def active(self) -> int:
+        return sum(trunk.active_channels for trunk in self.pool.trunks)
+
+    def items(self):
+        items = []
+        for trunk in self.pool.trunks:
+            items.extend(trunk.manager.active_calls.items())
+        return items
+
+
+class TrunkPool:
+    """
+    Pool de troncos VoIP (ex.: dois servidores Asterisk e uma conta Twilio)
+    com a mesma interface de chamadas do VoIPManager.
+
+    Cada nova chamada vai para o tronco saudável com maior capacidade livre
+    ponderada (peso × canais livres), respeitando o limite de canais e o
+    CPS de cada tronco. Um tronco que falha repetidamente fica fora do pool
+    por um período de espera e é reconectado em segundo plano; a chamada que
+    falhou é refeita no próximo tronco. As demais operações (transferência,
+    desligamento, DTMF, áudio, status) são roteadas ao tronco da chamada.
+    """
+
+    def __init__(self, config: Dict):
+        """
+        Inicializa o pool.
+
+        Args:
+            config: {'trunks': [config do VoIPManager + name, weight, max_channels,
+                     calls_per_second], 'failure_threshold', 'cooldown',
+                     'health_interval', 'webhooks', 'persist_calls', 'call_store', 'name'}
+        """
+        self.config = config
+        self.failure_threshold = config.get('failure_threshold', 3)
+        self.cooldown = config.get('cooldown', 30)
+        self.health_interval = config.get('health_interval', 10)
+
+        # Um único despachante de webhooks para todos os troncos
+        self.webhooks = WebhookDispatcher(config.get('webhooks'))
+
+        # Um único journal/gravador de estado (opcional); cada tronco usa seu nome como escopo
+        self.call_store = None
+        if config.get('persist_calls', False):
+            store_config = dict({'journal_path': f"voip_calls-{config.get('name', 'trunks')}.journal"},
+                                **(config.get('call_store') or {}))
+            self.call_store = CallStateStore(store_config)
+
+        self.trunks = []
+        self.call_trunks = {}
+        for index, trunk_config in enumerate(config.get('trunks', [])):
+            name = trunk_config.get('name', f"{trunk_config.get('type', 'asterisk')}-{index}")
+            manager = VoIPManager(
+                dict(trunk_config, name=name, persist_calls=False),
+                webhooks=self.webhooks,
+                call_store=self.call_store
+            )
+            self.trunks.append(Trunk(
+                name,
+                manager,
+                weight=trunk_config.get('weight', 1.0),
+                max_channels=trunk_config.get('max_channels', 100),
+                calls_per_second=trunk_config.get('calls_per_second', 10.0)
+            ))
+
+        self.active_calls = _PoolCalls(self)
+        self.running = False
+        self.health_thread = None
+
+    @property
+    def connected(self) -> bool:
+        return any(trunk.connected for trunk in self.trunks)
+
+    def initialize_connection(self) -> bool:
+        """
+        Conecta todos os troncos e inicia a verificação de saúde.
+
+        Returns:
+            bool: True se ao menos um tronco conectou
+        """
+        for trunk in self.trunks:
+            if not trunk.manager.initialize_connection():
+                trunk.disabled_until = time.time() + self.cooldown
+                logger.warning(f"Tronco {trunk.name} indisponível na inicialização")
+
+            # Chamadas recuperadas da persistência continuam roteadas ao seu tronco
+            for call_id, _ in trunk.manager.active_calls.items():
+                self.call_trunks.setdefault(call_id, trunk)
+
+        if not self.running:
+            self.running = True
+            self.health_thread = threading.Thread(target=self._health_loop, name='trunk-health', daemon=True)
+            self.health_thread.start()
+
+        return self.connected
+
+    def _candidates(self) -> List[Trunk]:
+        """Troncos saudáveis com canais livres, do mais ao menos preferido"""
+        now = time.time()
+        candidates = [
+            trunk for trunk in self.trunks
+            if trunk.healthy(now) and trunk.used_channels < trunk.max_channels
+        ]
+        return sorted(
+            candidates,
+            key=lambda trunk: trunk.weight * (trunk.max_channels - trunk.used_channels),
+            reverse=True
+        )
+
+    def _record_failure(self, trunk: Trunk):
+        """Conta falha do tronco e o retira do pool após falhas seguidas"""
+        trunk.stats['errors'] += 1
+        trunk.consecutive_errors += 1
+        if trunk.consecutive_errors >= self.failure_threshold:
+            trunk.disabled_until = time.time() + self.cooldown
+            trunk.consecutive_errors = 0
+            logger.warning(f"Tronco {trunk.name} retirado do pool por {self.cooldown}s após falhas seguidas")
+
+    def make_call(self, from_number: str, to_number: str,
+                  callback_url: Optional[str] = None,
+                  variables: Optional[Dict] = None) -> Tuple[bool, str]:
+        """
+        Inicia uma chamada no melhor tronco disponível, com failover.
+
+        Returns:
+            Tuple[bool, str]: (sucesso, id_da_chamada)
+        """
+        candidates = self._candidates()
+        if not candidates:
+            logger.error("Nenhum tronco disponível (todos saturados ou fora do pool)")
+            return False, ""
+
+        attempted = 0
+        for trunk in candidates:
+            # O canal é reservado antes de originar: discadores simultâneos
+            # não ultrapassam max_channels
+            if not trunk.reserve_channel():
+                continue
+
+            try:
+                # Sem crédito de CPS neste tronco: transbordar para o próximo
+                if not trunk.take_slot():
+                    continue
+
+                if attempted:
+                    trunk.stats['failovers'] += 1
+                attempted += 1
+
+                success, call_id = trunk.manager.make_call(from_number, to_number, callback_url, variables)
+            finally:
+                trunk.release_channel()
+
+            if success:
+                trunk.consecutive_errors = 0
+                trunk.stats['calls'] += 1
+                self.call_trunks[call_id] = trunk
+                return True, call_id
+
+            self._record_failure(trunk)
+            logger.warning(f"Falha ao iniciar chamada no tronco {trunk.name}, tentando o próximo")
+
+        if not attempted:
+            logger.warning("Limite de CPS ou de canais atingido em todos os troncos disponíveis")
+        return False, ""
+
+    def _trunk_for(self, call_id: str) -> Optional[Trunk]:
+        trunk = self.call_trunks.get(call_id)
+        if trunk is None:
+            logger.error(f"Chamada {call_id} não encontrada")
+        return trunk
+
+    def handle_call_transfer(self, call_id: str, destination: str) -> bool:
+        trunk = self._trunk_for(call_id)
+        return trunk.manager.handle_call_transfer(call_id, destination) if trunk else False
+
+    def hangup_call(self, call_id: str) -> bool:
+        trunk = self._trunk_for(call_id)
+        return trunk.manager.hangup_call(call_id) if trunk else False
+
+    def send_dtmf(self, call_id: str, digits: str) -> bool:
+        trunk = self._trunk_for(call_id)
+        return trunk.manager.send_dtmf(call_id, digits) if trunk else False
+
+    def play_audio(self, call_id: str, audio_file: str) -> bool:
+        trunk = self._trunk_for(call_id)
+        return trunk.manager.play_audio(call_id, audio_file) if trunk else False
+
+    def get_call_status(self, call_id: str) -> Dict:
+        trunk = self._trunk_for(call_id)
+        return trunk.manager.get_call_status(call_id) if trunk else {'status': 'unknown'}
+
+    def handle_provider_callback(self, params: Dict) -> bool:
+        """Entrega um callback de status ao tronco (Twilio/Plivo) dono da chamada"""
+        # call_id da URL: a chamada já está no registro do tronco antes do SID
+        call_id = params.get('call_id')
+        if call_id:
+            for trunk in self.trunks:
+                if call_id in trunk.manager.active_calls:
+                    return trunk.manager.handle_provider_callback(params)
+
+        for trunk in self.trunks:
+            if trunk.manager.voip_type in ('twilio', 'plivo') and \
+               any(trunk.manager.active_calls.by_provider_id(params.get(key))
+                   for key in ('CallSid', 'RequestUUID', 'CallUUID') if params.get(key)):
+                return trunk.manager.handle_provider_callback(params)
+        logger.warning("Callback de status sem tronco correspondente")
+        return False
+
+    def _health_loop(self):
+        """Reconecta troncos caídos e remove chamadas já descartadas do roteamento"""
+        while self.running:
+            try:
+                now = time.time()
+                for trunk in self.trunks:
+                    # Troncos Asterisk que caíram já se reconectam sozinhos
+                    if not trunk.connected and not trunk.manager.reconnecting and \
+                       now >= trunk.disabled_until:
+                        logger.info(f"Reconectando tronco {trunk.name}...")
+                        if not trunk.manager.initialize_connection():
+                            trunk.disabled_until = now + self.cooldown
+
+                for call_id, trunk in list(self.call_trunks.items()):
+                    if call_id not in trunk.manager.active_calls:
+                        self.call_trunks.pop(call_id, None)
+
+                time.sleep(self.health_interval)
+
+            except Exception as e:
+                logger.error(f"Erro na verificação de troncos: {e}")
+                time.sleep(5)
+
+    def get_stats(self) -> Dict:
+        """Estado, utilização e contadores de cada tronco"""
+        now = time.time()
+        return {
+            trunk.name: dict(
+                trunk.stats,
+                type=trunk.manager.voip_type,
+                healthy=trunk.healthy(now),
+                active_channels=trunk.active_channels,
+                reserved_channels=trunk.reserved,
+                max_channels=trunk.max_channels,
+                utilization=trunk.utilization,
+                weight=trunk.weight
+            )
+            for trunk in self.trunks
+        }
+
+    def close(self):
+        """Encerra todos os troncos"""
+        self.running = False
+        for trunk in self.trunks:
+            trunk.manager.close()
+        self.webhooks.close(timeout=self.config.get('webhook_flush_timeout', 5))
+        if self.call_store:
+            self.call_store.close()
@@ -0,0 +1,300 @@
+# backend/services/voip_webhooks.py
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Respostas que indicam falha temporária do destino (tentar novamente)
+RETRYABLE_STATUS = (408, 425, 429, 500, 502, 503, 504)
+
+
+class _Destination:
+    """Fila e concorrência de uma URL de destino"""
+
+    __slots__ = ('url', 'items', 'active', 'scheduled', 'batch_size', 'retrying')
+
+    def __init__(self, url: str, batch_size: int = 1):
+        self.url = url
+        self.items = deque()
+        self.active = 0
+        self.scheduled = False
+        self.batch_size = batch_size
+        self.retrying = 0
+
+    @property
+    def idle(self) -> bool:
+        """Sem eventos na fila, em envio ou aguardando nova tentativa"""
+        return not self.items and not self.active and not self.scheduled and not self.retrying
+
+
+class WebhookDispatcher:
+    """
+    Envio assíncrono de webhooks de chamadas.
+
+    Quem enfileira (thread de eventos AMI, callbacks) nunca espera a rede:
+    os eventos vão para uma fila em memória limitada e são entregues por
+    um pool de workers com sessão HTTP keep-alive compartilhada. Cada destino
+    tem limite próprio de requisições simultâneas, de modo que um endpoint
+    lento não ocupa todos os workers. Destinos que aceitam lotes recebem
+    vários eventos por POST ({'events': [...]}). Falhas temporárias são
+    repetidas com backoff exponencial.
+
+    A ordem de entrega não é garantida, nem para eventos da mesma chamada:
+    com mais de um envio simultâneo por destino, ou quando um evento volta
+    da espera de nova tentativa, um evento posterior (ex.: 'completed') pode
+    chegar antes de um anterior. Receptores devem ordenar pelo 'timestamp'
+    do payload. Destinos ociosos são descartados, de modo que URLs por
+    chamada ou por cliente não acumulam memória.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Inicializa o despachante.
+
+        Args:
+            config: Configurações (queue_size, workers, per_destination, timeout,
+                    max_attempts, backoff_base, backoff_max, batch)
+        """
+        config = config or {}
+        self.queue_size = config.get('queue_size', 10000)
+        self.workers = config.get('workers', 8)
+        self.per_destination = config.get('per_destination', 2)
+        self.timeout = config.get('timeout', 5)
+        self.max_attempts = config.get('max_attempts', 5)
+        self.backoff_base = config.get('backoff_base', 1.0)
+        self.backoff_max = config.get('backoff_max', 60.0)
+
+        # URL -> tamanho máximo do lote, para destinos que aceitam lotes
+        self.batch_sizes = dict(config.get('batch', {}))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config.get('pool_connections', 32),
+            pool_maxsize=max(self.workers, config.get('pool_maxsize', self.workers))
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+        self.condition = threading.Condition()
+        self.destinations = {}
+        self.ready = deque()
+        self.retries = []
+        self.retry_sequence = itertools.count()
+        self.size = 0
+
+        self.threads = []
+        self.running = False
+
+        self.stats = {
+            'queued': 0,
+            'delivered': 0,
+            'requests': 0,
+            'retries': 0,
+            'failed': 0,
+            'dropped': 0
+        }
+
+    def enable_batching(self, url: str, max_batch: int = 50):
+        """Marca um destino como capaz de receber lotes de eventos"""
+        with self.condition:
+            self.batch_sizes[url] = max_batch
+            destination = self.destinations.get(url)
+            if destination:
+                destination.batch_size = max_batch
+
+    def dispatch(self, url: str, payload: Dict) -> bool:
+        """
+        Enfileira um evento para entrega. Nunca bloqueia.
+
+        Args:
+            url: URL de destino
+            payload: Corpo JSON do evento
+
+        Returns:
+            bool: False se a fila estiver cheia (evento descartado)
+        """
+        with self.condition:
+            if self.size >= self.queue_size:
+                self.stats['dropped'] += 1
+                logger.warning(f"Fila de webhooks cheia, evento descartado para {url}")
+                return False
+
+            destination = self.destinations.get(url)
+            if destination is None:
+                destination = _Destination(url, self.batch_sizes.get(url, 1))
+                self.destinations[url] = destination
+
+            destination.items.append((payload, 0))
+            self.size += 1
+            self.stats['queued'] += 1
+            self._schedule(destination)
+
+            if not self.running:
+                self._start_workers()
+            self.condition.notify()
+            return True
+
+    def _schedule(self, destination: _Destination):
+        """Coloca o destino na fila de prontos se tiver eventos e vaga (com a trava)"""
+        if not destination.scheduled and destination.items and destination.active < self.per_destination:
+            destination.scheduled = True
+            self.ready.append(destination)
+
+    def _start_workers(self):
+        """Inicia os workers na primeira entrega (com a trava)"""
+        self.running = True
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'webhook-{index}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _promote_retries(self) -> Optional[float]:
+        """
+        Devolve às filas os eventos cujo backoff terminou (com a trava).
+
+        Returns:
+            Optional[float]: Segundos até a próxima repetição pendente
+        """
+        now = time.monotonic()
+        while self.retries and self.retries[0][0] <= now:
+            _, _, url, item = heapq.heappop(self.retries)
+            destination = self.destinations[url]
+            destination.retrying -= 1
+            destination.items.appendleft(item)
+            self._schedule(destination)
+        return self.retries[0][0] - now if self.retries else None
+
+    def _next_batch(self):
+        """Aguarda e retira o próximo lote de algum destino com vaga"""
+        with self.condition:
+            while True:
+                wait_time = self._promote_retries()
+                if self.ready:
+                    break
+                if not self.running:
+                    return None, None
+                self.condition.wait(timeout=wait_time if wait_time is not None else 1.0)
+
+            destination = self.ready.popleft()
+            destination.scheduled = False
+            count = min(destination.batch_size, len(destination.items))
+            batch = [destination.items.popleft() for _ in range(count)]
+            destination.active += 1
+
+            # Outro worker pode atender o mesmo destino se ainda houver vaga
+            self._schedule(destination)
+            return destination, batch
+
+    def _worker(self):
+        """Entrega eventos até o despachante ser encerrado"""
+        while True:
+            destination, batch = self._next_batch()
+            if destination is None:
+                return
+
+            try:
+                outcome = self._deliver(destination, batch)
+            except Exception as e:
+                logger.error(f"Erro ao enviar webhook para {destination.url}: {e}")
+                outcome = 'retry'
+
+            with self.condition:
+                destination.active -= 1
+                self.stats['requests'] += 1
+                if outcome == 'retry':
+                    self._retry(destination, batch)
+                else:
+                    self.size -= len(batch)
+                    self.stats[outcome] += len(batch)
+                self._schedule(destination)
+                self._evict_if_idle(destination)
+                self.condition.notify_all()
+
+    def _evict_if_idle(self, destination: _Destination):
+        """Remove o destino sem pendências (com a trava); recriado no próximo evento"""
+        if destination.idle and self.destinations.get(destination.url) is destination:
+            del self.destinations[destination.url]
+
+    def _deliver(self, destination: _Destination, batch) -> str:
+        """
+        Envia um lote (ou um único evento) ao destino.
+
+        Returns:
+            str: 'delivered', 'retry' ou 'failed' (rejeitado pelo destino)
+        """
+        if destination.batch_size > 1:
+            body = {'events': [payload for payload, _ in batch]}
+        else:
+            body = batch[0][0]
+
+        try:
+            response = self.session.post(destination.url, json=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Falha ao enviar webhook para {destination.url}: {e}")
+            return 'retry'
+
+        if 200 <= response.status_code < 300:
+            return 'delivered'
+        if response.status_code in RETRYABLE_STATUS:
+            logger.warning(f"Webhook para {destination.url} retornou {response.status_code}")
+            return 'retry'
+
+        # Erro do cliente (4xx): repetir não adianta
+        logger.error(f"Webhook rejeitado por {destination.url}: {response.status_code}")
+        return 'failed'
+
+    def _retry(self, destination: _Destination, batch):
+        """Agenda nova tentativa com backoff exponencial e jitter (com a trava)"""
+        for payload, attempts in batch:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self.size -= 1
+                self.stats['failed'] += 1
+                logger.error(f"Webhook para {destination.url} descartado após {attempts} tentativas")
+                continue
+
+            delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+            due = time.monotonic() + delay * random.uniform(0.5, 1.0)
+            heapq.heappush(self.retries, (due, next(self.retry_sequence), destination.url, (payload, attempts)))
+            destination.retrying += 1
+            self.stats['retries'] += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Aguarda a entrega dos eventos pendentes (até o tempo limite)"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.size > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(timeout=min(remaining, 0.1))
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """Tenta entregar o que está na fila e encerra os workers"""
+        if self.running:
+            self.flush(timeout)
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.session.close()
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do despachante"""
+        with self.condition:
+            stats = self.stats.copy()
+            stats['pending'] = self.size
+            stats['scheduled_retries'] = len(self.retries)
+            stats['destinations'] = len(self.destinations)
+        return stats
@@ -0,0 +1,197 @@
+# backend/services/whisper_pool.py
+import logging
+import threading
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Taxa de amostragem esperada pelo Whisper
+WHISPER_SAMPLE_RATE = 16000
+
+
+class WhisperModelPool:
+    """
+    Pool de modelos Whisper residentes no processo. Cada tamanho de modelo é
+    carregado uma única vez (na inicialização ou no primeiro uso) e
+    compartilhado entre todas as threads de trabalho.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, default_size: str = "base", device: Optional[str] = None,
+                 max_concurrency: int = 2):
+        """
+        Inicializa o pool de modelos.
+
+        Args:
+            default_size: Tamanho padrão do modelo ('tiny', 'base', 'small', ...)
+            device: Dispositivo para os modelos ('cpu', 'cuda'); automático se None
+            max_concurrency: Máximo de inferências simultâneas por modelo
+        """
+        self.default_size = default_size
+        self.device = device
+        self.max_concurrency = max_concurrency
+
+        self.models = {}
+        self.semaphores = {}
+        self.load_locks = {}
+        self.lock = threading.Lock()
+
+        self.stats = {
+            'models_loaded': 0,
+            'transcriptions': 0,
+            'batches': 0,
+            'batched_items': 0
+        }
+
+    @classmethod
+    def get_instance(cls, default_size: str = "base", device: Optional[str] = None) -> 'WhisperModelPool':
+        """Retorna a instância compartilhada pelo processo"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(default_size=default_size, device=device)
+        return cls._instance
+
+    def _import_whisper(self):
+        """Importa o Whisper, instalando-o se necessário"""
+        try:
+            import whisper
+        except ImportError:
+            import subprocess
+            logger.info("Instalando OpenAI Whisper para reconhecimento offline...")
+            subprocess.check_call(['pip', 'install', 'openai-whisper'])
+            import whisper
+        return whisper
+
+    def get_model(self, size: Optional[str] = None):
+        """
+        Retorna o modelo do tamanho pedido, carregando-o apenas na primeira vez.
+
+        Args:
+            size: Tamanho do modelo; usa o padrão do pool se None
+        """
+        size = size or self.default_size
+
+        model = self.models.get(size)
+        if model is not None:
+            return model
+
+        with self.lock:
+            load_lock = self.load_locks.setdefault(size, threading.Lock())
+
+        # Apenas uma thread carrega cada tamanho; as demais aguardam
+        with load_lock:
+            model = self.models.get(size)
+            if model is not None:
+                return model
+
+            whisper = self._import_whisper()
+            logger.info(f"Carregando modelo Whisper '{size}'...")
+            model = whisper.load_model(size, device=self.device)
+
+            with self.lock:
+                self.semaphores[size] = threading.BoundedSemaphore(self.max_concurrency)
+                self.models[size] = model
+                self.stats['models_loaded'] += 1
+
+            logger.info(f"Modelo Whisper '{size}' carregado")
+            return model
+
+    def preload(self, sizes: Optional[Iterable[str]] = None):
+        """Carrega antecipadamente os modelos (ex.: na inicialização do worker)"""
+        for size in sizes or [self.default_size]:
+            try:
+                self.get_model(size)
+            except Exception as e:
+                logger.error(f"Erro ao pré-carregar modelo Whisper '{size}': {str(e)}")
+
+    def transcribe(self, samples: np.ndarray, language: Optional[str] = None,
+                   size: Optional[str] = None) -> str:
+        """
+        Transcreve um buffer float32 mono a 16 kHz.
+
+        Args:
+            samples: Amostras de áudio a 16 kHz
+            language: Código de idioma do Whisper (ex.: 'pt')
+            size: Tamanho do modelo
+
+        Returns:
+            str: Texto transcrito
+        """
+        size = size or self.default_size
+        model = self.get_model(size)
+
+        with self.semaphores[size]:
+            result = model.transcribe(
+                np.ascontiguousarray(samples, dtype=np.float32),
+                language=language,
+                fp16=self._use_fp16(model)
+            )
+
+        with self.lock:
+            self.stats['transcriptions'] += 1
+
+        return result["text"]
+
+    def transcribe_batch(self, batch: List[np.ndarray], language: Optional[str] = None,
+                         size: Optional[str] = None) -> List[str]:
+        """
+        Transcreve vários buffers em uma única passada do modelo. Cada item é
+        ajustado para a janela de 30 s do Whisper, suficiente para saudações
+        de caixa postal.
+
+        Args:
+            batch: Lista de buffers float32 mono a 16 kHz
+            language: Código de idioma do Whisper (ex.: 'pt')
+            size: Tamanho do modelo
+
+        Returns:
+            List[str]: Textos transcritos, na mesma ordem da entrada
+        """
+        if not batch:
+            return []
+
+        import torch
+
+        whisper = self._import_whisper()
+        size = size or self.default_size
+        model = self.get_model(size)
+
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(torch.from_numpy(np.ascontiguousarray(samples, dtype=np.float32))),
+                n_mels=model.dims.n_mels
+            )
+            for samples in batch
+        ]).to(model.device)
+
+        options = whisper.DecodingOptions(
+            language=language,
+            without_timestamps=True,
+            fp16=self._use_fp16(model)
+        )
+
+        with self.semaphores[size]:
+            with torch.no_grad():
+                results = whisper.decode(model, mels, options)
+
+        with self.lock:
+            self.stats['batches'] += 1
+            self.stats['batched_items'] += len(batch)
+
+        return [result.text for result in results]
+
+    def _use_fp16(self, model) -> bool:
+        """FP16 só é útil (e suportado) em GPU"""
+        return getattr(model.device, 'type', 'cpu') == 'cuda'
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do pool"""
+        with self.lock:
+            stats = self.stats.copy()
+            stats['loaded_sizes'] = list(self.models.keys())
+        return stats